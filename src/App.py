@@ -1,12 +1,9 @@
 # --- Librerías estándar ---
 import os
-import time
 from pathlib import Path
 import subprocess
 
 # --- Librerías de terceros ---
-import pandas as pd
-from openpyxl import Workbook
 from PyQt5 import QtWidgets, QtGui, QtCore
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QVBoxLayout, QPushButton, QLineEdit, 
@@ -17,12 +14,11 @@ from PyQt5.QtGui import QFont, QCursor
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 
 # --- Módulos propios ---
-from bbdd_cmg import (
-    busca_barra_cmg, busca_cliente_bdd, get_cmg_barra, 
-    get_ivt_cliente, buscarClientesPorBarra
-)
-from Metodos_Busqueda import buscar_barra, buscar_cliente
+from Metodos_Busqueda import buscar_barra, buscar_cliente, buscar_clientes_barra
 from Metodos_Extraccion import obtener_data, extraer_cmg, mostrar_consumo
+from tareas_gui import GestorTareas
+from precarga import Precargador
+from autocompletado_gui import Autocompletado
 
 
 class PowerBIThread(QThread):
@@ -143,6 +139,55 @@ def crear_interfaz():
     tabs = QtWidgets.QTabWidget()
     layout_principal.addWidget(tabs)
 
+    # Panel de tareas: las búsquedas y extracciones se ejecutan en segundo plano, en cola
+    gestor_tareas = GestorTareas(max_hilos=2, parent=ventana)
+    panel_tareas = QtWidgets.QHBoxLayout()
+    lista_tareas = QtWidgets.QListWidget()
+    lista_tareas.setFont(QtGui.QFont("Open Sans", 10))
+    lista_tareas.setFixedHeight(70)
+    lista_tareas.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+    barra_progreso = QtWidgets.QProgressBar()
+    barra_progreso.setRange(0, 0)  # Indeterminada hasta que una tarea informe su avance
+    barra_progreso.setFixedWidth(200)
+    barra_progreso.hide()
+    boton_cancelar = QtWidgets.QPushButton("Cancelar Tarea")
+    boton_cancelar.setCursor(QCursor(Qt.PointingHandCursor))
+    panel_tareas.addWidget(QtWidgets.QLabel("Tareas:"))
+    panel_tareas.addWidget(lista_tareas)
+    panel_tareas.addWidget(barra_progreso)
+    panel_tareas.addWidget(boton_cancelar)
+    layout_principal.addLayout(panel_tareas)
+
+    def actualizar_lista_tareas():
+        lista_tareas.clear()
+        for tarea in gestor_tareas.tareas:
+            texto = f"{tarea.nombre} - {tarea.estado}"
+            if tarea.avance is not None and tarea.estado == 'en ejecución':
+                texto += f" ({tarea.avance})"
+            item = QtWidgets.QListWidgetItem(texto)
+            item.setData(Qt.UserRole, tarea)
+            lista_tareas.addItem(item)
+
+        # Avance por meses de la primera tarea en ejecución que lo informe; si no, barra indeterminada
+        avances = [t.avance for t in gestor_tareas.tareas if t.avance is not None and t.estado == 'en ejecución']
+        if avances:
+            barra_progreso.setRange(0, avances[0].meses_total)
+            barra_progreso.setValue(avances[0].meses_listos)
+        else:
+            barra_progreso.setRange(0, 0)
+        barra_progreso.setVisible(bool(gestor_tareas.tareas))
+
+    def cancelar_tareas():
+        # Cancela las tareas seleccionadas o, si no hay selección, todas las activas
+        seleccionadas = [item.data(Qt.UserRole) for item in lista_tareas.selectedItems()]
+        if not seleccionadas:
+            gestor_tareas.cancelar_todas()
+        for tarea in seleccionadas:
+            gestor_tareas.cancelar(tarea)
+
+    gestor_tareas.cambio.connect(actualizar_lista_tareas)
+    boton_cancelar.clicked.connect(cancelar_tareas)
+
     # Pestaña 1: Consultar consumo de cliente
     tab1 = QtWidgets.QWidget()
     tabs.addTab(tab1, "Consultar consumo de cliente")
@@ -558,42 +603,36 @@ def crear_interfaz():
 
     def manejarSeleccionBarra():
         """
-        Maneja la selección de una barra desde la interfaz, busca clientes asociados
-        y muestra los resultados en el área de resultados.
+        Maneja la selección de una barra desde la interfaz y encola la búsqueda de
+        los clientes asociados, que se muestran en el área de resultados.
         """
-        try:
-            # Limpiar los resultados anteriores en la interfaz
-            lista_resultados_tab3.clear()
-
-            # Obtener datos de entrada desde la interfaz
-            ruta = Path(entrada_ruta.text())
-            fecha_inicio = entrada_fecha_inicio.text()
-            fecha_fin = entrada_fecha_fin.text()
-            barra_seleccionada = entrada_barra.text().strip()  # Obtener la barra seleccionada desde la interfaz
-
-            # Validar que se haya ingresado una barra válida
-            if not barra_seleccionada:
-                escribir_mensaje("Por favor, ingresa una barra válida.")
-                return
-
-            # Llamar a la función buscarClientesPorBarra
-            start_time = time.time()
-            clientes_asociados = buscarClientesPorBarra(
-                folder=ruta,
-                barra_seleccionada=barra_seleccionada,
-                date_i=fecha_inicio,
-                date_f=fecha_fin
-            )
-            end_time = time.time()
-            escribir_mensaje(f"Clientes mostrados en {end_time - start_time:.2f} segundos.")
-            # Mostrar los resultados en el área de resultados
-            if clientes_asociados and not (len(clientes_asociados) == 1 and "Error" in clientes_asociados[0]):
-                for cliente in clientes_asociados:
-                    lista_resultados_tab3.addItem(cliente)  # Agregar a la lista de resultados visual
-            else:
-                escribir_mensaje("No se encontraron clientes para la barra seleccionada.")
-        except Exception as e:
-            escribir_mensaje(f"Error al manejar la selección de la barra: {str(e)}")
+        barra_seleccionada = entrada_barra.text().strip()  # Obtener la barra seleccionada desde la interfaz
+
+        # Validar que se haya ingresado una barra válida
+        if not barra_seleccionada:
+            escribir_mensaje("Por favor, ingresa una barra válida.")
+            return
+
+        gestor_tareas.enviar(
+            f"Clientes de {barra_seleccionada}",
+            buscar_clientes_barra,
+            destino=obtener_mensaje_estado(),
+            entrada_ruta=entrada_ruta.text(),
+            entrada_fecha_inicio=entrada_fecha_inicio.text(),
+            entrada_fecha_fin=entrada_fecha_fin.text(),
+            entrada_barra=barra_seleccionada,
+            lista_resultados=lista_resultados_tab3
+        )
+
+
+    def obtener_mensaje_estado():
+        pestaña_activa = tabs.currentIndex()  # Obtener el índice de la pestaña activa
+        if pestaña_activa == 0:  # Pestaña 1
+            return mensaje_estado_tab1
+        elif pestaña_activa == 1:  # Pestaña 2
+            return mensaje_estado_tab2
+        elif pestaña_activa == 2:  # Pestaña 3
+            return mensaje_estado_tab3
 
 
     def obtener_lista_resultados():
@@ -606,75 +645,123 @@ def crear_interfaz():
             return lista_resultados_tab3
 
 
-    # Conectar botones a funciones
+    # Precarga: con el rango y la barra (o cliente) elegidos, los meses que leerán "Extraer Costos
+    # Marginales" y "Exportar Consumo" se leen en segundo plano cuando el usuario deja de editar
+    precargador = Precargador()
+    temporizador_precarga = QtCore.QTimer(ventana)
+    temporizador_precarga.setSingleShot(True)
+    temporizador_precarga.setInterval(600)
+
+    def precargar():
+        pestaña_activa = tabs.currentIndex()
+        lista_resultados = obtener_lista_resultados()
+        item = lista_resultados.currentItem() if pestaña_activa in (0, 1) else None
+        if not item:
+            precargador.cancelar()
+            return
+
+        # Mismos parámetros que usarán extraer_cmg y mostrar_consumo al presionar el botón
+        texto = item.text()
+        if "(Barra:" in texto:
+            cliente = texto.split(" (Barra: ")[0]
+            barra = texto.split("(Barra:")[1].strip().replace(")", "")
+        else:
+            cliente, barra = None, texto.strip()
+        precargador.solicitar(Path(entrada_ruta.text()), entrada_fecha_inicio.text(), entrada_fecha_fin.text(), barra, cliente)
+
+    temporizador_precarga.timeout.connect(precargar)
+    for señal in (lista_resultados_tab1.itemSelectionChanged, lista_resultados_tab2.itemSelectionChanged,
+                  entrada_fecha_inicio.textChanged, entrada_fecha_fin.textChanged, entrada_ruta.textChanged,
+                  tabs.currentChanged):
+        señal.connect(lambda *args: temporizador_precarga.start())  # Reinicia la espera en cada cambio
+
+    # Autocompletado de barras y clientes mientras se escribe, sobre un vocabulario en memoria
+    # que se carga al enfocar el campo (el botón "Buscar" sigue filtrando por rango de fechas)
+    Autocompletado(entrada_cliente, entrada_ruta, 'clientes', estado=mensaje_estado_tab1)
+    Autocompletado(entrada_barra, entrada_ruta2, 'barras', estado=mensaje_estado_tab2)
+    Autocompletado(entrada_barra_tab3, entrada_ruta3, 'barras', estado=mensaje_estado_tab3)
+    Autocompletado(entrada_cliente3, entrada_ruta3, 'clientes', estado=mensaje_estado_tab3)
+
+    # Conectar botones a funciones: cada operación se encola en el pool de tareas con los
+    # valores actuales del formulario, y la ventana sigue respondiendo mientras se ejecuta
     boton_buscar_barra.clicked.connect(
-    lambda: buscar_barra(
-        entrada_ruta2.text(),
-        entrada_fecha_inicio_tab2.text(),
-        entrada_fecha_fin_tab2.text(),
-        entrada_barra.text(),
-        obtener_lista_resultados(),
-        escribir_mensaje))
-    
+        lambda: gestor_tareas.enviar(
+            f"Buscar barra {entrada_barra.text()}",
+            buscar_barra,
+            destino=obtener_mensaje_estado(),
+            entrada_ruta=entrada_ruta2.text(),
+            entrada_fecha_inicio=entrada_fecha_inicio_tab2.text(),
+            entrada_fecha_fin=entrada_fecha_fin_tab2.text(),
+            entrada_barra=entrada_barra.text(),
+            lista_resultados=obtener_lista_resultados()
+        )
+    )
+
     # Conexión del botón al método buscar_cliente
     boton_buscar_cliente.clicked.connect(
-        lambda: buscar_cliente(
-            entrada_ruta.text(),  # Ruta
-            entrada_fecha_inicio.text(),  # Fecha Inicio
-            entrada_fecha_fin.text(),  # Fecha Fin
-            entrada_cliente.text(),  # Cliente
-            obtener_lista_resultados(),  # Resultados
-            escribir_mensaje,  # Método para escribir en la barra de estado
-            contador_clientes_label  # Añadir el contador de clientes encontrados
+        lambda: gestor_tareas.enviar(
+            f"Buscar cliente {entrada_cliente.text()}",
+            buscar_cliente,
+            destino=obtener_mensaje_estado(),
+            entrada_ruta=entrada_ruta.text(),  # Ruta
+            entrada_fecha_inicio=entrada_fecha_inicio.text(),  # Fecha Inicio
+            entrada_fecha_fin=entrada_fecha_fin.text(),  # Fecha Fin
+            entrada_cliente=entrada_cliente.text(),  # Cliente
+            lista_resultados=obtener_lista_resultados(),  # Resultados
+            contador_clientes_label=contador_clientes_label  # Añadir el contador de clientes encontrados
         )
     )
     boton_obtener_data.clicked.connect(
-        lambda: (
-            obtener_data(
-                barra_seleccionada=barra_retiro,
-                barra_inyec=barra_inyeccion,
-                cliente_seleccionado=entrada_cliente.text(),
-                ruta_original=entrada_ruta3.text(),
-                fecha_inicio=entrada_fecha_inicio_tab3.text(),
-                fecha_fin=entrada_fecha_fin_tab3.text(),
-                lista_resultados=obtener_lista_resultados(),
-                escribir_mensaje=escribir_mensaje
-            ),
-            abrir_power_bi(powerExtraerData)
+        lambda: gestor_tareas.enviar(
+            "Comparación barras",
+            obtener_data,
+            destino=obtener_mensaje_estado(),
+            al_terminar=lambda: abrir_power_bi(powerExtraerData),
+            barra_seleccionada=barra_retiro,
+            barra_inyec=barra_inyeccion,
+            cliente_seleccionado=entrada_cliente.text(),
+            ruta_original=entrada_ruta3.text(),
+            fecha_inicio=entrada_fecha_inicio_tab3.text(),
+            fecha_fin=entrada_fecha_fin_tab3.text(),
+            lista_resultados=obtener_lista_resultados()
         )
     )
 
     boton_extraer_cmg.clicked.connect(
-        lambda: extraer_cmg(
+        lambda: gestor_tareas.enviar(
+            "Extraer CMg",
+            extraer_cmg,
+            destino=obtener_mensaje_estado(),
             lista_resultados=obtener_lista_resultados(),
             entrada_ruta=entrada_ruta.text(),
             entrada_fecha_inicio=entrada_fecha_inicio.text(),
-            entrada_fecha_fin=entrada_fecha_fin.text(),
-            escribir_mensaje=escribir_mensaje
+            entrada_fecha_fin=entrada_fecha_fin.text()
         )
     )
     boton_mostrar_consumo_xlsx.clicked.connect(
-        lambda: mostrar_consumo(
+        lambda: gestor_tareas.enviar(
+            "Exportar consumo a Excel",
+            mostrar_consumo,
+            destino=obtener_mensaje_estado(),
             lista_resultados=obtener_lista_resultados(),
             entrada_ruta=entrada_ruta.text(),
             entrada_fecha_inicio=entrada_fecha_inicio.text(),
             entrada_fecha_fin=entrada_fecha_fin.text(),
-            escribir_mensaje=escribir_mensaje,
             tipo_exportacion="excel"  # Exportar a Excel
         )
     )
 
     boton_mostrar_consumo_powerbi.clicked.connect(
-        lambda: (
-            mostrar_consumo(
-                lista_resultados=obtener_lista_resultados(),
-                entrada_ruta=entrada_ruta.text(),
-                entrada_fecha_inicio=entrada_fecha_inicio.text(),
-                entrada_fecha_fin=entrada_fecha_fin.text(),
-                escribir_mensaje=escribir_mensaje,
-                tipo_exportacion="powerbi"  # Exportar a Power BI
-            ),
-            abrir_power_bi(powerConsumoCli)  # Pasar archivo.pbix como argumento
+        lambda: gestor_tareas.enviar(
+            "Exportar consumo a Power BI",
+            mostrar_consumo,
+            destino=obtener_mensaje_estado(),
+            al_terminar=lambda: abrir_power_bi(powerConsumoCli),  # Abrir el .pbix al terminar la exportación
+            lista_resultados=obtener_lista_resultados(),
+            entrada_ruta=entrada_ruta.text(),
+            entrada_fecha_inicio=entrada_fecha_inicio.text(),
+            entrada_fecha_fin=entrada_fecha_fin.text(),
+            tipo_exportacion="powerbi"  # Exportar a Power BI
         )
     )
 
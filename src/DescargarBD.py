@@ -4,6 +4,9 @@ import tqdm
 from pathlib import Path
 from datetime import datetime, timedelta
 
+from ingesta import ingerir_zip, tipo_zip
+from manifiesto import marca_agua
+
 # Configuración inicial
 BASE_URL = "https://www.coordinador.cl/wp-content/uploads"
 DOWNLOAD_PATH = Path(r'C:\Users\elynnz\OneDrive - Grupo CGE\General CGE Cx\BaseDatos_CEN (CMg)\Practica\CGE_Automatización\CarpetaBDD')
@@ -110,22 +113,48 @@ def descargar_archivos(escribir_mensaje, lista_resultados, actualizar_estado):
         escribir_mensaje("No se encontró un archivo IVT válido en el rango de fechas.")
         return None
 
+    descargados = []
+
     # --- Descarga de CMG ---
     cmg_url = find_cmg_file()
     if cmg_url:
         cmg_file_name = cmg_url.split("/")[-1]
         if (DOWNLOAD_PATH / cmg_file_name).exists():
             escribir_mensaje(f"El archivo CMG ya existe: {DOWNLOAD_PATH / cmg_file_name}")
+            descargados.append((cmg_file_name, cmg_url))
         else:
             if download_with_progress(cmg_url, cmg_file_name, DOWNLOAD_PATH):
                 lista_resultados.append(cmg_file_name)
+                descargados.append((cmg_file_name, cmg_url))
 
     # --- Descarga de IVT ---
     ivt_url = find_ivt_file()
     if ivt_url:
         ivt_file_name = ivt_url.split("/")[-1]
-        if (DOWNLOAD_PATH / ivt_file_name).exists():
+        # El zip trae un solo mes (YYMM en el nombre): se omite si el manifiesto ya lo registra
+        yymm = ivt_file_name.split("_")[1]
+        ivt_mes = f"20{yymm[:2]}-{yymm[2:]}"
+        ivt_marca = marca_agua(DOWNLOAD_PATH.parent / 'All_Data', 'IVT_')
+        if ivt_marca is not None and ivt_mes <= ivt_marca:
+            escribir_mensaje(f"El mes {ivt_mes} de IVT ya está en All_Data (último registrado: {ivt_marca}).")
+        elif (DOWNLOAD_PATH / ivt_file_name).exists():
             escribir_mensaje(f"El archivo IVT ya existe: {DOWNLOAD_PATH / ivt_file_name}")
+            descargados.append((ivt_file_name, ivt_url))
         else:
             if download_with_progress(ivt_url, ivt_file_name, DOWNLOAD_PATH):
                 lista_resultados.append(ivt_file_name)
+                descargados.append((ivt_file_name, ivt_url))
+
+    # --- Ingesta de los zips a All_Data (el manifiesto omite los zips ya ingeridos y los
+    # meses hasta el último registrado) ---
+    for file_name, url in descargados:
+        escribir_mensaje(f"Convirtiendo {file_name} a parquet...")
+        actualizar_estado(f"Convirtiendo {file_name} a parquet...")
+        try:
+            escritos = ingerir_zip(DOWNLOAD_PATH / file_name, DOWNLOAD_PATH.parent / 'All_Data', tipo_zip(file_name), url=url,
+                                   incremental=True)
+            for ruta, filas in escritos.values():
+                escribir_mensaje(f"Archivo generado: {ruta} ({filas} filas)")
+        except Exception as e:
+            escribir_mensaje(f"Error al convertir {file_name}: {e}")
+
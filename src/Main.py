@@ -1,12 +1,14 @@
 # ------- Bloque de Importaciones ------- #
-import pandas as pd
-import xlwings as xw
-import numpy as np
 import time
 from pathlib import Path
 
-from bbdd_cmg import get_cmg_barra, busca_barra_cmg
+from concurrent.futures import ThreadPoolExecutor
+import polars as pl
+
+from bbdd_cmg import get_cmg_barra, get_cmg_barras, busca_barra_cmg
 from bbdd_cmg import get_ivt_cliente, busca_cliente_bdd
+from alineacion import remuestrear_cmg, remuestrear_consumo
+from progreso import OperacionCancelada
 
 # ------- Funciones de Validación ------- #
 
@@ -46,6 +48,9 @@ Return:
       Contiene las rutas de archivo y las celdas del Excel donde el usuario ingresa los datos de filtro para buscar en el CSV.
 """
 def inicio(opcion):
+    # xlwings solo se necesita cuando Main se llama desde Excel
+    import xlwings as xw
+
     wb = xw.Book.caller()
     hoja = wb.sheets['BBDD']
 
@@ -245,67 +250,95 @@ def get_cliente(destino, cliente, barraCliente, fecha_ini, fecha_fin):
 
 # ------- Método get_data ------- #
 """
-Descripción: Recoge los datos de CMG y los de consumo de los clientes, los combina, 
-y genera un archivo .parquet con los datos consolidados. Los resultados son exportados a Excel.
+Descripción: Recoge los datos de CMG de las barras de inyección y retiro y los de consumo de los clientes
+en una sola pasada: el CMg de ambas barras se lee una vez y el IVT se lee en paralelo. Los combina
+alineados por Fecha y guarda CMg_Iny, CMg_Ret, Consumo, Fecha y Data (combinado) en .parquet.
 
-Parámetros: Ninguno. Obtiene los datos necesarios directamente desde los métodos anteriores.
-
-Return: Ninguno. Los datos consolidados se guardan en un archivo .parquet y se exportan a Excel.
+Parámetros:
+    - destino: Carpeta de destino de los archivos (All_Data se busca en su carpeta padre).
+    - barraCliente: Nombre exacto de la barra de retiro del cliente.
+    - barraIny: Nombre exacto de la barra de inyección.
+    - clientes: Clientes a extraer (separados por comas).
+    - fecha_ini, fecha_fin: Rango en formato 'AAAA-MM'.
+    - progreso: (Opcional) Función que recibe un progreso.Avance por cada mes leído de CMg ('cmg') e IVT ('ivt');
+      se llama desde dos hilos.
+    - cancelacion: (Opcional) progreso.TokenCancelacion; al activarlo, ambas lecturas se detienen entre meses
+      y no se escriben archivos.
+
+Return: DataFrame combinado, o None si falla o se cancela la extracción.
 """
-# ------- Método get_data ------- #
-def get_data(destino, barraCliente, barraIny, clientes, fecha_ini, fecha_fin):
+def get_data(destino, barraCliente, barraIny, clientes, fecha_ini, fecha_fin, progreso=None, cancelacion=None):
     print("Iniciando el proceso get_data...")
     start_time = time.time()
+    destino = Path(destino)
 
-    # Obtener datos de CMG para barra de inyección
+    # Leer el IVT en un hilo mientras se lee el CMg de ambas barras en una sola pasada
     try:
-        cmg_start = time.time()
-        print("Obteniendo datos de CMg para barra de inyección...")
-        cmg_iny = get_cmg(destino, barraIny, fecha_ini, fecha_fin, tipo_barra="inyeccion").to_pandas()
-        # Verificar los nombres originales de las columnas
-        print("Nombres originales de las columnas:", cmg_iny.columns.tolist())
-        # Eliminar corchetes y limpiar espacios
-        cmg_iny.columns = cmg_iny.columns.str.replace(r"\[|\]", "", regex=True).str.strip()
-        # Renombrar la columna específica
-        cmg_iny.rename(columns={'CMg USD/MWh': 'CMg Iny USD/MWh'}, inplace=True)
-        # Configurar índices
-        cmg_iny.set_index(['Fecha', 'Barra'], inplace=True)
-        print(f"Extracción de CMg para barra de inyección completada en {time.time() - cmg_start:.2f} segundos.")
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            futuro_cli = pool.submit(get_ivt_cliente, destino, clientes, barraCliente, fecha_ini, fecha_fin,
+                                     progreso, cancelacion)
+            cmg = get_cmg_barras(destino, [barraIny, barraCliente], fecha_ini, fecha_fin,
+                                 progreso=progreso, cancelacion=cancelacion)
+            cli = futuro_cli.result()
+    except OperacionCancelada:
+        print("Proceso get_data cancelado.")
+        return
     except Exception as e:
-        print("Error al extraer datos de CMg para barra de inyección.")
+        print("Error al extraer datos de CMg y Clientes.")
         print(str(e))
         return
 
-    # Obtener datos de Clientes
-    try:
-        cli_start = time.time()
-        print("Obteniendo datos de Clientes...")
+    if cmg.is_empty() or cli.is_empty():
+        print("No se encontraron datos de CMg o de Clientes para los parámetros especificados.")
+        return
 
-        cli = get_cliente(destino, clientes, barraCliente, fecha_ini, fecha_fin).to_pandas()
-        cli.set_index(['Fecha', 'Barra'], inplace=True)
+    # Solo las barras seleccionadas: un término como "LA_CALERA" también calza con otras
+    # barras (013, 044, 110) y el cruce por Fecha multiplicaría las filas
+    def es_barra(barra):
+        return pl.col('Barra').str.to_uppercase() == barra.strip().upper()
 
-        print(f"Extracción de Clientes completada en {time.time() - cli_start:.2f} segundos.")
-    except Exception as e:
-        print("Error al extraer datos de Clientes.")
-        print(str(e))
+    cmg_iny = cmg.filter(es_barra(barraIny))
+    cmg_ret = cmg.filter(es_barra(barraCliente))
+    cli = cli.filter(es_barra(barraCliente))
+    if cmg_iny.is_empty() or cmg_ret.is_empty() or cli.is_empty():
+        print("No se encontraron datos de las barras seleccionadas (se requiere el nombre exacto de cada barra).")
         return
 
-    # Obtener datos de CMG para barra de retiro del cliente
-    try:
-        cmg_start = time.time()
-        print("Obteniendo datos de CMg para barra de retiro...")
+    # Archivos individuales, con el mismo formato que get_cmg y get_cliente
+    cmg_iny.write_parquet(destino / 'CMg_Iny.parquet')
+    cmg_ret.write_parquet(destino / 'CMg_Ret.parquet')
+    cli.write_parquet(destino / 'Consumo.parquet')
+    cli.select('Fecha').write_parquet(destino / 'Fecha.parquet')
 
-        cmg_ret = get_cmg(destino, barraCliente, fecha_ini, fecha_fin, tipo_barra="retiro").to_pandas()
-        # Renombrar columnas correctamente y eliminar corchetes
-        cmg_ret.columns = cmg_ret.columns.str.replace(r"\[|\]", "", regex=True)
-        cmg_ret.rename(columns={'CMg USD/MWh': 'CMg Retiro USD/MWh'}, inplace=True)
-        cmg_ret.set_index(['Fecha', 'Barra'], inplace=True)
+    data = combinar_data(cmg_iny, cmg_ret, cli)
+    data.write_parquet(destino / 'Data.parquet')
 
-        print(f"Extracción de CMg para barra de retiro completada en {time.time() - cmg_start:.2f} segundos.")
-    except Exception as e:
-        print("Error al extraer datos de CMg para barra de retiro.")
-        print(str(e))
-        return
-
-    # Tiempo total
     print(f"Proceso get_data completado en {time.time() - start_time:.2f} segundos.")
+    return data
+
+
+# ------- Método combinar_data ------- #
+def combinar_data(cmg_iny, cmg_ret, cli):
+    """
+    Alinea en una grilla horaria el consumo de los clientes con el CMg de las barras de inyección y retiro.
+
+    Parámetros:
+    - cmg_iny: CMg de la barra de inyección (Fecha, Barra, CMg [USD/MWh], USD).
+    - cmg_ret: CMg de la barra de retiro.
+    - cli: Consumo de los clientes (get_ivt_cliente).
+
+    Retorna:
+    - DataFrame con una fila por hora y cliente (consumo sumado en la hora) y las columnas
+      CMg Iny USD/MWh, CMg Retiro USD/MWh y USD de esa hora.
+    """
+    def por_fecha(cmg, nombre):
+        return remuestrear_cmg(cmg).select('Fecha', pl.col('CMg [USD/MWh]').alias(nombre), 'USD')
+
+    iny = por_fecha(cmg_iny, 'CMg Iny USD/MWh')
+    ret = por_fecha(cmg_ret, 'CMg Retiro USD/MWh').drop('USD')
+    return (
+        remuestrear_consumo(cli)
+        .join(iny, on='Fecha', how='left')
+        .join(ret, on='Fecha', how='left')
+        .sort('Fecha')
+    )
@@ -1,6 +1,8 @@
 import time
 from pathlib import Path
-from bbdd_cmg import busca_barra_cmg, busca_cliente_bdd
+from bbdd_cmg import busca_barra_cmg, busca_cliente_bdd, buscarClientesPorBarra
+from busqueda_trigramas import trigramas_barras, trigramas_clientes
+from progreso import OperacionCancelada
 
 def buscar_barra(
     entrada_ruta, 
@@ -35,6 +37,11 @@ def buscar_barra(
             results = [results]
         lista_resultados.addItems(results)
 
+        if not results:
+            sugerencias = sugerir_barras(entrada_ruta, barra)
+            if sugerencias:
+                escribir_mensaje(f"Sin coincidencias. ¿Quiso decir: {', '.join(sugerencias)}?")
+
         escribir_mensaje("Búsqueda completada.")
 
     except Exception as e:
@@ -77,6 +84,11 @@ def buscar_cliente(
         # Actualizar el contador de clientes encontrados
         contador_clientes_label.setText(f"Clientes Encontrados: {num_clientes}")
 
+        if not results:
+            sugerencias = sugerir_clientes(entrada_ruta, cliente)
+            if sugerencias:
+                escribir_mensaje(f"Sin coincidencias. ¿Quiso decir: {', '.join(sugerencias)}?")
+
         escribir_mensaje("Búsqueda de Cliente completada.")
 
         # Llamar a la función de agregar botones solo si no han sido agregados
@@ -85,3 +97,59 @@ def buscar_cliente(
         escribir_mensaje(f"Error: {e}. Verifica el esquema de los datos.")
     except Exception as e:
         escribir_mensaje(f"Error: {e}")
+
+
+def buscar_clientes_barra(
+    entrada_ruta,
+    entrada_fecha_inicio,
+    entrada_fecha_fin,
+    entrada_barra,
+    lista_resultados,
+    escribir_mensaje,
+    progreso=None,
+    cancelacion=None
+):
+    """
+    Busca los clientes asociados a una barra y los muestra en la lista de resultados.
+    progreso y cancelacion (opcionales) se pasan a buscarClientesPorBarra (ver progreso.py).
+    """
+    try:
+        lista_resultados.clear()
+
+        start_time = time.time()
+        clientes_asociados = buscarClientesPorBarra(
+            folder=Path(entrada_ruta),
+            barra_seleccionada=entrada_barra,
+            date_i=entrada_fecha_inicio,
+            date_f=entrada_fecha_fin,
+            progreso=progreso,
+            cancelacion=cancelacion
+        )
+        end_time = time.time()
+        escribir_mensaje(f"Clientes mostrados en {end_time - start_time:.2f} segundos.")
+
+        # Mostrar los resultados en el área de resultados
+        if clientes_asociados and not (len(clientes_asociados) == 1 and "Error" in clientes_asociados[0]):
+            lista_resultados.addItems(clientes_asociados)
+        else:
+            escribir_mensaje("No se encontraron clientes para la barra seleccionada.")
+    except OperacionCancelada:
+        escribir_mensaje("Búsqueda de clientes cancelada.")
+    except Exception as e:
+        escribir_mensaje(f"Error al manejar la selección de la barra: {str(e)}")
+
+
+def sugerir_barras(entrada_ruta, texto, k=10):
+    """
+    Sugerencias de barras para un texto parcial, usando el índice de trigramas del catálogo.
+    """
+    fder = Path(entrada_ruta).parent / 'All_Data'
+    return trigramas_barras(fder).buscar(texto, k=k)
+
+
+def sugerir_clientes(entrada_ruta, texto, k=10):
+    """
+    Sugerencias de clientes para un texto parcial, usando el índice de trigramas de clientes.
+    """
+    fder = Path(entrada_ruta).parent / 'All_Data'
+    return trigramas_clientes(fder).buscar(texto, k=k)
@@ -3,11 +3,14 @@ import time
 from pathlib import Path
 
 # --- Librerías de terceros ---
-from openpyxl import Workbook
+import polars as pl
 
 # --- Módulos propios ---
 from bbdd_cmg import get_cmg_barra, get_ivt_cliente, buscarClientesPorBarra
 from Main import get_data
+from alineacion import alinear_consumo_cmg
+from exportar_excel import escribir_excel
+from progreso import OperacionCancelada
 
 
 def obtener_data(
@@ -18,10 +21,13 @@ def obtener_data(
     fecha_inicio, 
     fecha_fin, 
     lista_resultados, 
-    escribir_mensaje
+    escribir_mensaje,
+    progreso=None,
+    cancelacion=None
 ):
     """
     Método para extraer datos con base en los parámetros seleccionados.
+    progreso y cancelacion (opcionales) se pasan a get_data (ver progreso.py).
     """
     try:
         escribir_mensaje("Extrayendo Data...")
@@ -51,9 +57,14 @@ def obtener_data(
             barraIny=barra_inyec,
             clientes=cliente_seleccionado,
             fecha_ini=fecha_inicio,
-            fecha_fin=fecha_fin
+            fecha_fin=fecha_fin,
+            progreso=progreso,
+            cancelacion=cancelacion
         )
         elapsed_time = time.time() - start_time
+        if cancelacion is not None and cancelacion.cancelado:
+            escribir_mensaje("Extracción cancelada.")
+            return
 
         # Mensaje de éxito
         escribir_mensaje(
@@ -71,10 +82,13 @@ def extraer_cmg(
     entrada_ruta,
     entrada_fecha_inicio,
     entrada_fecha_fin,
-    escribir_mensaje
+    escribir_mensaje,
+    progreso=None,
+    cancelacion=None
 ):
     """
     Extrae datos de Costos Marginales (CMg) con base en la barra seleccionada.
+    progreso y cancelacion (opcionales) se pasan a get_cmg_barra (ver progreso.py).
     """
     try:
         escribir_mensaje("Extrayendo Costos Marginales...")
@@ -101,7 +115,8 @@ def extraer_cmg(
         start_time = time.time()
 
         # Llamar a la función para extraer datos
-        cmg_data = get_cmg_barra(folder=ruta, barra=barra_seleccionada, date_i=fecha_inicio, date_f=fecha_fin)
+        cmg_data = get_cmg_barra(folder=ruta, barra=barra_seleccionada, date_i=fecha_inicio, date_f=fecha_fin,
+                                 progreso=progreso, cancelacion=cancelacion)
         escribir_mensaje(f"Parámetros de entrada: Barra: {barra_seleccionada}, Fecha Inicio: {fecha_inicio}, Fecha Fin: {fecha_fin}, Ruta: {ruta}")
 
         # Definir la ruta de destino del archivo
@@ -118,23 +133,9 @@ def extraer_cmg(
         # Guardar los datos en un archivo Excel
         save_start = time.time()
 
-        # Crear libro de Excel con openpyxl
-        workbook = Workbook()
-        sheet = workbook.active
-        sheet.title = "CMg Data"
-
-        # Escribir encabezados
-        for col_index, col_name in enumerate(cmg_data.columns, start=1):
-            sheet.cell(row=1, column=col_index, value=col_name)
-
-        # Escribir filas
-        for row_index, row in enumerate(cmg_data.rows(), start=2):
-            for col_index, value in enumerate(row, start=1):
-                sheet.cell(row=row_index, column=col_index, value=value)
-
-        # Guardar el archivo Excel
+        # Guardar el archivo Excel por bloques (tabla con formatos nativos y hojas de continuación)
         excel_path = output_folder_excel / f'CMG_{barra_seleccionada}.xlsx'
-        workbook.save(excel_path)
+        escribir_excel(cmg_data, excel_path, hoja="CMg Data")
         save_elapsed = time.time() - save_start
 
         end_time = time.time()
@@ -143,6 +144,8 @@ def extraer_cmg(
             f"Archivo guardado en {output_folder_excel}. "
             f"Tiempo de guardado: {save_elapsed:.2f} segundos."
         )
+    except OperacionCancelada:
+        escribir_mensaje("Extracción de CMg cancelada.")
     except Exception as e:
         escribir_mensaje(f"Error durante la extracción de CMg: {e}")
 
@@ -152,11 +155,14 @@ def mostrar_consumo(
     entrada_fecha_inicio,
     entrada_fecha_fin,
     escribir_mensaje,
-    tipo_exportacion
+    tipo_exportacion,
+    progreso=None,
+    cancelacion=None
 ):
     """
     Muestra el consumo de un cliente, extrae los costos marginales y guarda los datos en el formato indicado (Parquet o Excel).
     Si la exportación es para Power BI, genera archivos separados para consumo y costos marginales.
+    progreso y cancelacion (opcionales) se pasan a get_ivt_cliente y get_cmg_barra (ver progreso.py).
     """
     try:
         escribir_mensaje("Mostrando Consumo y Costos Marginales...")
@@ -193,8 +199,10 @@ def mostrar_consumo(
         start_time = time.time()
 
         # Llamar a las funciones para obtener los datos de consumo y costos marginales
-        consumo_data = get_ivt_cliente(folder=ruta, cliente=cliente_name, barra=barra_name, date_i=fecha_inicio, date_f=fecha_fin)
-        cmg_data = get_cmg_barra(folder=ruta, barra=barra_name, date_i=fecha_inicio, date_f=fecha_fin)
+        consumo_data = get_ivt_cliente(folder=ruta, cliente=cliente_name, barra=barra_name, date_i=fecha_inicio, date_f=fecha_fin,
+                                       progreso=progreso, cancelacion=cancelacion)
+        cmg_data = get_cmg_barra(folder=ruta, barra=barra_name, date_i=fecha_inicio, date_f=fecha_fin,
+                                 progreso=progreso, cancelacion=cancelacion)
 
         # Validar que los datos no estén vacíos
         if consumo_data.is_empty():
@@ -205,9 +213,12 @@ def mostrar_consumo(
             escribir_mensaje("No se encontraron datos de costos marginales para los parámetros especificados.")
             return
 
-        # Realizar el join entre consumo y costos marginales
-        # Asumimos que ambas tablas tienen una columna en común llamada 'Fecha'
-        combined_data = consumo_data.join(cmg_data, on="Fecha", how="inner")
+        # Alinear consumo (cada 15 minutos) y costos marginales (horarios) en una grilla horaria común,
+        # sin descartar horas de consumo; las horas sin CMg se informan como brechas
+        combined_data, brechas = alinear_consumo_cmg(consumo_data, cmg_data)
+        sin_cmg = brechas.filter(pl.col('tipo') == 'sin_cmg')
+        if not sin_cmg.is_empty():
+            escribir_mensaje(f"Advertencia: {sin_cmg['intervalos'].sum()} horas de consumo sin costo marginal en {sin_cmg.height} tramos.")
 
         # Definir la ruta de destino del archivo
         output_folder_parquet = ruta.parent / "CarpetaOut" / "Parquet"
@@ -215,27 +226,17 @@ def mostrar_consumo(
         output_folder_excel = ruta.parent / "CarpetaOut" / "Excel XLSX"
         output_folder_excel.mkdir(parents=True, exist_ok=True)
 
+        # No escribir archivos si se canceló durante la alineación
+        if cancelacion is not None:
+            cancelacion.verificar()
+
         if tipo_exportacion == "excel":
             # Exportar a Excel: Una única tabla combinada
             save_start = time.time()
 
-            # Crear archivo Excel con openpyxl
-            workbook = Workbook()
-            sheet = workbook.active
-            sheet.title = "Consumo y Costos Marginales"
-
-            # Escribir encabezados
-            for col_index, col_name in enumerate(combined_data.columns, start=1):
-                sheet.cell(row=1, column=col_index, value=col_name)
-
-            # Escribir filas
-            for row_index, row in enumerate(combined_data.rows(), start=2):
-                for col_index, value in enumerate(row, start=1):
-                    sheet.cell(row=row_index, column=col_index, value=value)
-
-            # Guardar el archivo Excel
+            # Guardar el archivo Excel por bloques (tabla con formatos nativos y hojas de continuación)
             excel_path = output_folder_excel / f'Consumo_CMG_{cliente_name}.xlsx'
-            workbook.save(excel_path)
+            escribir_excel(combined_data, excel_path, hoja="Consumo y Costos Marginales")
             save_elapsed = time.time() - save_start
 
             escribir_mensaje(f"Archivo Excel guardado en {excel_path}. Tiempo de guardado: {save_elapsed:.2f} segundos.")
@@ -244,11 +245,14 @@ def mostrar_consumo(
             # Exportar a Parquet: Archivos separados
             combined_path = output_folder_parquet / 'Consumo_CMG.parquet'
             combined_data.write_parquet(combined_path)
+            brechas.write_parquet(output_folder_parquet / 'Brechas.parquet')
 
             escribir_mensaje(f"Archivos Parquet guardados en {output_folder_parquet}.")
 
         end_time = time.time()
         escribir_mensaje(f"Consumo y costos marginales mostrados en {end_time - start_time:.2f} segundos.")
 
+    except OperacionCancelada:
+        escribir_mensaje("Exportación de consumo y costos marginales cancelada.")
     except Exception as e:
         escribir_mensaje(f"Error durante la obtención de consumo y costos marginales: {e}")
@@ -0,0 +1,134 @@
+import polars as pl
+
+# Columnas descriptivas del IVT que se conservan al remuestrear el consumo
+CLAVES_CONSUMO = ['Cliente', 'Barra', 'propietario', 'Tipo_Medida', 'clave']
+
+
+def remuestrear_consumo(consumo: pl.DataFrame, frecuencia: str = '1h'):
+    """
+    Lleva el consumo a una grilla regular sumando la energía de cada intervalo.
+
+    Los registros del IVT (cada 15 minutos) marcan el inicio de su intervalo, mientras que
+    el CMg se lee etiquetado con el fin de la hora (los meses de 2018 a 2022, que usan el
+    inicio, se convierten al leerlos; ver dataset_cmg.fechas_fin_hora); por eso cada
+    intervalo de la grilla se etiqueta con su fin (00:00-00:45 -> 01:00), igual que el CMg.
+
+    Args:
+        consumo (pl.DataFrame): Consumo con Fecha, Consumo [kWh] y columnas descriptivas.
+        frecuencia (str): Intervalo de la grilla (e.g., '1h').
+
+    Returns:
+        pl.DataFrame: Una fila por intervalo y cliente/barra, con Consumo [kWh] sumado y
+        la cantidad de registros originales en 'registros'.
+    """
+    claves = [c for c in CLAVES_CONSUMO if c in consumo.columns]
+    return (
+        consumo.with_columns(pl.col('Fecha').dt.truncate(frecuencia).dt.offset_by(frecuencia))
+        .group_by([*claves, 'Fecha'])
+        .agg(pl.col('Consumo [kWh]').sum(), pl.len().alias('registros'))
+        .sort('Fecha')
+    )
+
+
+def remuestrear_cmg(cmg: pl.DataFrame, frecuencia: str = '1h'):
+    """
+    Lleva el CMg a una grilla regular con un valor por barra e intervalo.
+
+    En la grilla horaria solo se eliminan las horas repetidas por el cambio de horario
+    (se conserva la última, como en el cubo); en grillas más gruesas se promedia.
+
+    Args:
+        cmg (pl.DataFrame): CMg con Fecha, Barra, CMg [USD/MWh] y USD.
+        frecuencia (str): Intervalo de la grilla.
+
+    Returns:
+        pl.DataFrame: Una fila por barra e intervalo, ordenada por Fecha.
+    """
+    if frecuencia == '1h':
+        return cmg.unique(subset=['Barra', 'Fecha'], keep='last', maintain_order=True).sort('Fecha')
+    return (
+        cmg.with_columns(pl.col('Fecha').dt.offset_by('-1h').dt.truncate(frecuencia).dt.offset_by(frecuencia))
+        .group_by(['Barra', 'Fecha'])
+        .agg(pl.col('CMg [USD/MWh]').mean(), pl.col('USD').mean())
+        .sort('Fecha')
+    )
+
+
+def alinear_consumo_cmg(consumo: pl.DataFrame, cmg: pl.DataFrame, frecuencia: str = '1h', tolerancia: str = None):
+    """
+    Alinea el consumo de los clientes con el CMg de su barra de retiro.
+
+    Ambas series se remuestrean a la misma grilla y se unen con un join as-of ordenado
+    por barra: cada intervalo de consumo toma el CMg de su mismo intervalo o, si falta,
+    el último anterior dentro de la tolerancia. Ninguna fila de consumo se descarta;
+    los intervalos sin CMg quedan nulos y se informan en el reporte de brechas.
+
+    Args:
+        consumo (pl.DataFrame): Consumo de get_ivt_cliente (Fecha, Barra, Cliente, Consumo [kWh], ...).
+        cmg (pl.DataFrame): CMg de get_cmg_barra (Fecha, Barra, CMg [USD/MWh], USD).
+        frecuencia (str): Intervalo de la grilla común.
+        tolerancia (str | None): Antigüedad máxima del CMg usado para un intervalo sin
+            dato propio (por defecto, ninguna: solo el mismo intervalo).
+
+    Returns:
+        tuple: (pl.DataFrame alineado con Fecha_CMg indicando el intervalo de CMg usado,
+        pl.DataFrame de brechas de reporte_brechas).
+    """
+    consumo = remuestrear_consumo(consumo, frecuencia)
+    cmg = remuestrear_cmg(cmg, frecuencia).select(
+        'Fecha', pl.col('Fecha').alias('Fecha_CMg'), 'Barra', 'CMg [USD/MWh]', 'USD'
+    )
+    alineado = consumo.join_asof(
+        cmg, on='Fecha', by='Barra', strategy='backward', tolerance=tolerancia or '0s', check_sortedness=False,
+    )
+    return alineado, reporte_brechas(alineado, frecuencia)
+
+
+def _tramos(df: pl.DataFrame, claves, frecuencia: str):
+    """Agrupa intervalos consecutivos de la grilla en tramos (desde, hasta, intervalos)."""
+    # Un tramo nuevo empieza cuando el intervalo anterior de la misma clave no es el contiguo
+    nuevo_tramo = (pl.col('Fecha').dt.offset_by(f'-{frecuencia}') != pl.col('Fecha').shift(1).over(claves)).fill_null(True)
+    return (
+        df.sort([*claves, 'Fecha'])
+        .with_columns(nuevo_tramo.cum_sum().over(claves).alias('tramo'))
+        .group_by([*claves, 'tramo'])
+        .agg(pl.col('Fecha').min().alias('desde'), pl.col('Fecha').max().alias('hasta'), pl.len().alias('intervalos'))
+        .drop('tramo')
+    )
+
+
+def reporte_brechas(alineado: pl.DataFrame, frecuencia: str = '1h'):
+    """
+    Reporta los intervalos de la grilla con datos faltantes en una alineación.
+
+    Args:
+        alineado (pl.DataFrame): Resultado de alinear_consumo_cmg.
+        frecuencia (str): Intervalo de la grilla.
+
+    Returns:
+        pl.DataFrame: Tramos consecutivos con columnas tipo ('sin_cmg' o 'sin_consumo'),
+        Cliente, Barra, desde, hasta e intervalos.
+    """
+    claves = [c for c in ('Cliente', 'Barra') if c in alineado.columns]
+    esquema = {'tipo': pl.String, **{c: pl.String for c in claves},
+               'desde': pl.Datetime('ns'), 'hasta': pl.Datetime('ns'), 'intervalos': pl.UInt32}
+    if alineado.is_empty():
+        return pl.DataFrame(schema=esquema)
+
+    # Intervalos con consumo pero sin CMg
+    sin_cmg = _tramos(alineado.filter(pl.col('CMg [USD/MWh]').is_null()).select(*claves, 'Fecha'), claves, frecuencia)
+
+    # Intervalos de la grilla sin ningún registro de consumo, entre el primero y el último de cada cliente
+    grilla = (
+        alineado.group_by(claves)
+        .agg(pl.datetime_range(pl.col('Fecha').min(), pl.col('Fecha').max(), frecuencia).alias('Fecha'))
+        .explode('Fecha')
+    )
+    sin_consumo = _tramos(
+        grilla.join(alineado.select(*claves, 'Fecha').unique(), on=[*claves, 'Fecha'], how='anti'), claves, frecuencia,
+    )
+
+    return pl.concat([
+        sin_cmg.with_columns(pl.lit('sin_cmg').alias('tipo')),
+        sin_consumo.with_columns(pl.lit('sin_consumo').alias('tipo')),
+    ]).select(list(esquema)).cast(esquema).sort(['tipo', *claves, 'desde'])
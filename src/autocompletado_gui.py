@@ -0,0 +1,95 @@
+from pathlib import Path
+import threading
+
+from PyQt5 import QtCore, QtWidgets
+
+from vocabulario import vocabulario_barras, vocabulario_clientes
+
+_CARGADORES = {'barras': vocabulario_barras, 'clientes': vocabulario_clientes}
+
+
+class Autocompletado(QtCore.QObject):
+    """
+    Sugerencias de barras o clientes mientras se escribe en un QLineEdit.
+
+    El vocabulario se carga en un hilo la primera vez que el campo recibe el foco (y se
+    recarga en los siguientes si su archivo de origen cambió, e.g., tras una ingesta o una
+    búsqueda que actualizó el índice). Al escribir, las sugerencias se calculan en memoria
+    cuando el usuario deja de teclear por un momento, sin leer archivos ni presionar "Buscar".
+
+    Args:
+        entrada (QLineEdit): Campo donde se escribe la barra o el cliente.
+        entrada_ruta (QLineEdit): Campo con la ruta de la carpeta base de datos.
+        tipo (str): 'barras' o 'clientes'.
+        retardo (int): Milisegundos sin teclear antes de actualizar las sugerencias.
+        k (int): Cantidad máxima de sugerencias.
+        estado (QTextEdit | None): Barra de estado donde se informan los errores de carga.
+    """
+    cargado = QtCore.pyqtSignal(object)  # Vocabulario
+    error = QtCore.pyqtSignal(str)       # Mensaje de error de la carga
+
+    def __init__(self, entrada, entrada_ruta, tipo: str, retardo: int = 150, k: int = 20, estado=None):
+        super().__init__(entrada)
+        self.entrada = entrada
+        self.entrada_ruta = entrada_ruta
+        self.cargador = _CARGADORES[tipo]
+        self.k = k
+        self.vocabulario = None
+        self._cargando = False
+
+        self.modelo = QtCore.QStringListModel(self)
+        self.completer = QtWidgets.QCompleter(self.modelo, self)
+        self.completer.setWidget(entrada)
+        # Las sugerencias ya vienen filtradas y ordenadas por el vocabulario
+        self.completer.setCompletionMode(QtWidgets.QCompleter.UnfilteredPopupCompletion)
+        self.completer.activated[str].connect(entrada.setText)
+
+        self.temporizador = QtCore.QTimer(self)
+        self.temporizador.setSingleShot(True)
+        self.temporizador.setInterval(retardo)
+        self.temporizador.timeout.connect(self.actualizar)
+
+        self.cargado.connect(self._cargado)
+        if estado is not None:
+            self.error.connect(estado.append)
+        entrada.textEdited.connect(lambda *args: self.temporizador.start())
+        entrada.installEventFilter(self)
+
+    def eventFilter(self, objeto, evento):
+        if objeto is self.entrada and evento.type() == QtCore.QEvent.FocusIn:
+            self.cargar()
+        return False
+
+    def cargar(self):
+        """Carga o refresca el vocabulario de la carpeta actual en segundo plano."""
+        if self._cargando:
+            return
+        self._cargando = True
+        folder = Path(self.entrada_ruta.text())
+        threading.Thread(target=self._cargar, args=(folder,), name='vocabulario', daemon=True).start()
+
+    def _cargar(self, folder: Path):
+        try:
+            vocabulario = self.cargador(folder)
+        except Exception as e:
+            self.error.emit(f'Error al cargar el vocabulario de {folder}: {e}')
+            vocabulario = None
+        self.cargado.emit(vocabulario)
+
+    def _cargado(self, vocabulario):
+        self._cargando = False
+        if vocabulario is None:
+            return
+        self.vocabulario = vocabulario
+        if self.entrada.hasFocus() and self.entrada.text():
+            self.actualizar()  # Lo escrito mientras se cargaba
+
+    def actualizar(self):
+        """Muestra las sugerencias para el texto actual del campo."""
+        texto = self.entrada.text()
+        sugerencias = self.vocabulario.completar(texto, self.k) if self.vocabulario is not None else []
+        if not sugerencias or sugerencias == [texto]:
+            self.completer.popup().hide()
+            return
+        self.modelo.setStringList(sugerencias)
+        self.completer.complete()
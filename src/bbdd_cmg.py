@@ -1,155 +1,383 @@
 from pathlib import Path
 import polars as pl
-import xlwings as xw    
-import duckdb
+import re
 import time
 
-def get_cmg_barra(folder: Path, barra: str, date_i: str, date_f: str):
+from dataset_cmg import etiqueta_inicio_hora, fechas_fin_hora, particion_vigente, ruta_legado, ruta_particion
+from catalogo_barras import actualizar_indice_meses, buscar_barras_rango, buscar_ids, patron_terminos, ruta_indice_meses
+from cubo_cmg import abrir_cubo
+from indice_clientes import actualizar_indice_clientes, buscar_clientes, clientes_por_barra
+from carga_paralela import concatenar_meses
+from rollups_cmg import actualizar_rollups, resumen_cmg
+from cache_resultados import cache_resultados, leer_con_cache, meses_sin_cache, normalizar_terminos
+from progreso import OperacionCancelada, Seguimiento
+
+def archivos_rango(folder: Path, tipo: str, date_i: str, date_f: str):
     """
-    Extrae los datos de CMg para una barra específica en un rango de fechas.
+    Lista los archivos mensuales de All_Data que existen dentro de un rango de fechas.
 
     Args:
         folder (Path): Ruta a la carpeta base de datos.
-        barra (str): Nombre de la barra a filtrar.
+        tipo (str): 'cmg' para CMg_YY_MM_def.parquet o 'ivt' para IVT_YY_MM.parquet.
         date_i (str): Fecha de inicio en formato 'AAAA-MM'.
         date_f (str): Fecha de fin en formato 'AAAA-MM'.
 
     Returns:
+        list: Tuplas (fecha 'AAAA-MM', Path) de los archivos encontrados, en orden cronológico.
+        Para CMg se prefiere el dataset particionado (CMg/year=/month=) y se usa el
+        archivo CMg_YY_MM_def.parquet si el mes no está compactado o si el legado se
+        reescribió después de compactarlo (ver dataset_cmg.particion_vigente).
     """
-    def recursive_load(rango_fechas, data):
-        try:
-            fecha = next(rango_fechas)
-        except StopIteration:
-            return data
-        
-        
+    fder = folder.parent / 'All_Data'
+    year_i, month_i = date_i.split('-')
+    year_f, month_f = date_f.split('-')
+
+    archivos = []
+    for fecha in crea_rango(year_i, month_i, year_f, month_f):
         year, month = fecha.split('-')
-        df_path = fder / f"CMg_{year[-2:]}_{month}_def.parquet"
-        archivo = f"CMg_{year[-2:]}_{month}_def.parquet"
-        print(f'Obteniendo datos de {archivo}')
+        if tipo == 'cmg':
+            particion = ruta_particion(fder, year, month)
+            if particion_vigente(ruta_legado(fder, year, month), particion):
+                archivos.append((fecha, particion))
+                continue
+            archivo = ruta_legado(fder, year, month).name
+        elif tipo == 'ivt':
+            archivo = f"IVT_{year[-2:]}_{month}.parquet"
+        else:
+            raise ValueError("El tipo de archivo debe ser 'cmg' o 'ivt'.")
+
+        if not (fder / archivo).exists():
+            print(f"Archivo no encontrado: {fder / archivo}")
+            continue
+        archivos.append((fecha, fder / archivo))
+    return archivos
 
-        if not df_path.exists():
-            print(f"Archivo no encontrado: {df_path}")
-            return recursive_load(rango_fechas, data)
 
-        # Carga el archivo y filtra por barra
-        df = pl.read_parquet(df_path)
-        barras = '|'.join([x.strip().upper() for x in barra.split(',')])
-        df = df.filter(pl.col('Barra').str.to_uppercase().str.contains(barras))
+def consulta_mes_cmg(ruta: Path, ids: dict, barras: str):
+    """
+    Consulta perezosa de CMg de un mes filtrada por barra.
 
-        return recursive_load(rango_fechas, data.vstack(df))
+    En los meses del dataset particionado se filtra por igualdad de barra_id con los IDs
+    ya resueltos en el catálogo; en los archivos legados se filtra por nombre. Ambos
+    casos entregan las columnas Fecha, Barra, CMg [USD/MWh] y USD, con Fecha etiquetada
+    al fin de cada hora, ordenadas por Barra y Fecha (las horas repetidas del cambio de
+    horario conservan su orden en el archivo, igual que en el cubo).
 
-    # Directorio base
-    fder = folder.parent / 'All_Data'
+    Args:
+        ruta (Path): Archivo del mes (particionado o legado).
+        ids (dict): {barra_id: Barra} resueltos con buscar_ids.
+        barras (str): Patrón de nombres (ver catalogo_barras.patron_terminos).
 
-    # Inicializar rango de fechas
-    year_i, month_i = date_i.split('-')
-    year_f, month_f = date_f.split('-')
-    rango_fechas = crea_rango(year_i, month_i, year_f, month_f)
+    Returns:
+        pl.LazyFrame: Consulta del mes.
+    """
+    lf = fechas_fin_hora(pl.scan_parquet(ruta), ruta)
+    if 'barra_id' in lf.collect_schema().names():
+        lf = lf.filter(pl.col('barra_id').is_in(list(ids))).select(
+            'Fecha',
+            pl.col('barra_id').replace_strict(ids, return_dtype=pl.String).alias('Barra'),
+            'CMg [USD/MWh]',
+            'USD',
+        )
+    else:
+        lf = lf.filter(pl.col('Barra').str.to_uppercase().str.contains(barras))
+    return lf.sort(['Barra', 'Fecha'], maintain_order=True)
+
+
+def escanear_particiones_cmg(archivos, ids: dict):
+    """
+    Lee varios meses del dataset particionado con una sola consulta perezosa.
+
+    Los meses particionados comparten esquema (barra_id) y etiquetas de fin de hora, por
+    lo que un único scan_parquet sobre la lista de archivos empuja el filtro por barra_id
+    a cada archivo y materializa una sola vez; el resultado se separa después por mes.
 
-    # Cargar datos
+    Args:
+        archivos (list): Tuplas (fecha, Path) de meses particionados con etiquetas de fin de hora.
+        ids (dict): {barra_id: Barra} resueltos con buscar_ids.
+
+    Returns:
+        dict: {Path: pl.DataFrame} con cada mes en el formato de consulta_mes_cmg.
+    """
+    rutas = [str(ruta) for _, ruta in archivos]
+    data = pl.scan_parquet(rutas, include_file_paths='archivo').filter(
+        pl.col('barra_id').is_in(list(ids))
+    ).select(
+        'archivo',
+        'Fecha',
+        pl.col('barra_id').replace_strict(ids, return_dtype=pl.String).alias('Barra'),
+        'CMg [USD/MWh]',
+        'USD',
+    ).collect()
+
+    partes = data.partition_by('archivo', as_dict=True, include_key=False)
+    vacio = data.drop('archivo').clear()
+    return {Path(ruta): partes.get((ruta,), vacio).sort(['Barra', 'Fecha'], maintain_order=True) for ruta in rutas}
+
+
+def get_cmg_barra(folder: Path, barra: str, date_i: str, date_f: str, progreso=None, cancelacion=None):
+    """
+    Extrae los datos de CMg para una barra específica en un rango de fechas.
+
+    Args:
+        folder (Path): Ruta a la carpeta base de datos.
+        barra (str): Nombre de la barra a filtrar.
+        date_i (str): Fecha de inicio en formato 'AAAA-MM'.
+        date_f (str): Fecha de fin en formato 'AAAA-MM'.
+        progreso (Callable | None): Recibe un progreso.Avance tras cada mes leído.
+        cancelacion (TokenCancelacion | None): Detiene la extracción entre meses
+            (lanza progreso.OperacionCancelada).
+
+    Returns:
+        pl.DataFrame: Filas de CMg de las barras que coinciden, en orden cronológico.
+    """
     start_time = time.time()
-    data = recursive_load(rango_fechas, pl.DataFrame())
-    elapsed_time = time.time() - start_time
 
-    print(f"Extracción de CMg para la barra '{barra}' completada en {elapsed_time:.2f} segundos.")
+    fder = folder.parent / 'All_Data'
+    archivos = archivos_rango(folder, 'cmg', date_i, date_f)
+    if not archivos:
+        return pl.DataFrame()
+
+    seguimiento = Seguimiento('cmg', archivos, progreso, cancelacion)
+    seguimiento.verificar()
+
+    # Repetir una extracción ya hecha sobre los mismos archivos se sirve desde la caché
+    data = cache_resultados(fder).obtener(
+        fder, 'cmg', normalizar_terminos(barra), date_i, date_f, archivos,
+        lambda: extraer_cmg_archivos(fder, archivos, barra, date_i, date_f, seguimiento),
+    )
+    seguimiento.terminar(data.height)
+
+    elapsed_time = time.time() - start_time
+    print(f"Extracción de CMg para la barra '{barra}' completada en {elapsed_time:.4f} segundos.")
     return data
 
 
+def extraer_cmg_archivos(fder: Path, archivos, barra: str, date_i: str, date_f: str, seguimiento=None):
+    """
+    Extrae el CMg de las barras desde los archivos del rango, sin pasar por la caché.
+
+    Se sirve desde el cubo mapeado en memoria si contiene todos los meses vigentes; si
+    no, los meses particionados se filtran en un solo escaneo y los legados, cada uno en
+    su escaneo y en paralelo (ver lector_mes_cmg); todo se une en orden cronológico.
+    Al ampliar un rango solo se escanean los meses que no están en la caché de meses.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        archivos (list): Tuplas (fecha, Path) de archivos_rango.
+        barra (str): Barras a filtrar, separadas por comas.
+        date_i (str): Fecha de inicio en formato 'AAAA-MM'.
+        date_f (str): Fecha de fin en formato 'AAAA-MM'.
+        seguimiento (Seguimiento | None): Avance y cancelación por mes.
+
+    Returns:
+        pl.DataFrame: Filas de CMg de las barras que coinciden.
+    """
+    cubo = abrir_cubo(fder)
+    if cubo is not None and cubo.vigente(archivos):
+        return cubo.a_dataframe(buscar_ids(fder, barra), date_i, date_f)
+
+    return concatenar_meses(archivos, lector_mes_cmg(fder, barra, seguimiento, archivos), seguimiento=seguimiento)
+
+
+def lector_mes_cmg(fder: Path, barra: str, seguimiento=None, archivos=()):
+    """
+    Función (fecha, ruta) -> mes de CMg filtrado por las barras, a través de la caché de meses.
+
+    Los meses ya filtrados con los mismos términos se toman de la caché; la usan la
+    extracción y la precarga, por lo que ambas comparten las mismas entradas. Los meses
+    particionados de archivos que faltan en la caché se leen de una vez, con
+    escanear_particiones_cmg; los demás (legados, con esquemas y etiquetas distintos)
+    se leen mes a mes en el pool de cargar_meses.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        barra (str): Barras a filtrar, separadas por comas.
+        seguimiento (Seguimiento | None): Registra los meses servidos desde la caché.
+        archivos (list): Tuplas (fecha, Path) que se leerán, para agrupar los particionados.
+
+    Returns:
+        Callable: Lector por mes para cargar_meses.
+    """
+    ids = buscar_ids(fder, barra)
+    barras = patron_terminos(barra)
+    filtro = ('cmg', tuple(normalizar_terminos(barra)))
+
+    particionados = [
+        (fecha, ruta) for fecha, ruta in meses_sin_cache(fder, filtro, archivos)
+        if ruta == ruta_particion(fder, *fecha.split('-')) and not etiqueta_inicio_hora(ruta)
+    ]
+    leidos = escanear_particiones_cmg(particionados, ids) if len(particionados) > 1 else {}
+
+    def leer(fecha, ruta):
+        data = leidos.pop(ruta, None)
+        return data if data is not None else consulta_mes_cmg(ruta, ids, barras).collect()
+
+    return leer_con_cache(fder, filtro, leer, seguimiento)
+
+
+
+def get_cmg_barras(folder: Path, barras, date_i: str, date_f: str, ancho: bool = False,
+                   progreso=None, cancelacion=None):
+    """
+    Extrae el CMg de varias barras en una sola pasada por los meses del rango.
+
+    Todas las barras se resuelven juntas en el catálogo y cada mes se lee una única vez
+    (o se sirve desde el cubo y las cachés), por lo que comparar 50 barras cuesta
+    prácticamente lo mismo que extraer una.
+
+    Args:
+        folder (Path): Ruta a la carpeta base de datos.
+        barras (list | str): Barras a extraer (lista o texto separado por comas).
+        date_i (str): Fecha de inicio en formato 'AAAA-MM'.
+        date_f (str): Fecha de fin en formato 'AAAA-MM'.
+        ancho (bool): Si es True, devuelve la matriz Fecha × Barra en vez del formato largo.
+        progreso (Callable | None): Recibe un progreso.Avance tras cada mes leído.
+        cancelacion (TokenCancelacion | None): Detiene la extracción entre meses.
+
+    Returns:
+        pl.DataFrame: Formato largo (Fecha, Barra, CMg [USD/MWh], USD) o, si ancho es True,
+        una fila por hora con USD y una columna de CMg por barra.
+    """
+    if isinstance(barras, str):
+        barras = barras.split(',')
+    data = get_cmg_barra(folder, ', '.join(normalizar_terminos(','.join(barras))), date_i, date_f,
+                         progreso, cancelacion)
+    return matriz_cmg(data) if ancho else data
+
+
+def matriz_cmg(data: pl.DataFrame):
+    """
+    Pivotea CMg en formato largo a una matriz con una fila por hora y una columna por barra.
+
+    En las horas repetidas por el cambio de horario se conserva el último valor, igual
+    que en el cubo.
+
+    Args:
+        data (pl.DataFrame): Columnas Fecha, Barra, CMg [USD/MWh] y USD.
+
+    Returns:
+        pl.DataFrame: Columnas Fecha, USD y una por barra, ordenadas por Fecha.
+    """
+    if data.is_empty():
+        return pl.DataFrame(schema={'Fecha': pl.Datetime('ns'), 'USD': pl.Float64})
+
+    matriz = data.pivot(on='Barra', index='Fecha', values='CMg [USD/MWh]',
+                        aggregate_function='last', sort_columns=True)
+    usd = data.group_by('Fecha').agg(pl.col('USD').last())
+    return usd.join(matriz, on='Fecha').sort('Fecha')
+
+
+def get_cmg_resumen(folder: Path, barra: str, date_i: str, date_f: str, frecuencia: str = '1mo'):
+    """
+    Extrae CMg resumido (promedio, mínimo y máximo) desde las tablas de resumen.
+
+    Se usa la tabla más gruesa que responde la frecuencia pedida ('1d', '1mo', '1y' o
+    'perfil'); con '1h' se devuelven las filas horarias de get_cmg_barra (de todas las
+    barras si barra es None). Los meses del rango que no estén resumidos o hayan
+    cambiado se resumen antes de consultar.
+
+    Args:
+        folder (Path): Ruta a la carpeta base de datos.
+        barra (str | None): Barras separadas por comas, o None para todas.
+        date_i (str): Fecha de inicio en formato 'AAAA-MM'.
+        date_f (str): Fecha de fin en formato 'AAAA-MM'.
+        frecuencia (str): Frecuencia del resultado.
+
+    Returns:
+        pl.DataFrame: Resumen por barra y período (ver rollups_cmg.resumen_cmg).
+    """
+    if frecuencia == '1h':
+        return get_cmg_barra(folder, barra or '', date_i, date_f)
+
+    start_time = time.time()
+    fder = folder.parent / 'All_Data'
+    actualizar_rollups(fder, archivos_rango(folder, 'cmg', date_i, date_f))
+    data = resumen_cmg(fder, barra, date_i, date_f, frecuencia)
+    print(f"Resumen de CMg ({frecuencia}) completado en {time.time() - start_time:.4f} segundos.")
+    return data
+
 
 
 # ------- get_ivt_cliente ------- #
-def get_ivt_cliente(folder: Path, cliente: str, barra: str, date_i: str, date_f: str):
-    def recursive_load(rango_fechas, data):
-        try:
-            fecha = next(rango_fechas)
-        except StopIteration:
-            return data
-
-        # Imprimir el mensaje de depuración con la fecha que se está procesando
-        year, month = fecha.split('-')
-        
-        # Solo leer el archivo si está dentro del rango de fechas especificado
-        if year > date_f.split('-')[0] or (year == date_f.split('-')[0] and int(month) > int(date_f.split('-')[1])):
-            return data
-        
-        fder = folder.parent / 'All_Data'
-        archivo = f"IVT_{year[-2:]}_{month}.parquet"
-        print(f'Obteniendo datos de {archivo}')
-        
-        try:
-            df = pl.read_parquet(fder / archivo)
-        except Exception as e:
-            print(f"Error al leer el archivo {archivo}: {e}")
-            return data
-
-        # Filtrar los datos según el cliente y la barra
-        cliente_regex = '|'.join([x.strip().upper() for x in cliente.split(',')])
-        barra_regex = barra.upper()  # Buscar la barra específica
-        df = df.filter(pl.col('Cliente').str.to_uppercase().str.contains(cliente_regex) & 
-                       pl.col('nombre_barra').str.to_uppercase().str.contains(barra_regex))
-
-        return recursive_load(rango_fechas, data.vstack(df))
+def consulta_mes_ivt(ruta: Path, cliente: str, barra: str):
+    """
+    Consulta perezosa de IVT de un mes filtrada por cliente y barra.
+
+    Args:
+        ruta (Path): Archivo IVT_YY_MM.parquet.
+        cliente (str): Clientes separados por comas.
+        barra (str): Barra del cliente.
+
+    Returns:
+        pl.LazyFrame: Consulta del mes.
+    """
+    return pl.scan_parquet(ruta).filter(
+        pl.col('Cliente').str.to_uppercase().str.contains(patron_terminos(cliente)) &
+        pl.col('nombre_barra').str.to_uppercase().str.contains(re.escape(barra.upper()))  # Buscar la barra específica
+    )
+
+
+def lector_mes_ivt(fder: Path, cliente: str, barra: str, seguimiento=None):
+    """
+    Función (fecha, ruta) -> mes de IVT filtrado por cliente y barra, a través de la caché de meses.
 
+    Args:
+        fder (Path): Carpeta All_Data.
+        cliente (str): Clientes separados por comas.
+        barra (str): Barra del cliente.
+        seguimiento (Seguimiento | None): Registra los meses servidos desde la caché.
+
+    Returns:
+        Callable: Lector por mes para cargar_meses (ver lector_mes_cmg).
+    """
+    return leer_con_cache(fder, ('ivt', tuple(normalizar_terminos(cliente)), barra.upper()),
+                          lambda fecha, ruta: consulta_mes_ivt(ruta, cliente, barra).collect(), seguimiento)
+
+
+def get_ivt_cliente(folder: Path, cliente: str, barra: str, date_i: str, date_f: str, progreso=None, cancelacion=None):
     start_time = time.time()
-    
-    # Dividir las fechas de inicio y fin
-    year_i, month_i = date_i.split('-')
-    year_f, month_f = date_f.split('-')
 
-    # Crear el rango de fechas
-    rango_fechas = crea_rango(year_i, month_i, year_f, month_f)
-    
-    # Llamar a la función recursiva para obtener los datos
-    data = recursive_load(rango_fechas, pl.DataFrame())
-    
+    archivos = archivos_rango(folder, 'ivt', date_i, date_f)
+    if not archivos:
+        return pl.DataFrame()
+
+    # Avance por mes y cancelación entre meses (ver get_cmg_barra)
+    seguimiento = Seguimiento('ivt', archivos, progreso, cancelacion)
+    seguimiento.verificar()
+
+    # Filtrar los datos según el cliente y la barra, un mes por hilo (o reutilizar
+    # la misma extracción ya guardada en la caché)
+    fder = folder.parent / 'All_Data'
+    data = cache_resultados(fder).obtener(
+        fder, 'ivt', [normalizar_terminos(cliente), barra.upper()], date_i, date_f, archivos,
+        lambda: concatenar_meses(archivos, lector_mes_ivt(fder, cliente, barra, seguimiento), seguimiento=seguimiento),
+    )
+    seguimiento.terminar(data.height)
+
     # Renombrar la columna 'nombre_barra' a 'Barra'
-    data = data.rename({'nombre_barra': 'Barra'})
-    
+    data = data.rename({'nombre_barra': 'Barra'}, strict=False)
+
     elapsed_time = time.time() - start_time
     print(f'Extracción de IVT cliente completada en {elapsed_time:.2f} segundos.')
-    
+
     return data
 
-# Busca clientes y barras específicos asociados en los datos de CMg para una fecha específica.
+# Busca clientes y las barras en que retiran energía dentro de un rango de fechas,
+# usando el índice invertido cliente <-> barra (indice_clientes.parquet).
 #
-# :param sh: Objeto de hoja de cálculo para mostrar mensajes de progreso.
 # :param folder: Carpeta base donde se encuentran los archivos de datos.
-# :param barra: Barras específicas para buscar (separadas por comas).
-# :param date_i: Fecha inicial 
+# :param cliente: Clientes específicos para buscar (separados por comas).
+# :param date_i: Fecha inicial en formato "YYYY-MM".
 # :param date_f: Fecha final en formato "YYYY-MM".
-# :return: Lista ordenada de barras encontradas.
+# :return: Lista de diccionarios {"Cliente", "Barra"} ordenada por cliente.
 def busca_cliente_bdd(folder: Path, cliente: str, date_i: str, date_f: str):
-    year_i, month_i = date_i.split('-')
-    year_f, month_f = date_f.split('-')
-    
-    # Ruta del archivo parquet
     fder = folder.parent / 'All_Data'
-    df = pl.read_parquet(fder / f"IVT_{year_f[-2:]}_{month_f}.parquet")  # Consolidado de los .parquet de las fechas de entrada
-
-    cliente = '|'.join([x.strip().upper() for x in cliente.split(',')])  # Adaptar la entrada
-    con = duckdb.connect()  # Conectar base de datos duckdb
-    con.register("clientes", df)  # Registrar df en la base de datos en una tabla "clientes"
-    
-    # Consulta SQL
-    query = f"SELECT DISTINCT Cliente, nombre_barra FROM clientes WHERE Cliente LIKE '%{cliente}%'"
-    results = con.execute(query).df()
-    
-    # Validación de columnas
-    if "Cliente" not in results.columns or "nombre_barra" not in results.columns:
-        raise ValueError("La consulta no devolvió las columnas esperadas: 'Cliente' y 'nombre_barra'")
-    
-    # Rellenar valores faltantes
-    results.fillna({"Cliente": "Desconocido", "nombre_barra": "Sin Barra"}, inplace=True)
-    
-    # Crear lista de resultados
-    results_list = []
-    for _, row in results.iterrows():
-        cliente = row.get("Cliente", "Desconocido")
-        barra = row.get("nombre_barra", "Sin Barra")
-        results_list.append({"Cliente": cliente, "Barra": barra})
-    
-    return results_list
+
+    # Indexar los meses de IVT del rango que aún no están en el índice de clientes
+    actualizar_indice_clientes(fder, archivos_rango(folder, 'ivt', date_i, date_f))
+
+    return buscar_clientes(fder, cliente, date_i, date_f)
 
 # Genera un rango de fechas en formato "YYYY-MM".
 #
@@ -172,7 +400,10 @@ def crea_rango(agno_i, mes_i, agno_f, mes_f):
 
 def busca_barra_cmg(folder: Path, barras: str, date_i: str, date_f: str):
     """
-    Busca múltiples barras en un archivo Parquet y devuelve una lista de coincidencias.
+    Busca múltiples barras en los meses del rango y devuelve una lista de coincidencias.
+
+    Si existe el índice de barras por mes (barras_meses.parquet) la búsqueda se
+    resuelve en memoria; si no, se consultan con DuckDB solo los archivos del rango.
 
     Args:
         folder (Path): Ruta base que contiene los datos.
@@ -183,26 +414,16 @@ def busca_barra_cmg(folder: Path, barras: str, date_i: str, date_f: str):
     Returns:
         list: Lista de barras encontradas.
     """
-    year_f, month_f = date_f.split('-')
     fder = folder.parent / 'All_Data'
-    # Cargar el archivo Parquet
-    df = pl.read_parquet(fder / f"CMg_{year_f[-2:]}_{month_f}_def.parquet")
-
-    # Preparar las barras para la búsqueda
-    barras = [barra.strip().upper() for barra in barras.split(',')]
 
-    # Crear una conexión con DuckDB
-    con = duckdb.connect()
-    con.register("barras", df)
+    # Responder desde el índice de barras por mes si ya fue construido
+    if ruta_indice_meses(fder).exists():
+        actualizar_indice_meses(fder, archivos_rango(folder, 'cmg', date_i, date_f))
+        return buscar_barras_rango(fder, barras, date_i, date_f)
 
-    # Buscar cada barra y acumular los resultados
-    all_results = set()
-    for barra in barras:
-        query = f"SELECT DISTINCT Barra FROM barras WHERE Barra LIKE '%{barra}%'"
-        results = con.execute(query).df()
-        all_results.update(results["Barra"].tolist())
-
-    return list(all_results)
+    # Si no, consulta parametrizada con DuckDB sobre los archivos del rango (duckdb se importa solo aquí)
+    from catalogo_duckdb import buscar_barras_duckdb
+    return buscar_barras_duckdb(fder, barras, archivos_rango(folder, 'cmg', date_i, date_f))
 
 def crea_rango(agno_i, mes_i, agno_f, mes_f):
     """
@@ -227,7 +448,8 @@ def crea_rango(agno_i, mes_i, agno_f, mes_f):
         else:
             mes_aux += 1
 
-def buscarClientesPorBarra(folder: Path, barra_seleccionada: str, date_i: str, date_f: str):
+def buscarClientesPorBarra(folder: Path, barra_seleccionada: str, date_i: str, date_f: str,
+                           progreso=None, cancelacion=None):
     """
     Busca los clientes asociados a una barra específica en los archivos Parquet dentro de un rango de fechas,
     y devuelve los clientes únicos encontrados en todos esos archivos.
@@ -237,58 +459,23 @@ def buscarClientesPorBarra(folder: Path, barra_seleccionada: str, date_i: str, d
         barra_seleccionada (str): Nombre de la barra seleccionada.
         date_i (str): Fecha inicial en formato 'YYYY-MM'.
         date_f (str): Fecha final en formato 'YYYY-MM'.
+        progreso (Callable | None): Recibe un progreso.Avance tras cada mes indexado.
+        cancelacion (TokenCancelacion | None): Detiene la indexación entre meses
+            (lanza progreso.OperacionCancelada).
 
     Returns:
         list: Lista de clientes únicos asociados a la barra seleccionada.
     """
     try:
-        # Extraer año y mes de las fechas de inicio y fin
-        year_i, month_i = date_i.split('-')
-        year_f, month_f = date_f.split('-')
-
-        # Lista para almacenar los clientes únicos encontrados
-        clientes_unicos = set()
-
-        # Iterar sobre el rango de fechas
-        for fecha in crea_rango(year_i, month_i, year_f, month_f):
-            # Construir la ruta del archivo Parquet para cada fecha (formato IVT_20_01.parquet)
-            fder = folder.parent / 'All_Data'
-            archivo_parquet = fder / f"IVT_{fecha.split('-')[0][2:]}_{fecha.split('-')[1]}.parquet"  # Formato: IVT_20_01.parquet
-            print(f"Buscando en archivo: {archivo_parquet}")
-
-            # Intentar leer el archivo Parquet
-            try:
-                df = pl.read_parquet(archivo_parquet)
-                print(f"Archivo {archivo_parquet} cargado correctamente.")
-
-                # Normalizar y filtrar por la barra seleccionada
-                barra_seleccionada_normalizada = barra_seleccionada.strip().upper()
-                df = df.with_columns(
-                    df["nombre_barra"].str.strip_chars().str.to_uppercase().alias("nombre_barra_normalizado")
-                )
-
-                # Filtrar las filas que coincidan con la barra seleccionada
-                df_filtrado = df.filter(df["nombre_barra_normalizado"] == barra_seleccionada_normalizada)
-
-                # Mostrar la cantidad de filas encontradas para esa barra
-                print(f"Cantidad de filas filtradas para la barra '{barra_seleccionada_normalizada}' en el archivo {archivo_parquet}: {len(df_filtrado)}")
-
-                # Si se encontraron filas, mostrar algunos detalles
-                if len(df_filtrado) > 0:
-                    print(f"Ejemplo de filas filtradas en el archivo {archivo_parquet}:")
-                    print(df_filtrado.head(5))  # Mostrar un ejemplo de las filas filtradas
-                    # Extraer los clientes únicos de la columna 'Cliente'
-                    clientes_unicos.update(df_filtrado["Cliente"].unique().to_list())
-                else:
-                    print(f"No se encontraron coincidencias para la barra '{barra_seleccionada_normalizada}' en el archivo {archivo_parquet}")
-
-            except Exception as e:
-                print(f"Error al procesar el archivo {archivo_parquet}: {e}")
-
-        # Convertir el conjunto de clientes únicos en una lista
-        clientes_unicos = list(clientes_unicos)
-
-        
+        fder = folder.parent / 'All_Data'
+
+        # Indexar los meses de IVT del rango que aún no están en el índice de clientes
+        archivos = archivos_rango(folder, 'ivt', date_i, date_f)
+        seguimiento = Seguimiento('indice_clientes', archivos, progreso, cancelacion)
+        actualizar_indice_clientes(fder, archivos, seguimiento)
+        seguimiento.terminar()
+        clientes_unicos = clientes_por_barra(fder, barra_seleccionada, date_i, date_f)
+
         # Validar resultados
         if not clientes_unicos:
             print("No se encontraron clientes para la barra seleccionada en el rango de fechas.")
@@ -296,6 +483,8 @@ def buscarClientesPorBarra(folder: Path, barra_seleccionada: str, date_i: str, d
 
         return clientes_unicos
 
+    except OperacionCancelada:
+        raise
     except Exception as e:
         print(f"Error al buscar clientes: {str(e)}")
         return [f"Error al buscar clientes: {str(e)}"]
@@ -0,0 +1,142 @@
+from collections import Counter, defaultdict
+from pathlib import Path
+import re
+
+from catalogo_barras import cargar_catalogo, ruta_catalogo
+from indice_clientes import cargar_indice_clientes, ruta_indice_clientes
+
+# Caché de índices construidos: {(tipo, carpeta): (firma del vocabulario, IndiceTrigramas)}
+_indices = {}
+
+
+def normalizar(texto: str):
+    """
+    Normaliza un nombre para la búsqueda: mayúsculas y separadores ('_', '.', '-', ...)
+    reemplazados por un único espacio. "LA_CALERA_____110" -> "LA CALERA 110".
+    """
+    return ' '.join(re.split(r'[^0-9A-ZÁÉÍÓÚÑÜ]+', texto.upper())).strip()
+
+
+def trigramas(texto: str):
+    """Trigramas de cada palabra del texto normalizado, con un espacio de relleno en los bordes."""
+    grams = Counter()
+    for palabra in texto.split():
+        palabra = f' {palabra} '
+        grams.update(palabra[i:i + 3] for i in range(len(palabra) - 2))
+    return grams
+
+
+class IndiceTrigramas:
+    """
+    Índice de trigramas sobre un vocabulario de nombres (barras o clientes).
+
+    Permite búsquedas por subcadena, con varios términos separados por ',' o '|', y
+    con tolerancia a errores de tipeo, ordenando los candidatos por similitud.
+    """
+
+    def __init__(self, vocabulario):
+        self.nombres = sorted(set(x for x in vocabulario if x))
+        self.normalizados = [normalizar(x) for x in self.nombres]
+        self.grams = [trigramas(x) for x in self.normalizados]
+        self.postings = defaultdict(list)
+        for i, grams in enumerate(self.grams):
+            for gram in grams:
+                self.postings[gram].append(i)
+
+    def _puntajes(self, termino: str):
+        """Puntaje de similitud de cada candidato para un término (sobre 1 si lo contiene)."""
+        termino = normalizar(termino)
+        if not termino:
+            return {}
+
+        # Coincidencias exactas por subcadena: puntaje sobre 1, mejor si el nombre es corto
+        puntajes = {
+            i: 1 + len(termino) / len(nombre)
+            for i, nombre in enumerate(self.normalizados)
+            if termino in nombre
+        }
+
+        # Coincidencias aproximadas: proporción de los trigramas del término presentes en el
+        # nombre, con la similitud de Dice como desempate para preferir nombres cortos
+        grams = trigramas(termino)
+        total = sum(grams.values())
+        comunes = Counter()
+        for gram, n in grams.items():
+            for i in self.postings.get(gram, ()):
+                comunes[i] += min(n, self.grams[i][gram])
+        for i, n in comunes.items():
+            if i not in puntajes:
+                dice = 2 * n / (total + sum(self.grams[i].values()))
+                puntajes[i] = 0.8 * n / total + 0.2 * dice
+        return puntajes
+
+    def buscar(self, consulta: str, k: int = 10, minimo: float = 0.3):
+        """
+        Busca los nombres más parecidos a la consulta.
+
+        Args:
+            consulta (str): Uno o más términos separados por ',' o '|' (e.g., "CALERA, POLPAICO").
+            k (int): Cantidad máxima de resultados.
+            minimo (float): Puntaje mínimo de las coincidencias aproximadas.
+
+        Returns:
+            list: Hasta k nombres, primero las coincidencias por subcadena y luego las aproximadas.
+        """
+        mejores = {}
+        for termino in re.split(r'[,|]', consulta):
+            for i, puntaje in self._puntajes(termino).items():
+                if puntaje >= minimo and puntaje > mejores.get(i, 0):
+                    mejores[i] = puntaje
+
+        orden = sorted(mejores, key=lambda i: (-mejores[i], self.nombres[i]))
+        return [self.nombres[i] for i in orden[:k]]
+
+    def contiene(self, consulta: str):
+        """Todos los nombres que contienen alguno de los términos de la consulta (sin aproximación)."""
+        encontrados = set()
+        for termino in re.split(r'[,|]', consulta):
+            termino = normalizar(termino)
+            if termino:
+                encontrados.update(n for n, norm in zip(self.nombres, self.normalizados) if termino in norm)
+        return sorted(encontrados)
+
+
+def _indice(tipo: str, fder: Path, firma, vocabulario):
+    """Reutiliza el índice de un vocabulario mientras su archivo de origen no cambie."""
+    cache = _indices.get((tipo, fder))
+    if cache is None or cache[0] != firma:
+        cache = (firma, IndiceTrigramas(vocabulario()))
+        _indices[(tipo, fder)] = cache
+    return cache[1]
+
+
+def trigramas_barras(fder: Path):
+    """
+    Índice de trigramas sobre el catálogo de barras (barras.parquet).
+
+    Args:
+        fder (Path): Carpeta All_Data.
+
+    Returns:
+        IndiceTrigramas: Índice de los nombres de barra.
+    """
+    ruta = ruta_catalogo(fder)
+    stat = ruta.stat() if ruta.exists() else None
+    firma = (stat.st_mtime_ns, stat.st_size) if stat else None
+    return _indice('barras', fder, firma, lambda: cargar_catalogo(fder)['Barra'].to_list())
+
+
+def trigramas_clientes(fder: Path):
+    """
+    Índice de trigramas sobre los clientes del índice de clientes (indice_clientes.parquet).
+
+    Args:
+        fder (Path): Carpeta All_Data.
+
+    Returns:
+        IndiceTrigramas: Índice de los nombres de cliente.
+    """
+    ruta = ruta_indice_clientes(fder)
+    stat = ruta.stat() if ruta.exists() else None
+    firma = (stat.st_mtime_ns, stat.st_size) if stat else None
+    return _indice('clientes', fder, firma, lambda: cargar_indice_clientes(fder)['Cliente'].drop_nulls().unique().to_list())
@@ -0,0 +1,338 @@
+from collections import OrderedDict
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import os
+import threading
+
+import polars as pl
+
+from dataset_cmg import fuente_mes
+from manifiesto import firma_archivo
+
+# Versión del formato de los resultados: forma parte de la clave, por lo que al cambiarla
+# las entradas anteriores dejan de usarse (2: Fecha del CMg en la convención de fin de hora)
+VERSION = 2
+
+# Tamaño máximo por defecto de la caché de resultados en disco
+MAX_BYTES = 512 * 1024 * 1024
+
+# Tamaño máximo por defecto de la caché de meses filtrados en memoria
+MAX_BYTES_MESES = 256 * 1024 * 1024
+
+# Cachés abiertas por carpeta: {carpeta: CacheResultados}
+_caches = {}
+_lock = threading.Lock()
+_cache_meses = None
+
+
+def carpeta_cache(fder: Path):
+    """
+    Carpeta de la caché de resultados de extracción.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+
+    Returns:
+        Path: All_Data/cache
+    """
+    return fder / 'cache'
+
+
+def normalizar_terminos(texto: str):
+    """Términos de búsqueda separados por comas, en mayúsculas, sin repetir y ordenados."""
+    return sorted(set(x.strip().upper() for x in texto.split(',') if x.strip()))
+
+
+class CacheResultados:
+    """
+    Caché en disco de extracciones completas (get_cmg_barra, get_ivt_cliente).
+
+    Cada resultado se guarda como Arrow IPC bajo una clave formada por el tipo de
+    consulta, sus términos normalizados, el rango de fechas y la firma de cada archivo
+    fuente (para los meses particionados, la de su CMg_YY_MM_def.parquet). Si un mes se
+    regenera su firma cambia, la clave deja de coincidir y la entrada antigua queda sin
+    uso hasta que la desaloja el LRU. La fecha de
+    modificación de cada entrada marca su último uso; al superar max_bytes se
+    eliminan las menos usadas recientemente.
+    """
+
+    def __init__(self, carpeta: Path, max_bytes: int = MAX_BYTES):
+        self.carpeta = carpeta
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+
+    def clave(self, fder: Path, tipo: str, terminos, date_i: str, date_f: str, archivos):
+        """
+        Clave de una consulta.
+
+        Args:
+            fder (Path): Carpeta All_Data.
+            tipo (str): Nombre de la consulta (e.g., 'cmg', 'ivt').
+            terminos (list): Términos normalizados de la consulta.
+            date_i (str): Fecha inicial 'AAAA-MM'.
+            date_f (str): Fecha final 'AAAA-MM'.
+            archivos (list): Tuplas (fecha, Path) de archivos_rango (ver dataset_cmg.fuente_mes).
+
+        Returns:
+            str: Hash hexadecimal de la consulta y de sus fuentes.
+        """
+        fuentes = [(fecha, fuente_mes(fder, fecha, ruta)) for fecha, ruta in archivos]
+        contenido = json.dumps({
+            'version': VERSION,
+            'tipo': tipo,
+            'terminos': terminos,
+            'rango': [date_i, date_f],
+            'fuentes': [[fecha, ruta.name, firma_archivo(fder, ruta)] for fecha, ruta in fuentes],
+        })
+        return hashlib.sha256(contenido.encode()).hexdigest()
+
+    def _ruta(self, clave: str):
+        return self.carpeta / f'{clave}.arrow'
+
+    def contiene(self, clave: str):
+        """Indica si hay un resultado guardado bajo la clave, sin leerlo."""
+        return self._ruta(clave).exists()
+
+    def leer(self, clave: str):
+        """Resultado guardado bajo la clave, o None si no está en la caché."""
+        ruta = self._ruta(clave)
+        try:
+            # Leer los bytes completos: el archivo puede ser desalojado por otro hilo
+            data = pl.read_ipc(ruta.read_bytes())
+            os.utime(ruta)  # Marcar como usado recientemente
+        except OSError:
+            with self._lock:
+                self.fallos += 1
+            return None
+        with self._lock:
+            self.aciertos += 1
+        return data
+
+    def guardar(self, clave: str, data: pl.DataFrame):
+        """Guarda un resultado y desaloja las entradas más antiguas si se supera el tamaño máximo."""
+        self.carpeta.mkdir(parents=True, exist_ok=True)
+        ruta = self._ruta(clave)
+        temporal = ruta.with_suffix(f'.{threading.get_ident()}.tmp')
+        data.write_ipc(temporal, compression='zstd')
+        temporal.replace(ruta)
+        self.desalojar()
+
+    def desalojar(self):
+        """Elimina las entradas menos usadas recientemente hasta quedar bajo max_bytes."""
+        entradas = []
+        for ruta in self.carpeta.glob('*.arrow'):
+            try:
+                stat = ruta.stat()
+            except FileNotFoundError:
+                continue
+            entradas.append((stat.st_mtime_ns, stat.st_size, ruta))
+
+        total = sum(tamano for _, tamano, _ in entradas)
+        for _, tamano, ruta in sorted(entradas):
+            if total <= self.max_bytes:
+                break
+            ruta.unlink(missing_ok=True)
+            total -= tamano
+
+    def obtener(self, fder: Path, tipo: str, terminos, date_i: str, date_f: str, archivos, calcular):
+        """
+        Devuelve el resultado de una consulta desde la caché o lo calcula y lo guarda.
+
+        Args:
+            calcular (Callable): Función sin argumentos que produce el pl.DataFrame.
+
+        Returns:
+            pl.DataFrame: Resultado de la consulta.
+        """
+        clave = self.clave(fder, tipo, terminos, date_i, date_f, archivos)
+        data = self.leer(clave)
+        if data is None:
+            data = calcular()
+            self.guardar(clave, data)
+        return data
+
+    def estadisticas(self):
+        """
+        Estadísticas de uso de la caché.
+
+        Returns:
+            dict: Aciertos y fallos de este proceso, entradas y bytes en disco.
+        """
+        tamanos = [ruta.stat().st_size for ruta in self.carpeta.glob('*.arrow')] if self.carpeta.exists() else []
+        consultas = self.aciertos + self.fallos
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+            'entradas': len(tamanos),
+            'bytes': sum(tamanos),
+            'max_bytes': self.max_bytes,
+        }
+
+    def limpiar(self):
+        """Elimina todas las entradas de la caché."""
+        for ruta in self.carpeta.glob('*.arrow'):
+            ruta.unlink(missing_ok=True)
+
+
+def cache_resultados(fder: Path):
+    """
+    Caché de resultados de una carpeta All_Data, compartida por todo el proceso.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+
+    Returns:
+        CacheResultados: Caché de la carpeta.
+    """
+    with _lock:
+        if fder not in _caches:
+            _caches[fder] = CacheResultados(carpeta_cache(fder))
+        return _caches[fder]
+
+
+
+class CacheMeses:
+    """
+    Caché en memoria de meses ya filtrados, con desalojo LRU por bytes.
+
+    La clave de cada entrada es (archivo del mes, firma del archivo, filtro normalizado),
+    de modo que al ampliar o desplazar un rango solo se leen los meses que aún no se
+    filtraron con ese mismo criterio.
+    """
+
+    def __init__(self, max_bytes: int = MAX_BYTES_MESES):
+        self.max_bytes = max_bytes
+        self.entradas = OrderedDict()
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+
+    def contiene(self, clave):
+        """Indica si hay un mes filtrado guardado bajo la clave, sin contarlo como uso."""
+        with self._lock:
+            return clave in self.entradas
+
+    def obtener(self, clave, calcular):
+        """
+        Devuelve el mes filtrado guardado bajo la clave o lo calcula y lo guarda.
+
+        Args:
+            clave (tuple): Clave del mes filtrado.
+            calcular (Callable): Función sin argumentos que produce el pl.DataFrame.
+
+        Returns:
+            pl.DataFrame: Mes filtrado.
+        """
+        with self._lock:
+            if clave in self.entradas:
+                self.entradas.move_to_end(clave)
+                self.aciertos += 1
+                return self.entradas[clave][0]
+            self.fallos += 1
+
+        data = calcular()
+        tamano = data.estimated_size()
+        with self._lock:
+            if clave not in self.entradas:
+                self.entradas[clave] = (data, tamano)
+                self.bytes += tamano
+            # Desalojar los meses menos usados recientemente (conservando el recién agregado)
+            while self.bytes > self.max_bytes and len(self.entradas) > 1:
+                _, (_, tamano_viejo) = self.entradas.popitem(last=False)
+                self.bytes -= tamano_viejo
+        return data
+
+    def limpiar(self):
+        """Elimina todas las entradas."""
+        with self._lock:
+            self.entradas.clear()
+            self.bytes = 0
+
+
+def cache_meses():
+    """
+    Caché de meses filtrados compartida por todo el proceso.
+
+    Returns:
+        CacheMeses: Caché de meses filtrados.
+    """
+    global _cache_meses
+    with _lock:
+        if _cache_meses is None:
+            _cache_meses = CacheMeses()
+        return _cache_meses
+
+
+def clave_mes(fder: Path, ruta: Path, filtro):
+    """Clave de un mes filtrado en la caché de meses: (archivo, firma del archivo, filtro)."""
+    return (str(ruta), firma_archivo(fder, ruta), filtro)
+
+
+def meses_sin_cache(fder: Path, filtro, archivos):
+    """
+    Meses cuyo resultado con el filtro dado aún no está en la caché de meses.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        filtro (Hashable): Filtro normalizado (ver leer_con_cache).
+        archivos (list): Tuplas (fecha, Path).
+
+    Returns:
+        list: Tuplas (fecha, Path) que habría que leer de disco.
+    """
+    cache = cache_meses()
+    return [(fecha, ruta) for fecha, ruta in archivos if not cache.contiene(clave_mes(fder, ruta, filtro))]
+
+
+def leer_con_cache(fder: Path, filtro, leer, seguimiento=None):
+    """
+    Envuelve una función de lectura por mes de cargar_meses para que use la caché de meses.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        filtro (Hashable): Filtro normalizado que aplica leer (e.g., ('cmg', ('LA_CALERA',))).
+        leer (Callable): Función (fecha, ruta) -> pl.DataFrame con el mes filtrado.
+        seguimiento (Seguimiento | None): Se le informan los meses servidos desde la caché,
+            que no cuentan como leídos de disco.
+
+    Returns:
+        Callable: Función (fecha, ruta) -> pl.DataFrame que reutiliza meses ya filtrados.
+    """
+    cache = cache_meses()
+
+    def leer_cacheado(fecha, ruta):
+        clave = clave_mes(fder, ruta, filtro)
+        leido = False
+
+        def calcular():
+            nonlocal leido
+            leido = True
+            return leer(fecha, ruta)
+
+        data = cache.obtener(clave, calcular)
+        if seguimiento is not None and not leido:
+            seguimiento.desde_cache(ruta)
+        return data
+
+    return leer_cacheado
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Muestra o limpia la caché de resultados de extracción.')
+    parser.add_argument('--ruta', type=Path, default=Path(__file__).parent,
+                        help='Carpeta base de datos (All_Data se busca en su carpeta padre).')
+    parser.add_argument('--limpiar', action='store_true', help='Elimina todas las entradas.')
+    args = parser.parse_args()
+
+    cache = cache_resultados(args.ruta.parent / 'All_Data')
+    if args.limpiar:
+        cache.limpiar()
+    estadisticas = cache.estadisticas()
+    print(f"{estadisticas['entradas']} entradas, {estadisticas['bytes'] / 1024 / 1024:.1f} MB "
+          f"(máximo {estadisticas['max_bytes'] / 1024 / 1024:.0f} MB).")
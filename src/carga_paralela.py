@@ -0,0 +1,75 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+import polars as pl
+
+# Hilos por defecto: uno por núcleo de la máquina
+MAX_HILOS = os.cpu_count() or 4
+
+
+def cargar_meses(archivos, leer, max_hilos: int = None, max_en_vuelo: int = None, seguimiento=None):
+    """
+    Lee y filtra meses en paralelo y los entrega en orden cronológico.
+
+    Cada mes se procesa con leer(fecha, ruta) en un pool de hilos (polars libera el GIL
+    mientras decodifica). Nunca hay más de max_en_vuelo meses enviados y aún no
+    consumidos, lo que acota la memoria usada por meses decodificados en espera.
+
+    Con un seguimiento (progreso.Seguimiento) se informa el avance tras cada mes y se
+    verifica la cancelación antes de leer y de entregar cada mes; al cancelar, los meses
+    aún no iniciados se descartan y se lanza progreso.OperacionCancelada.
+
+    Args:
+        archivos (list): Tuplas (fecha 'AAAA-MM', Path) en orden cronológico.
+        leer (Callable): Función (fecha, ruta) -> pl.DataFrame con el mes ya filtrado.
+        max_hilos (int): Tamaño del pool (por defecto, un hilo por núcleo).
+        max_en_vuelo (int): Máximo de meses en proceso a la vez (por defecto, 2 por hilo).
+        seguimiento (Seguimiento | None): Contadores de avance y token de cancelación.
+
+    Yields:
+        tuple: (fecha, ruta, pl.DataFrame) en el mismo orden de archivos.
+    """
+    max_hilos = max_hilos or min(MAX_HILOS, max(len(archivos), 1))
+    max_en_vuelo = max_en_vuelo or 2 * max_hilos
+
+    if seguimiento is not None:
+        leer_mes = leer
+
+        def leer(fecha, ruta):
+            seguimiento.verificar()
+            return leer_mes(fecha, ruta)
+
+    def entregar(fecha, ruta, futuro):
+        data = futuro.result()
+        if seguimiento is not None:
+            seguimiento.verificar()
+            seguimiento.mes(fecha, ruta, data)
+        return fecha, ruta, data
+
+    with ThreadPoolExecutor(max_workers=max_hilos) as pool:
+        en_vuelo = deque()
+        pendientes = iter(archivos)
+        try:
+            for fecha, ruta in pendientes:
+                en_vuelo.append((fecha, ruta, pool.submit(leer, fecha, ruta)))
+                if len(en_vuelo) >= max_en_vuelo:
+                    yield entregar(*en_vuelo.popleft())
+            while en_vuelo:
+                yield entregar(*en_vuelo.popleft())
+        finally:
+            for _, _, futuro in en_vuelo:
+                futuro.cancel()
+
+
+def concatenar_meses(archivos, leer, max_hilos: int = None, max_en_vuelo: int = None, seguimiento=None):
+    """
+    Lee los meses con cargar_meses y concatena los resultados en orden cronológico.
+
+    Returns:
+        pl.DataFrame: Meses filtrados concatenados (vacío si no hay archivos).
+    """
+    partes = [df for _, _, df in cargar_meses(archivos, leer, max_hilos, max_en_vuelo, seguimiento)]
+    if not partes:
+        return pl.DataFrame()
+    return pl.concat(partes, how='diagonal_relaxed')
@@ -0,0 +1,245 @@
+from pathlib import Path
+import re
+
+import polars as pl
+
+from carga_paralela import cargar_meses
+from manifiesto import firma_archivo
+
+# Caché en memoria del catálogo: {ruta: ((mtime, tamaño), DataFrame)}
+_catalogos = {}
+
+
+def ruta_catalogo(fder: Path):
+    """
+    Ruta del catálogo de barras dentro de All_Data.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+
+    Returns:
+        Path: All_Data/barras.parquet
+    """
+    return fder / 'barras.parquet'
+
+
+def cargar_catalogo(fder: Path):
+    """
+    Carga el catálogo de barras (barra_id Int32, Barra String).
+
+    El resultado se mantiene en memoria mientras el archivo no cambie.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+
+    Returns:
+        pl.DataFrame: Catálogo ordenado por barra_id (vacío si aún no existe).
+    """
+    ruta = ruta_catalogo(fder)
+    if not ruta.exists():
+        return pl.DataFrame(schema={'barra_id': pl.Int32, 'Barra': pl.String})
+
+    stat = ruta.stat()
+    firma = (stat.st_mtime_ns, stat.st_size)
+    cache = _catalogos.get(ruta)
+    if cache is None or cache[0] != firma:
+        cache = (firma, pl.read_parquet(ruta))
+        _catalogos[ruta] = cache
+    return cache[1]
+
+
+def actualizar_catalogo(fder: Path, nombres):
+    """
+    Agrega al catálogo las barras que aún no tienen ID.
+
+    Los IDs existentes nunca cambian: las barras nuevas reciben IDs correlativos a
+    partir del mayor ID registrado, asignados en orden alfabético.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        nombres (Iterable[str]): Nombres de barras encontrados en los datos.
+
+    Returns:
+        pl.DataFrame: Catálogo actualizado.
+    """
+    catalogo = cargar_catalogo(fder)
+    nuevas = sorted(set(nombres) - set(catalogo['Barra'].to_list()))
+    if not nuevas:
+        return catalogo
+
+    inicio = (catalogo['barra_id'].max() + 1) if catalogo.height else 0
+    agregadas = pl.DataFrame({
+        'barra_id': pl.Series(range(inicio, inicio + len(nuevas)), dtype=pl.Int32),
+        'Barra': nuevas,
+    })
+    catalogo = pl.concat([catalogo, agregadas])
+
+    ruta = ruta_catalogo(fder)
+    temporal = ruta.with_suffix('.tmp')
+    catalogo.write_parquet(temporal)
+    temporal.replace(ruta)
+    print(f'Catálogo de barras actualizado: {len(nuevas)} barras nuevas, {catalogo.height} en total.')
+    return catalogo
+
+
+def patron_terminos(texto: str):
+    """
+    Expresión regular que calza con cualquiera de los términos separados por comas.
+
+    Cada término se compara literalmente y en mayúsculas: caracteres como '(', '|' o '.'
+    en la entrada no se interpretan, igual que en la búsqueda de catalogo_duckdb. Los
+    términos vacíos se ignoran; sin términos, el patrón calza con todo.
+
+    Args:
+        texto (str): Términos separados por comas (e.g., "CALERA, POLPAICO").
+
+    Returns:
+        str: Patrón para str.contains sobre la columna en mayúsculas.
+    """
+    return '|'.join(re.escape(x.strip().upper()) for x in texto.split(',') if x.strip())
+
+
+def buscar_ids(fder: Path, barras: str):
+    """
+    Resuelve términos de búsqueda separados por comas a IDs del catálogo.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        barras (str): Términos separados por comas (e.g., "CALERA, POLPAICO").
+
+    Returns:
+        dict: {barra_id: Barra} de las barras cuyo nombre contiene literalmente alguno de los términos.
+    """
+    catalogo = cargar_catalogo(fder)
+    encontradas = catalogo.filter(pl.col('Barra').str.to_uppercase().str.contains(patron_terminos(barras)))
+    return dict(zip(encontradas['barra_id'].to_list(), encontradas['Barra'].to_list()))
+
+
+def codificar_barras(df: pl.DataFrame, catalogo: pl.DataFrame):
+    """
+    Reemplaza la columna Barra de un DataFrame de CMg por su barra_id.
+
+    Args:
+        df (pl.DataFrame): Datos con columna Barra.
+        catalogo (pl.DataFrame): Catálogo que contiene todas las barras de df.
+
+    Returns:
+        pl.DataFrame: Datos con barra_id (Int32) en la posición de Barra.
+    """
+    mapa = dict(zip(catalogo['Barra'].to_list(), catalogo['barra_id'].to_list()))
+    return df.with_columns(
+        pl.col('Barra').replace_strict(mapa, return_dtype=pl.Int32).alias('Barra')
+    ).rename({'Barra': 'barra_id'})
+
+
+# ------- Índice barra -> meses ------- #
+
+def ruta_indice_meses(fder: Path):
+    """
+    Ruta del índice de meses por barra dentro de All_Data.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+
+    Returns:
+        Path: All_Data/barras_meses.parquet
+    """
+    return fder / 'barras_meses.parquet'
+
+
+def cargar_indice_meses(fder: Path):
+    """
+    Carga el índice (barra_id, mes, firma) con las barras presentes en cada mes de CMg.
+
+    El resultado se mantiene en memoria mientras el archivo no cambie.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+
+    Returns:
+        pl.DataFrame: Índice de meses (vacío si aún no existe).
+    """
+    vacio = pl.DataFrame(schema={'barra_id': pl.Int32, 'mes': pl.String, 'firma': pl.String})
+    ruta = ruta_indice_meses(fder)
+    if not ruta.exists():
+        return vacio
+
+    stat = ruta.stat()
+    firma = (stat.st_mtime_ns, stat.st_size)
+    cache = _catalogos.get(ruta)
+    if cache is None or cache[0] != firma:
+        cache = (firma, pl.read_parquet(ruta))
+        _catalogos[ruta] = cache
+
+    # Un índice con otro esquema se descarta y se reconstruye en la próxima actualización
+    return cache[1] if cache[1].schema == vacio.schema else vacio
+
+
+def actualizar_indice_meses(fder: Path, archivos):
+    """
+    Indexa las barras de los meses nuevos o modificados.
+
+    Solo se leen los meses cuyo archivo no está en el índice o cambió desde la última
+    indexación (según su firma en el manifiesto); el resto del índice se conserva tal cual.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        archivos (list): Tuplas (fecha 'AAAA-MM', Path) de los archivos CMg a considerar.
+
+    Returns:
+        pl.DataFrame: Índice actualizado.
+    """
+    indice = cargar_indice_meses(fder)
+    vigentes = dict(indice.select('mes', 'firma').unique().iter_rows())
+
+    pendientes = [(fecha, ruta) for fecha, ruta in archivos if vigentes.get(fecha) != firma_archivo(fder, ruta)]
+    if not pendientes:
+        return indice
+
+    def leer_barras(fecha, ruta):
+        lf = pl.scan_parquet(ruta)
+        columna = 'barra_id' if 'barra_id' in lf.collect_schema().names() else 'Barra'
+        return lf.select(pl.col(columna).unique()).collect()
+
+    nuevos = []
+    for fecha, ruta, df in cargar_meses(pendientes, leer_barras):
+        columna = df.columns[0]
+        barras = df[columna]
+        if columna == 'Barra':
+            catalogo = actualizar_catalogo(fder, barras.to_list())
+            barras = codificar_barras(pl.DataFrame({'Barra': barras}), catalogo)['barra_id']
+        nuevos.append(pl.DataFrame({
+            'barra_id': barras.cast(pl.Int32),
+            'mes': fecha,
+            'firma': firma_archivo(fder, ruta),
+        }))
+
+    meses = [fecha for fecha, _ in pendientes]
+    indice = pl.concat([indice.filter(~pl.col('mes').is_in(meses)), *nuevos]).sort(['mes', 'barra_id'])
+
+    ruta = ruta_indice_meses(fder)
+    temporal = ruta.with_suffix('.tmp')
+    indice.write_parquet(temporal)
+    temporal.replace(ruta)
+    print(f'Índice de barras actualizado: {len(pendientes)} meses indexados.')
+    return indice
+
+
+def buscar_barras_rango(fder: Path, barras: str, date_i: str, date_f: str):
+    """
+    Busca barras por nombre entre las presentes en algún mes del rango, sin leer datos de CMg.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        barras (str): Términos separados por comas (e.g., "CALERA, POLPAICO").
+        date_i (str): Fecha inicial en formato 'AAAA-MM'.
+        date_f (str): Fecha final en formato 'AAAA-MM'.
+
+    Returns:
+        list: Nombres de barras encontrados, ordenados alfabéticamente.
+    """
+    ids = buscar_ids(fder, barras)
+    presentes = cargar_indice_meses(fder).filter(
+        pl.col('mes').is_between(pl.lit(date_i), pl.lit(date_f)) & pl.col('barra_id').is_in(list(ids))
+    )['barra_id'].unique().to_list()
+    return sorted(ids[barra_id] for barra_id in presentes)
@@ -0,0 +1,135 @@
+from contextlib import contextmanager
+from pathlib import Path
+import queue
+import threading
+
+import duckdb
+
+from catalogo_barras import ruta_catalogo
+from dataset_cmg import ruta_particion
+
+# Pools abiertos por carpeta All_Data: {carpeta: PoolDuckDB}
+_pools = {}
+_lock = threading.Lock()
+
+
+def ruta_catalogo_duckdb(fder: Path):
+    """
+    Ruta de la base DuckDB de All_Data.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+
+    Returns:
+        Path: All_Data/cge.duckdb
+    """
+    return fder / 'cge.duckdb'
+
+
+class PoolDuckDB:
+    """
+    Conexiones reutilizables a la base DuckDB de All_Data.
+
+    Las consultas leen directamente los parquet mensuales que reciben como parámetro,
+    de modo que solo se abren los meses del rango. Las conexiones del pool son cursores
+    de una misma instancia y se entregan de a una por hilo con conexion().
+    """
+
+    def __init__(self, fder: Path, tamano: int = 4):
+        try:
+            self.base = duckdb.connect(str(ruta_catalogo_duckdb(fder)))
+        except duckdb.IOException:
+            # La base está tomada por otro proceso: usar un catálogo en memoria
+            self.base = duckdb.connect()
+        # Las bases creadas antes guardaban vistas sobre un glob de todos los meses
+        self.base.execute('DROP VIEW IF EXISTS cmg')
+        self.base.execute('DROP VIEW IF EXISTS ivt')
+
+        self.libres = queue.Queue()
+        for _ in range(tamano):
+            self.libres.put(self.base.cursor())
+
+    @contextmanager
+    def conexion(self):
+        """Presta una conexión del pool mientras dura el bloque with."""
+        con = self.libres.get()
+        try:
+            yield con
+        finally:
+            self.libres.put(con)
+
+    def consultar(self, sql: str, parametros=()):
+        """
+        Ejecuta una consulta parametrizada y devuelve sus filas.
+
+        Los valores (incluidas las listas de archivos) viajan como parámetros, nunca
+        dentro del texto SQL.
+
+        Args:
+            sql (str): Consulta con marcadores '?'.
+            parametros (Sequence): Valores de los marcadores.
+
+        Returns:
+            list: Filas como tuplas.
+        """
+        with self.conexion() as con:
+            return con.execute(sql, list(parametros)).fetchall()
+
+
+def pool_duckdb(fder: Path):
+    """
+    Pool de conexiones de una carpeta All_Data, creado en el primer uso y reutilizado después.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+
+    Returns:
+        PoolDuckDB: Pool de la carpeta.
+    """
+    with _lock:
+        if fder not in _pools:
+            _pools[fder] = PoolDuckDB(fder)
+        return _pools[fder]
+
+
+def _condicion_terminos(columna: str, terminos):
+    """Condición 'contiene alguno de los términos' con un marcador por término."""
+    return '(' + ' OR '.join([f'contains(upper({columna}), ?)' for _ in terminos]) + ')'
+
+
+def buscar_barras_duckdb(fder: Path, barras: str, archivos):
+    """
+    Busca barras por nombre en los archivos mensuales de CMg dados.
+
+    Cada término separado por comas se compara literalmente (sin comodines), de modo
+    que caracteres como '_', '%' o '|' en la entrada no alteran la consulta. Solo se leen
+    los archivos recibidos; los meses particionados, que guardan barra_id, se resuelven
+    con el catálogo de barras.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        barras (str): Términos separados por comas.
+        archivos (list): Tuplas (fecha 'AAAA-MM', Path) de archivos_rango.
+
+    Returns:
+        list: Barras encontradas, ordenadas alfabéticamente.
+    """
+    terminos = [x.strip().upper() for x in barras.split(',') if x.strip()]
+    if not terminos or not archivos:
+        return []
+
+    legados, particiones = [], []
+    for fecha, ruta in archivos:
+        (particiones if ruta == ruta_particion(fder, *fecha.split('-')) else legados).append(ruta.as_posix())
+
+    fuentes, parametros = [], []
+    if legados:
+        fuentes.append('SELECT Barra FROM read_parquet(?)')
+        parametros.append(legados)
+    if particiones:
+        fuentes.append('SELECT c.Barra FROM read_parquet(?) p JOIN read_parquet(?) c USING (barra_id)')
+        parametros += [particiones, ruta_catalogo(fder).as_posix()]
+
+    sql = (f"SELECT DISTINCT Barra FROM ({' UNION ALL '.join(fuentes)}) "
+           f"WHERE {_condicion_terminos('Barra', terminos)} ORDER BY Barra")
+    return [fila[0] for fila in pool_duckdb(fder).consultar(sql, [*parametros, *terminos])]
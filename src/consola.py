@@ -0,0 +1,156 @@
+"""
+Interfaz de línea de comandos para las búsquedas y extracciones de bbdd_cmg y Main.
+
+Permite ejecutar las mismas operaciones de la aplicación sin interfaz gráfica ni Excel
+(e.g., en tareas programadas en un servidor Linux). Cada subcomando importa solo los
+módulos que necesita, por lo que una búsqueda no carga PyQt5, xlwings, openpyxl ni duckdb.
+
+Ejemplos:
+    python consola.py barra "SALADILLO, LA_CALERA" 2024-01 2024-03
+    python consola.py cliente CODELCO 2024-01 2024-03
+    python consola.py cmg SALADILLO_____066 2024-01 2024-03 --salida cmg.xlsx
+    python consola.py consumo "CODELCO ANDINA" SALADILLO_____066 2024-01 2024-03
+    python consola.py data SALADILLO_____066 LA_CALERA_____110 "CODELCO ANDINA" 2024-01 2024-03
+"""
+from pathlib import Path
+import argparse
+import sys
+import time
+
+
+def _guardar(data, salida: Path):
+    """Guarda un DataFrame según la extensión de salida (.parquet, .csv o .xlsx)."""
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    if salida.suffix.lower() == '.xlsx':
+        from exportar_excel import escribir_excel
+        escribir_excel(data, salida)
+    elif salida.suffix.lower() == '.csv':
+        data.write_csv(salida)
+    else:
+        data.write_parquet(salida)
+    print(f'{data.height} filas guardadas en {salida}.')
+
+
+def _mostrar_avance(avance):
+    """Callback de progreso: una línea por mes leído en la salida de errores."""
+    print(avance, file=sys.stderr)
+
+
+def _salida_por_defecto(ruta: Path, nombre: str):
+    """Archivo parquet en CarpetaOut/Parquet, como los que genera la aplicación."""
+    return ruta.parent / 'CarpetaOut' / 'Parquet' / f'{nombre}.parquet'
+
+
+def comando_barra(args):
+    from bbdd_cmg import busca_barra_cmg
+
+    for barra in busca_barra_cmg(args.ruta, args.barras, args.desde, args.hasta):
+        print(barra)
+
+
+def comando_cliente(args):
+    from bbdd_cmg import busca_cliente_bdd
+
+    for fila in busca_cliente_bdd(args.ruta, args.cliente, args.desde, args.hasta):
+        print(f"{fila['Cliente']} (Barra: {fila['Barra']})")
+
+
+def comando_clientes_barra(args):
+    from bbdd_cmg import buscarClientesPorBarra
+
+    for cliente in buscarClientesPorBarra(args.ruta, args.barra, args.desde, args.hasta, progreso=_mostrar_avance):
+        print(cliente)
+
+
+def comando_cmg(args):
+    from bbdd_cmg import get_cmg_barra
+
+    data = get_cmg_barra(args.ruta, args.barra, args.desde, args.hasta, progreso=_mostrar_avance)
+    if data.is_empty():
+        print('No se encontraron datos de costos marginales para los parámetros especificados.')
+        return 1
+    _guardar(data, args.salida or _salida_por_defecto(args.ruta, 'Cmg'))
+
+
+def comando_consumo(args):
+    from bbdd_cmg import get_ivt_cliente
+
+    data = get_ivt_cliente(args.ruta, args.cliente, args.barra, args.desde, args.hasta, progreso=_mostrar_avance)
+    if data.is_empty():
+        print('No se encontraron datos de consumo para los parámetros especificados.')
+        return 1
+    _guardar(data, args.salida or _salida_por_defecto(args.ruta, 'Consumo'))
+
+
+def comando_data(args):
+    from Main import get_data
+
+    destino = args.ruta.parent / 'CarpetaOut'
+    destino.mkdir(parents=True, exist_ok=True)
+    data = get_data(destino=destino, barraCliente=args.barra_retiro, barraIny=args.barra_inyeccion,
+                    clientes=args.clientes, fecha_ini=args.desde, fecha_fin=args.hasta, progreso=_mostrar_avance)
+    if data is None:
+        return 1
+
+
+def crear_parser():
+    """Parser de argumentos con un subcomando por operación."""
+    parser = argparse.ArgumentParser(description='Búsqueda y extracción de CMg y consumo de clientes sin interfaz gráfica.')
+    parser.add_argument('--ruta', type=Path, default=Path(__file__).parent,
+                        help='Carpeta base de datos (All_Data y CarpetaOut se buscan en su carpeta padre).')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    def rango(sub):
+        sub.add_argument('desde', help="Mes inicial 'AAAA-MM'.")
+        sub.add_argument('hasta', help="Mes final 'AAAA-MM'.")
+
+    sub = subparsers.add_parser('barra', help='Busca barras de CMg (términos separados por comas).')
+    sub.add_argument('barras')
+    rango(sub)
+    sub.set_defaults(funcion=comando_barra)
+
+    sub = subparsers.add_parser('cliente', help='Busca clientes en el IVT y su barra de retiro.')
+    sub.add_argument('cliente')
+    rango(sub)
+    sub.set_defaults(funcion=comando_cliente)
+
+    sub = subparsers.add_parser('clientes-barra', help='Lista los clientes que retiran en una barra.')
+    sub.add_argument('barra')
+    rango(sub)
+    sub.set_defaults(funcion=comando_clientes_barra)
+
+    sub = subparsers.add_parser('cmg', help='Extrae el CMg horario de una barra.')
+    sub.add_argument('barra')
+    rango(sub)
+    sub.add_argument('--salida', type=Path, default=None,
+                     help='Archivo .parquet, .csv o .xlsx (por defecto, CarpetaOut/Parquet/Cmg.parquet).')
+    sub.set_defaults(funcion=comando_cmg)
+
+    sub = subparsers.add_parser('consumo', help='Extrae el consumo de un cliente en una barra.')
+    sub.add_argument('cliente')
+    sub.add_argument('barra')
+    rango(sub)
+    sub.add_argument('--salida', type=Path, default=None,
+                     help='Archivo .parquet, .csv o .xlsx (por defecto, CarpetaOut/Parquet/Consumo.parquet).')
+    sub.set_defaults(funcion=comando_consumo)
+
+    sub = subparsers.add_parser('data', help='Ejecuta get_data: CMg de inyección y retiro con el consumo de los clientes.')
+    sub.add_argument('barra_retiro')
+    sub.add_argument('barra_inyeccion')
+    sub.add_argument('clientes')
+    rango(sub)
+    sub.set_defaults(funcion=comando_data)
+
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    start_time = time.time()
+    codigo = args.funcion(args) or 0
+    print(f'Comando {args.comando} completado en {time.time() - start_time:.2f} segundos.', file=sys.stderr)
+    return codigo
+
+
+if __name__ == '__main__':
+    sys.exit(main())
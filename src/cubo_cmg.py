@@ -0,0 +1,297 @@
+from pathlib import Path
+import argparse
+import json
+import time
+
+import numpy as np
+import polars as pl
+
+from catalogo_barras import actualizar_catalogo, cargar_catalogo, codificar_barras
+from dataset_cmg import fechas_fin_hora
+from manifiesto import firma_archivo
+
+# Caché de cubos abiertos: {carpeta: ((mtime, tamaño) del índice, CuboCMg)}
+_cubos = {}
+
+UNA_HORA = np.timedelta64(1, 'h')
+
+# Versión del formato del cubo: un cubo de otra versión no se considera vigente
+# (2: Fecha en la convención de fin de hora en todos los meses; 3: tabla de horas repetidas)
+VERSION_CUBO = 3
+
+
+def carpeta_cubo(fder: Path):
+    """
+    Carpeta del cubo denso de CMg dentro de All_Data.
+
+    Contiene cmg.npy (horas x barras, float32), usd.npy (USD por hora), barras.parquet
+    (columna de cada barra_id), repetidas.parquet (horas repetidas por el cambio de
+    horario) e indice.json (fila inicial, fila final y firma de cada mes).
+    """
+    return fder / 'cubo'
+
+
+def construir_cubo(folder: Path):
+    """
+    Materializa todo el historial de CMg en una matriz densa hora x barra mapeada en disco.
+
+    Las filas son horas consecutivas desde la primera Fecha de los datos y las columnas
+    son los barra_id del catálogo. Las horas sin dato quedan en NaN. De una hora repetida
+    por el cambio de horario la matriz guarda la última aparición y las anteriores van a
+    repetidas.parquet, de modo que a_dataframe entrega las mismas filas que el escaneo.
+    Los meses se escriben uno a uno sobre el memmap, por lo que nunca hay más de un mes
+    en memoria.
+
+    Args:
+        folder (Path): Ruta a la carpeta base de datos.
+
+    Returns:
+        Path: Carpeta del cubo construido.
+    """
+    from bbdd_cmg import archivos_rango
+
+    fder = folder.parent / 'All_Data'
+    start_time = time.time()
+
+    meses = sorted(fder.glob('CMg_*_*_def.parquet'))
+    if not meses:
+        raise FileNotFoundError(f'No hay archivos CMg en {fder}')
+    primero, ultimo = meses[0].stem.split('_'), meses[-1].stem.split('_')
+    archivos = archivos_rango(folder, 'cmg', f'20{primero[1]}-{primero[2]}', f'20{ultimo[1]}-{ultimo[2]}')
+
+    # Primera pasada: límites de Fecha por mes y barras nuevas de los archivos legados
+    limites = {}
+    nombres = set()
+    for fecha, ruta in archivos:
+        lf = fechas_fin_hora(pl.scan_parquet(ruta), ruta)
+        limites[fecha] = lf.select(pl.col('Fecha').min().alias('i'), pl.col('Fecha').max().alias('f')).collect().row(0)
+        if 'Barra' in lf.collect_schema().names():
+            nombres.update(lf.select(pl.col('Barra').unique()).collect()['Barra'].to_list())
+    catalogo = actualizar_catalogo(fder, nombres) if nombres else cargar_catalogo(fder)
+
+    inicio = np.datetime64(min(i for i, _ in limites.values()), 'h')
+    fin = np.datetime64(max(f for _, f in limites.values()), 'h')
+    n_horas = int((fin - inicio) / UNA_HORA) + 1
+    n_barras = int(catalogo['barra_id'].max()) + 1
+
+    destino = carpeta_cubo(fder)
+    destino.mkdir(parents=True, exist_ok=True)
+    cmg = np.lib.format.open_memmap(destino / 'cmg.npy', mode='w+', dtype=np.float32, shape=(n_horas, n_barras))
+    cmg[:] = np.nan
+    usd = np.lib.format.open_memmap(destino / 'usd.npy', mode='w+', dtype=np.float64, shape=(n_horas,))
+    usd[:] = np.nan
+
+    # Segunda pasada: volcar cada mes en su bloque de filas
+    indice_meses = {}
+    repetidas = []
+    for fecha, ruta in archivos:
+        df = fechas_fin_hora(pl.scan_parquet(ruta), ruta).collect()
+        if 'Barra' in df.columns:
+            df = codificar_barras(df, catalogo)
+
+        # Apariciones anteriores de una hora repetida (en el orden del archivo)
+        clave = ['barra_id', 'Fecha']
+        ultima = pl.int_range(pl.len()).over(clave) == pl.len().over(clave) - 1
+        repetidas.append(df.filter(~ultima).select(
+            pl.lit(fecha).alias('mes'), 'barra_id', 'Fecha', 'CMg [USD/MWh]', 'USD',
+        ))
+        df = df.filter(ultima)
+
+        filas = ((df['Fecha'].to_numpy().astype('datetime64[h]') - inicio) / UNA_HORA).astype(np.int64)
+        columnas = df['barra_id'].to_numpy()
+        cmg[filas, columnas] = df['CMg [USD/MWh]'].to_numpy().astype(np.float32)
+        usd[filas] = df['USD'].to_numpy()
+
+        fila_i, fila_f = (int((np.datetime64(x, 'h') - inicio) / UNA_HORA) for x in limites[fecha])
+        indice_meses[fecha] = {
+            'archivo': str(ruta.relative_to(fder)),
+            'firma': firma_archivo(fder, ruta),
+            'fila_i': fila_i,
+            'fila_f': fila_f,
+        }
+        print(f'Cubo: {ruta.name} ({fecha}) volcado en filas {fila_i}-{fila_f}.')
+
+    cmg.flush()
+    usd.flush()
+    catalogo.write_parquet(destino / 'barras.parquet')
+    pl.concat(repetidas, how='diagonal_relaxed').write_parquet(destino / 'repetidas.parquet')
+    (destino / 'indice.json').write_text(json.dumps({
+        'version': VERSION_CUBO,
+        'inicio': str(inicio),
+        'n_horas': n_horas,
+        'n_barras': n_barras,
+        'meses': indice_meses,
+    }, indent=2))
+
+    print(f'Cubo de CMg ({n_horas} horas x {n_barras} barras) construido en {time.time() - start_time:.2f} segundos.')
+    return destino
+
+
+class CuboCMg:
+    """
+    Lectura del cubo de CMg mapeado en memoria.
+
+    Las series se entregan como vistas sobre el memmap (sin copia); el sistema operativo
+    mantiene en su caché de páginas las zonas consultadas con frecuencia.
+    """
+
+    def __init__(self, fder: Path):
+        carpeta = carpeta_cubo(fder)
+        indice = json.loads((carpeta / 'indice.json').read_text())
+
+        self.fder = fder
+        self.version = indice.get('version', 1)
+        self.inicio = np.datetime64(indice['inicio'], 'h')
+        self.meses = indice['meses']
+        self.cmg = np.load(carpeta / 'cmg.npy', mmap_mode='r')
+        self.usd = np.load(carpeta / 'usd.npy', mmap_mode='r')
+        self.barras = pl.read_parquet(carpeta / 'barras.parquet')
+        self.repetidas = (
+            pl.read_parquet(carpeta / 'repetidas.parquet') if (carpeta / 'repetidas.parquet').exists()
+            else pl.DataFrame(schema={'mes': pl.String, 'barra_id': pl.Int32, 'Fecha': pl.Datetime('ns'),
+                                      'CMg [USD/MWh]': pl.Float64, 'USD': pl.Float64})
+        )
+
+    def vigente(self, archivos):
+        """Indica si el cubo contiene todos los archivos dados sin modificaciones posteriores."""
+        if self.version != VERSION_CUBO:
+            return False
+        for fecha, ruta in archivos:
+            mes = self.meses.get(fecha)
+            if mes is None or mes['archivo'] != str(ruta.relative_to(self.fder)) or mes.get('firma') != firma_archivo(self.fder, ruta):
+                return False
+        return True
+
+    def rango_filas(self, date_i: str, date_f: str):
+        """
+        Filas del cubo que corresponden a los meses 'AAAA-MM' date_i a date_f.
+
+        Returns:
+            slice: Rango de filas, ajustado a los meses presentes en el cubo.
+        """
+        presentes = [fecha for fecha in self.meses if date_i <= fecha <= date_f]
+        if not presentes:
+            return slice(0, 0)
+        return slice(self.meses[min(presentes)]['fila_i'], self.meses[max(presentes)]['fila_f'] + 1)
+
+    def serie(self, barra_id: int, date_i: str, date_f: str):
+        """Serie horaria de CMg de una barra como vista sin copia sobre el memmap."""
+        return self.cmg[self.rango_filas(date_i, date_f), barra_id]
+
+    def series(self, barra_ids, date_i: str, date_f: str):
+        """Matriz horas x barras con las columnas de varias barras (una lectura por columna)."""
+        return self.cmg[self.rango_filas(date_i, date_f)][:, list(barra_ids)]
+
+    def meses_filas(self, date_i: str, date_f: str):
+        """Mes 'AAAA-MM' de cada fila del rango (las filas entre dos meses quedan con el anterior)."""
+        filas = self.rango_filas(date_i, date_f)
+        presentes = sorted(fecha for fecha in self.meses if date_i <= fecha <= date_f)
+        inicios = np.array([self.meses[fecha]['fila_i'] for fecha in presentes], dtype=np.int64)
+        posiciones = np.searchsorted(inicios, np.arange(filas.start, filas.stop), side='right') - 1
+        return np.array(presentes, dtype=object)[posiciones] if presentes else np.array([], dtype=object)
+
+    def fechas(self, date_i: str, date_f: str):
+        """Fechas (datetime64[ns]) de las filas del rango."""
+        filas = self.rango_filas(date_i, date_f)
+        return (self.inicio + np.arange(filas.start, filas.stop) * UNA_HORA).astype('datetime64[ns]')
+
+    def a_dataframe(self, ids: dict, date_i: str, date_f: str):
+        """
+        Entrega las barras pedidas en el mismo formato que get_cmg_barra.
+
+        Args:
+            ids (dict): {barra_id: Barra} de las barras a extraer.
+            date_i (str): Fecha de inicio en formato 'AAAA-MM'.
+            date_f (str): Fecha de fin en formato 'AAAA-MM'.
+
+        Returns:
+            pl.DataFrame: Fecha, Barra, CMg [USD/MWh] y USD, en el mismo orden que el
+            escaneo: por mes y, dentro de cada mes, por barra y Fecha, con las horas
+            repetidas del cambio de horario en su orden original.
+        """
+        filas = self.rango_filas(date_i, date_f)
+        fechas = self.fechas(date_i, date_f)
+        ids = {barra_id: nombre for barra_id, nombre in sorted(ids.items()) if barra_id < self.cmg.shape[1]}
+        valores = self.series(ids.keys(), date_i, date_f)
+        n_horas = len(fechas)
+
+        df = pl.DataFrame({
+            'mes': np.tile(self.meses_filas(date_i, date_f), len(ids)).astype(str),
+            'Fecha': np.tile(fechas, len(ids)),
+            'Barra': np.repeat(list(ids.values()), n_horas) if ids else np.array([], dtype=str),
+            # float32 conserva ~7 dígitos significativos: se redondea al volver a Float64
+            'CMg [USD/MWh]': valores.T.ravel().astype(np.float64),
+            'USD': np.tile(self.usd[filas], len(ids)),
+        }).with_columns(pl.col('CMg [USD/MWh]').round(4)).filter(pl.col('CMg [USD/MWh]').is_not_nan())
+
+        # Las apariciones anteriores de cada hora repetida van antes de la guardada en la matriz
+        repetidas = self.repetidas.filter(
+            pl.col('mes').is_between(pl.lit(date_i), pl.lit(date_f)) & pl.col('barra_id').is_in(list(ids))
+        ).select(
+            'mes', 'Fecha', pl.col('barra_id').replace_strict(ids, return_dtype=pl.String).alias('Barra'),
+            'CMg [USD/MWh]', 'USD',
+        )
+        return (
+            pl.concat([repetidas, df], how='diagonal_relaxed')
+            .sort(['mes', 'Barra', 'Fecha'], maintain_order=True)
+            .drop('mes')
+        )
+
+
+def invalidar_meses(fder: Path, meses):
+    """
+    Quita meses del índice del cubo, de modo que los rangos que los incluyan dejen de leerse del cubo.
+
+    La usa la ingesta al escribir un mes nuevo o modificado; el cubo sigue sirviendo los
+    rangos que no tocan esos meses hasta que se reconstruya.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        meses (Iterable[str]): Meses 'AAAA-MM' que cambiaron.
+
+    Returns:
+        list: Meses que estaban en el cubo y se quitaron.
+    """
+    ruta = carpeta_cubo(fder) / 'indice.json'
+    if not ruta.exists():
+        return []
+
+    indice = json.loads(ruta.read_text())
+    quitados = [mes for mes in meses if indice['meses'].pop(mes, None) is not None]
+    if quitados:
+        temporal = ruta.with_suffix('.tmp')
+        temporal.write_text(json.dumps(indice, indent=2))
+        temporal.replace(ruta)
+    return quitados
+
+
+def abrir_cubo(fder: Path):
+    """
+    Abre el cubo de CMg de All_Data, reutilizando la instancia mientras no se reconstruya.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+
+    Returns:
+        CuboCMg | None: Cubo abierto, o None si no ha sido construido.
+    """
+    indice = carpeta_cubo(fder) / 'indice.json'
+    if not indice.exists():
+        return None
+
+    stat = indice.stat()
+    firma = (stat.st_mtime_ns, stat.st_size)
+    cache = _cubos.get(fder)
+    if cache is None or cache[0] != firma:
+        cache = (firma, CuboCMg(fder))
+        _cubos[fder] = cache
+    return cache[1]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Construye el cubo denso hora x barra de CMg en All_Data/cubo.')
+    parser.add_argument('--ruta', type=Path, default=Path(__file__).parent,
+                        help='Carpeta base de datos (All_Data se busca en su carpeta padre).')
+    args = parser.parse_args()
+
+    construir_cubo(args.ruta)
@@ -0,0 +1,279 @@
+from pathlib import Path
+import argparse
+import time
+
+import polars as pl
+
+from catalogo_barras import actualizar_catalogo, actualizar_indice_meses, codificar_barras
+
+# Filas por row group: con ~1.500 barras x 720 horas por mes, cada row group cubre
+# unas 90 barras, por lo que una consulta de una sola barra lee 1 o 2 row groups por mes.
+FILAS_ROW_GROUP = 64 * 1024
+
+# Caché de la convención de etiquetas de cada mes: {ruta: ((mtime, tamaño), etiqueta el inicio de la hora)}
+_etiquetas = {}
+
+# Caché de la firma del archivo legado registrada en cada partición: {ruta: ((mtime, tamaño), firma)}
+_fuentes = {}
+
+
+def ruta_particion(fder: Path, year: str, month: str):
+    """
+    Ruta del archivo de un mes dentro del dataset particionado.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        year (str): Año en formato 'AAAA'.
+        month (str): Mes en formato 'MM'.
+
+    Returns:
+        Path: All_Data/CMg/year=AAAA/month=MM/CMg.parquet
+    """
+    return fder / 'CMg' / f'year={year}' / f'month={month}' / 'CMg.parquet'
+
+
+def ruta_legado(fder: Path, year: str, month: str):
+    """
+    Ruta del archivo legado de un mes.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        year (str): Año en formato 'AAAA'.
+        month (str): Mes en formato 'MM'.
+
+    Returns:
+        Path: All_Data/CMg_YY_MM_def.parquet
+    """
+    return fder / f'CMg_{year[-2:]}_{month}_def.parquet'
+
+
+def fuente_mes(fder: Path, fecha: str, ruta: Path):
+    """
+    Archivo del que provienen los datos de un mes.
+
+    Para una partición es su CMg_YY_MM_def.parquet (si aún existe); para cualquier otro
+    archivo, el mismo archivo.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        fecha (str): Mes en formato 'AAAA-MM'.
+        ruta (Path): Archivo del mes entregado por archivos_rango.
+
+    Returns:
+        Path: Archivo fuente del mes.
+    """
+    year, month = fecha.split('-')
+    legado = ruta_legado(fder, year, month)
+    if ruta == ruta_particion(fder, year, month) and legado.exists():
+        return legado
+    return ruta
+
+
+def firma_legado(origen: Path):
+    """Firma (mtime y tamaño) de un archivo legado, registrada en su partición al compactarlo."""
+    stat = origen.stat()
+    return f'{stat.st_mtime_ns}-{stat.st_size}'
+
+
+def _fuente_particion(destino: Path):
+    """Firma del archivo legado registrada en los metadatos de una partición (None si no la tiene)."""
+    stat = destino.stat()
+    firma = (stat.st_mtime_ns, stat.st_size)
+    cache = _fuentes.get(destino)
+    if cache is None or cache[0] != firma:
+        cache = (firma, pl.read_parquet_metadata(destino).get('fuente'))
+        _fuentes[destino] = cache
+    return cache[1]
+
+
+def particion_vigente(origen: Path, destino: Path):
+    """
+    Indica si la partición de un mes refleja el archivo legado actual.
+
+    compactar_mes registra en la partición la firma del archivo legado del que proviene;
+    si el legado se reescribe después (e.g., un _def descargado de nuevo) la firma deja de
+    coincidir y el mes debe leerse del legado hasta volver a compactarlo. Las particiones
+    escritas sin firma se comparan por fecha de modificación.
+
+    Args:
+        origen (Path): Archivo CMg_YY_MM_def.parquet del mes.
+        destino (Path): Archivo del mes dentro del dataset particionado.
+
+    Returns:
+        bool: True si la partición existe y no hay un legado más reciente.
+    """
+    if not destino.exists():
+        return False
+    if not origen.exists():
+        return True
+    fuente = _fuente_particion(destino)
+    if fuente is None:
+        return destino.stat().st_mtime >= origen.stat().st_mtime
+    return fuente == firma_legado(origen)
+
+
+def etiqueta_inicio_hora(ruta: Path):
+    """
+    Indica si un mes de CMg etiqueta cada hora con su inicio en vez de con su fin.
+
+    Los archivos de 2018 a 2022 van de las 00:00 del día 1 a las 23:00 del último día
+    (inicio de la hora); desde 2023 van de las 01:00 del día 1 a las 00:00 del mes
+    siguiente (fin de la hora), igual que los meses ingeridos con ingesta. Se decide
+    por la primera Fecha del archivo, no por el año.
+
+    Args:
+        ruta (Path): Archivo del mes (particionado o legado).
+
+    Returns:
+        bool: True si la primera hora del archivo es las 00:00 del día 1.
+    """
+    stat = ruta.stat()
+    firma = (stat.st_mtime_ns, stat.st_size)
+    cache = _etiquetas.get(ruta)
+    if cache is None or cache[0] != firma:
+        primera = pl.scan_parquet(ruta).select(pl.col('Fecha').min()).collect().item()
+        cache = (firma, primera is not None and primera.day == 1 and primera.hour == 0)
+        _etiquetas[ruta] = cache
+    return cache[1]
+
+
+def fechas_fin_hora(lf: pl.LazyFrame, ruta: Path):
+    """
+    Lleva la Fecha de un mes de CMg a la convención de fin de hora (00:00-01:00 -> 01:00).
+
+    Todos los lectores de CMg pasan por aquí, de modo que los meses de ambas épocas
+    quedan en la misma convención que el consumo remuestreado (ver alineacion).
+
+    Args:
+        lf (pl.LazyFrame): Consulta sobre el archivo del mes.
+        ruta (Path): Archivo del mes.
+
+    Returns:
+        pl.LazyFrame: Consulta con Fecha etiquetada al fin de cada hora.
+    """
+    if etiqueta_inicio_hora(ruta):
+        return lf.with_columns(pl.col('Fecha').dt.offset_by('1h'))
+    return lf
+
+
+def compactar_mes(origen: Path, destino: Path, catalogo: pl.DataFrame, filas_row_group: int = FILAS_ROW_GROUP):
+    """
+    Reescribe un archivo CMg_YY_MM_def.parquet con barra_id en vez de Barra, ordenado por barra y Fecha.
+
+    Al quedar ordenado, las estadísticas min/max de cada row group sobre barra_id son
+    disjuntas y el lector puede saltar los row groups que no contienen la barra pedida.
+    Como los IDs se asignan en orden alfabético, el orden coincide con el de Barra.
+    La Fecha se escribe en la convención de fin de hora (ver fechas_fin_hora) y las horas
+    repetidas por el cambio de horario conservan su orden original. La firma del archivo
+    de origen queda en los metadatos del parquet (ver particion_vigente).
+
+    Args:
+        origen (Path): Archivo mensual en formato legado.
+        destino (Path): Archivo de salida dentro del dataset particionado.
+        catalogo (pl.DataFrame): Catálogo de barras que contiene todas las barras del mes.
+        filas_row_group (int): Cantidad de filas por row group.
+
+    Returns:
+        int: Cantidad de filas escritas.
+    """
+    fuente = firma_legado(origen)
+    df = codificar_barras(fechas_fin_hora(pl.scan_parquet(origen), origen).collect(), catalogo).sort(['barra_id', 'Fecha'], maintain_order=True)
+
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporal = destino.with_suffix('.tmp')
+    df.write_parquet(temporal, compression='zstd', statistics=True, row_group_size=filas_row_group,
+                     metadata={'fuente': fuente})
+    temporal.replace(destino)
+    return df.height
+
+
+def compactar_dataset(folder: Path, forzar: bool = False, filas_row_group: int = FILAS_ROW_GROUP):
+    """
+    Convierte todos los CMg_YY_MM_def.parquet de All_Data al dataset particionado year=/month=.
+
+    Los archivos legados no se eliminan, de modo que siguen disponibles como respaldo.
+
+    Args:
+        folder (Path): Ruta a la carpeta base de datos (All_Data se busca en folder.parent).
+        forzar (bool): Reescribe también los meses que ya están particionados y al día.
+        filas_row_group (int): Cantidad de filas por row group.
+
+    Returns:
+        list: Rutas de los archivos particionados escritos.
+    """
+    fder = folder.parent / 'All_Data'
+
+    meses = []
+    pendientes = []
+    for origen in sorted(fder.glob('CMg_*_*_def.parquet')):
+        _, yy, month, _ = origen.stem.split('_')
+        destino = ruta_particion(fder, f'20{yy}', month)
+        meses.append((f'20{yy}-{month}', destino))
+
+        if not forzar and particion_vigente(origen, destino):
+            continue
+        pendientes.append((origen, destino))
+
+    escritos = _compactar(fder, pendientes, filas_row_group)
+
+    # Mantener al día el índice de barras por mes
+    actualizar_indice_meses(fder, meses)
+    return escritos
+
+
+def compactar_meses(fder: Path, archivos, filas_row_group: int = FILAS_ROW_GROUP):
+    """
+    Compacta los meses legados recién escritos, si All_Data ya usa el dataset particionado.
+
+    La usa la ingesta para que un mes nuevo o modificado no quede servido por una
+    partición desactualizada.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        archivos (list): Tuplas (fecha 'AAAA-MM', Path) de archivos CMg_YY_MM_def.parquet.
+        filas_row_group (int): Cantidad de filas por row group.
+
+    Returns:
+        list: Rutas de los archivos particionados escritos.
+    """
+    if not (fder / 'CMg').exists():
+        return []
+
+    pendientes = []
+    for fecha, origen in archivos:
+        destino = ruta_particion(fder, *fecha.split('-'))
+        if not particion_vigente(origen, destino):
+            pendientes.append((origen, destino))
+    return _compactar(fder, pendientes, filas_row_group)
+
+
+def _compactar(fder: Path, pendientes, filas_row_group: int):
+    """Registra en el catálogo las barras de los meses pendientes (origen, destino) y los compacta."""
+    escritos = []
+    if not pendientes:
+        return escritos
+
+    # Registrar en el catálogo todas las barras de los meses a compactar
+    nombres = pl.concat(
+        [pl.scan_parquet(origen).select('Barra') for origen, _ in pendientes]
+    ).unique().collect()['Barra']
+    catalogo = actualizar_catalogo(fder, nombres.to_list())
+
+    for origen, destino in pendientes:
+        start_time = time.time()
+        filas = compactar_mes(origen, destino, catalogo, filas_row_group)
+        print(f'{origen.name} -> {destino.relative_to(fder)} ({filas} filas) en {time.time() - start_time:.2f} segundos.')
+        escritos.append(destino)
+    return escritos
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compacta los CMg de All_Data en un dataset particionado por año y mes.')
+    parser.add_argument('--ruta', type=Path, default=Path(__file__).parent,
+                        help='Carpeta base de datos (All_Data se busca en su carpeta padre).')
+    parser.add_argument('--forzar', action='store_true', help='Reescribe todos los meses.')
+    parser.add_argument('--filas-row-group', type=int, default=FILAS_ROW_GROUP)
+    args = parser.parse_args()
+
+    escritos = compactar_dataset(args.ruta, forzar=args.forzar, filas_row_group=args.filas_row_group)
+    print(f'{len(escritos)} meses compactados.')
@@ -0,0 +1,200 @@
+from datetime import datetime
+from pathlib import Path
+from xml.sax.saxutils import escape, quoteattr
+import tempfile
+import time
+import zipfile
+
+import polars as pl
+from openpyxl.utils import get_column_letter
+
+# Filas máximas de una hoja de Excel (incluido el encabezado)
+MAX_FILAS_EXCEL = 1_048_576
+
+# Filas convertidas y escritas por bloque
+TAMANO_BLOQUE = 50_000
+
+# Estilos de celda definidos en styles.xml (índice en cellXfs)
+ESTILO_FECHA_HORA = 1
+ESTILO_FECHA = 2
+ESTILO_DECIMAL = 3
+
+# Origen de las fechas seriales de Excel
+EPOCA_EXCEL = datetime(1899, 12, 30)
+
+_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_NS_R = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_NS_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+_XML = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+_ESTILOS = _XML + f'''<styleSheet xmlns="{_NS}">
+<numFmts count="2"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm"/><numFmt numFmtId="165" formatCode="yyyy-mm-dd"/></numFmts>
+<fonts count="1"><font><sz val="11"/><name val="Calibri"/><family val="2"/></font></fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="4">
+<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>
+<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="4" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+</cellXfs>
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>
+</styleSheet>'''
+
+
+def _texto_xml(expr: pl.Expr):
+    """Escapa texto para XML y elimina los caracteres de control no permitidos."""
+    return (
+        expr.str.replace_all(r'[\x00-\x08\x0b\x0c\x0e-\x1f]', '')
+        .str.replace_all('&', '&amp;', literal=True)
+        .str.replace_all('<', '&lt;', literal=True)
+        .str.replace_all('>', '&gt;', literal=True)
+    )
+
+
+def _celda(nombre: str, tipo):
+    """
+    Expresión vectorizada con el XML de la celda de cada fila para una columna.
+
+    Fechas y decimales se escriben como números con formato de Excel; los valores nulos
+    (y NaN o infinitos) quedan como celdas vacías. Las fechas con zona horaria se
+    escriben en su hora local, ya que Excel no guarda la zona.
+    """
+    col = pl.col(nombre)
+    if isinstance(tipo, pl.Datetime) and tipo.time_zone is not None:
+        col = col.dt.replace_time_zone(None)
+    if tipo == pl.Date or isinstance(tipo, pl.Datetime):
+        serial = (col.cast(pl.Datetime('us')) - pl.lit(EPOCA_EXCEL)).dt.total_microseconds() / 86_400_000_000
+        estilo = ESTILO_FECHA if tipo == pl.Date else ESTILO_FECHA_HORA
+        xml = pl.format(f'<c s="{estilo}"><v>{{}}</v></c>', serial)
+    elif tipo.is_float():
+        xml = pl.when(col.is_finite()).then(pl.format(f'<c s="{ESTILO_DECIMAL}"><v>{{}}</v></c>', col))
+    elif tipo.is_integer():
+        xml = pl.format('<c><v>{}</v></c>', col)
+    elif tipo == pl.Boolean:
+        xml = pl.format('<c t="b"><v>{}</v></c>', col.cast(pl.Int8))
+    else:
+        xml = pl.format('<c t="inlineStr"><is><t xml:space="preserve">{}</t></is></c>', _texto_xml(col.cast(pl.String)))
+    return xml.fill_null('<c/>')
+
+
+def _nombre_tabla(numero: int):
+    """Nombre de la tabla de Excel de una hoja."""
+    return f'Tabla{numero}'
+
+
+def _escribir_hoja(zf: zipfile.ZipFile, numero: int, parte: pl.DataFrame, celdas, anchos, tamano_bloque: int):
+    """Escribe una hoja por bloques directamente en el zip del libro, con su tabla si tiene filas."""
+    columnas = parte.columns
+    rango = f'A1:{get_column_letter(len(columnas))}{parte.height + 1}'
+    encabezado = ''.join(f'<c t="inlineStr"><is><t>{escape(c)}</t></is></c>' for c in columnas)
+    cols = ''.join(f'<col min="{i}" max="{i}" width="{ancho}" customWidth="1"/>' for i, ancho in enumerate(anchos, start=1))
+
+    with zf.open(f'xl/worksheets/sheet{numero}.xml', 'w', force_zip64=True) as f:
+        f.write((
+            _XML + f'<worksheet xmlns="{_NS}" xmlns:r="{_NS_R}"><dimension ref="{rango}"/>'
+            '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+            f'</sheetView></sheetViews><cols>{cols}</cols><sheetData><row r="1">{encabezado}</row>'
+        ).encode())
+
+        for inicio in range(0, parte.height, tamano_bloque):
+            bloque = parte.slice(inicio, tamano_bloque).with_row_index('fila', offset=inicio + 2)
+            filas = bloque.select(
+                pl.concat_str([pl.format('<row r="{}">', pl.col('fila')), *celdas, pl.lit('</row>')]).str.join('')
+            ).item()
+            f.write(filas.encode())
+
+        if parte.height:
+            f.write('</sheetData><tableParts count="1"><tablePart r:id="rId1"/></tableParts></worksheet>'.encode())
+        else:
+            f.write(f'</sheetData><autoFilter ref="{rango}"/></worksheet>'.encode())
+
+    if parte.height:
+        columnas_tabla = ''.join(f'<tableColumn id="{i}" name={quoteattr(c)}/>' for i, c in enumerate(columnas, start=1))
+        zf.writestr(f'xl/tables/table{numero}.xml', _XML + (
+            f'<table xmlns="{_NS}" id="{numero}" name="{_nombre_tabla(numero)}" displayName="{_nombre_tabla(numero)}" ref="{rango}">'
+            f'<autoFilter ref="{rango}"/><tableColumns count="{len(columnas)}">{columnas_tabla}</tableColumns>'
+            '<tableStyleInfo name="TableStyleMedium2" showFirstColumn="0" showLastColumn="0" showRowStripes="1" showColumnStripes="0"/>'
+            '</table>'
+        ))
+        zf.writestr(f'xl/worksheets/_rels/sheet{numero}.xml.rels', _XML + (
+            f'<Relationships xmlns="{_NS_REL}">'
+            f'<Relationship Id="rId1" Type="{_NS_R}/table" Target="../tables/table{numero}.xml"/></Relationships>'
+        ))
+
+
+def escribir_excel(data: pl.DataFrame, ruta: Path, hoja: str = 'Datos', tamano_bloque: int = TAMANO_BLOQUE,
+                   max_filas: int = MAX_FILAS_EXCEL):
+    """
+    Escribe un DataFrame a Excel (.xlsx) por bloques, con memoria acotada por bloque.
+
+    El XML de cada bloque de filas se arma con expresiones vectorizadas de polars y se
+    escribe directamente en el archivo comprimido, sin construir el libro en memoria ni
+    crear objetos por celda. Fechas y decimales quedan como valores nativos con formato
+    de Excel, cada hoja es una tabla con autofiltro y encabezado fijo, y si los datos
+    superan el límite de filas de Excel continúan en hojas adicionales ("Datos (2)", ...).
+
+    Args:
+        data (pl.DataFrame): Datos a exportar.
+        ruta (Path): Archivo .xlsx de destino.
+        hoja (str): Nombre de la primera hoja.
+        tamano_bloque (int): Filas por bloque.
+        max_filas (int): Filas por hoja, incluido el encabezado.
+
+    Returns:
+        int: Cantidad de hojas escritas.
+    """
+    start_time = time.time()
+    ruta = Path(ruta)
+    celdas = [_celda(nombre, tipo) for nombre, tipo in data.schema.items()]
+    anchos = [max(12, min(len(nombre) + 4, 40)) for nombre in data.columns]
+    filas_por_hoja = max_filas - 1
+    partes = [data.slice(i, filas_por_hoja) for i in range(0, data.height, filas_por_hoja)] or [data]
+    nombres = [hoja if i == 1 else f'{hoja} ({i})' for i in range(1, len(partes) + 1)]
+
+    # Temporal con nombre único: varios procesos pueden escribir en la misma carpeta a la vez
+    with tempfile.NamedTemporaryFile(dir=ruta.parent, prefix=f'{ruta.stem}.', suffix='.tmp', delete=False) as f:
+        temporal = Path(f.name)
+    # Si algo falla a mitad de camino el temporal no debe quedar en la carpeta de salida
+    try:
+        with zipfile.ZipFile(temporal, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+            for numero, parte in enumerate(partes, start=1):
+                _escribir_hoja(zf, numero, parte, celdas, anchos, tamano_bloque)
+
+            hojas = ''.join(f'<sheet name={quoteattr(nombre[:31])} sheetId="{i}" r:id="rId{i}"/>'
+                            for i, nombre in enumerate(nombres, start=1))
+            zf.writestr('xl/workbook.xml', _XML + f'<workbook xmlns="{_NS}" xmlns:r="{_NS_R}"><sheets>{hojas}</sheets></workbook>')
+
+            relaciones = ''.join(f'<Relationship Id="rId{i}" Type="{_NS_R}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                                 for i in range(1, len(partes) + 1))
+            relaciones += f'<Relationship Id="rId{len(partes) + 1}" Type="{_NS_R}/styles" Target="styles.xml"/>'
+            zf.writestr('xl/_rels/workbook.xml.rels', _XML + f'<Relationships xmlns="{_NS_REL}">{relaciones}</Relationships>')
+            zf.writestr('xl/styles.xml', _ESTILOS)
+            zf.writestr('_rels/.rels', _XML + (
+                f'<Relationships xmlns="{_NS_REL}">'
+                f'<Relationship Id="rId1" Type="{_NS_R}/officeDocument" Target="xl/workbook.xml"/></Relationships>'
+            ))
+
+            tipo = 'application/vnd.openxmlformats-officedocument.spreadsheetml'
+            partes_xml = ''.join(
+                f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="{tipo}.worksheet+xml"/>'
+                + (f'<Override PartName="/xl/tables/table{i}.xml" ContentType="{tipo}.table+xml"/>' if parte.height else '')
+                for i, parte in enumerate(partes, start=1)
+            )
+            zf.writestr('[Content_Types].xml', _XML + (
+                '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                '<Default Extension="xml" ContentType="application/xml"/>'
+                f'<Override PartName="/xl/workbook.xml" ContentType="{tipo}.sheet.main+xml"/>'
+                f'<Override PartName="/xl/styles.xml" ContentType="{tipo}.styles+xml"/>'
+                f'{partes_xml}</Types>'
+            ))
+    except Exception:
+        temporal.unlink(missing_ok=True)
+        raise
+    temporal.replace(ruta)
+
+    print(f'Excel guardado en {ruta}: {data.height} filas en {len(partes)} hojas, '
+          f'{time.time() - start_time:.2f} segundos.')
+    return len(partes)
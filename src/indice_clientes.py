@@ -0,0 +1,165 @@
+from pathlib import Path
+
+import polars as pl
+
+from carga_paralela import cargar_meses
+from catalogo_barras import patron_terminos
+from manifiesto import firma_archivo
+
+# Caché en memoria del índice: {ruta: ((mtime, tamaño), DataFrame)}
+_indices = {}
+
+ESQUEMA_INDICE = {
+    'Cliente': pl.String,
+    'nombre_barra': pl.String,
+    'cliente_norm': pl.String,
+    'barra_norm': pl.String,
+    'mes': pl.String,
+    'firma': pl.String,
+}
+
+
+def ruta_indice_clientes(fder: Path):
+    """
+    Ruta del índice invertido cliente <-> barra dentro de All_Data.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+
+    Returns:
+        Path: All_Data/indice_clientes.parquet
+    """
+    return fder / 'indice_clientes.parquet'
+
+
+def cargar_indice_clientes(fder: Path):
+    """
+    Carga el índice con los pares (Cliente, nombre_barra) distintos de cada mes de IVT.
+
+    Además de los nombres originales guarda sus versiones normalizadas (sin espacios
+    en los extremos y en mayúsculas), que son las que se usan para buscar. El
+    resultado se mantiene en memoria mientras el archivo no cambie.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+
+    Returns:
+        pl.DataFrame: Índice de clientes (vacío si aún no existe).
+    """
+    ruta = ruta_indice_clientes(fder)
+    if not ruta.exists():
+        return pl.DataFrame(schema=ESQUEMA_INDICE)
+
+    stat = ruta.stat()
+    firma = (stat.st_mtime_ns, stat.st_size)
+    cache = _indices.get(ruta)
+    if cache is None or cache[0] != firma:
+        cache = (firma, pl.read_parquet(ruta))
+        _indices[ruta] = cache
+
+    # Un índice con otro esquema se descarta y se reconstruye en la próxima actualización
+    return cache[1] if cache[1].schema == pl.Schema(ESQUEMA_INDICE) else pl.DataFrame(schema=ESQUEMA_INDICE)
+
+
+def actualizar_indice_clientes(fder: Path, archivos, seguimiento=None):
+    """
+    Indexa los pares cliente/barra de los meses de IVT nuevos o modificados.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        archivos (list): Tuplas (fecha 'AAAA-MM', Path) de los archivos IVT a considerar.
+        seguimiento (Seguimiento | None): Avance y cancelación por mes indexado.
+
+    Returns:
+        pl.DataFrame: Índice actualizado.
+    """
+    indice = cargar_indice_clientes(fder)
+    vigentes = dict(indice.select('mes', 'firma').unique().iter_rows())
+
+    pendientes = [(fecha, ruta) for fecha, ruta in archivos if vigentes.get(fecha) != firma_archivo(fder, ruta)]
+    if not pendientes:
+        return indice
+
+    def leer_pares(fecha, ruta):
+        return pl.scan_parquet(ruta).select('Cliente', 'nombre_barra').unique().collect()
+
+    nuevos = []
+    for fecha, ruta, pares in cargar_meses(pendientes, leer_pares, seguimiento=seguimiento):
+        nuevos.append(pares.with_columns(
+            pl.col('Cliente').str.strip_chars().str.to_uppercase().alias('cliente_norm'),
+            pl.col('nombre_barra').str.strip_chars().str.to_uppercase().alias('barra_norm'),
+            pl.lit(fecha).alias('mes'),
+            pl.lit(firma_archivo(fder, ruta)).alias('firma'),
+        ).cast(ESQUEMA_INDICE))
+
+    meses = [fecha for fecha, _ in pendientes]
+    indice = pl.concat([indice.filter(~pl.col('mes').is_in(meses)), *nuevos]).sort(['mes', 'cliente_norm'])
+
+    ruta = ruta_indice_clientes(fder)
+    temporal = ruta.with_suffix('.tmp')
+    indice.write_parquet(temporal)
+    temporal.replace(ruta)
+    print(f'Índice de clientes actualizado: {len(pendientes)} meses indexados.')
+    return indice
+
+
+def _en_rango(fder: Path, date_i: str, date_f: str):
+    """Filas del índice cuyos meses están entre date_i y date_f."""
+    return cargar_indice_clientes(fder).filter(pl.col('mes').is_between(pl.lit(date_i), pl.lit(date_f)))
+
+
+def buscar_clientes(fder: Path, cliente: str, date_i: str, date_f: str):
+    """
+    Busca clientes por nombre y devuelve las barras en que aparecen dentro del rango.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        cliente (str): Términos separados por comas (e.g., "CODELCO, ENEL").
+        date_i (str): Fecha inicial en formato 'AAAA-MM'.
+        date_f (str): Fecha final en formato 'AAAA-MM'.
+
+    Returns:
+        list: Diccionarios {"Cliente", "Barra"} distintos, ordenados por cliente.
+    """
+    pares = _en_rango(fder, date_i, date_f).filter(
+        pl.col('cliente_norm').str.contains(patron_terminos(cliente))
+    ).select(
+        pl.col('Cliente').fill_null('Desconocido'),
+        pl.col('nombre_barra').fill_null('Sin Barra').alias('Barra'),
+    ).unique().sort(['Cliente', 'Barra'])
+    return pares.to_dicts()
+
+
+def clientes_por_barra(fder: Path, barra: str, date_i: str, date_f: str):
+    """
+    Clientes que retiran energía en una barra en algún mes del rango.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        barra (str): Nombre de la barra (se compara normalizado).
+        date_i (str): Fecha inicial en formato 'AAAA-MM'.
+        date_f (str): Fecha final en formato 'AAAA-MM'.
+
+    Returns:
+        list: Nombres de clientes únicos, ordenados alfabéticamente.
+    """
+    return _en_rango(fder, date_i, date_f).filter(
+        pl.col('barra_norm') == barra.strip().upper()
+    )['Cliente'].drop_nulls().unique().sort().to_list()
+
+
+def meses_cliente_barra(fder: Path, cliente: str, barra: str):
+    """
+    Meses en que un cliente y una barra aparecen juntos en el IVT.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        cliente (str): Nombre del cliente.
+        barra (str): Nombre de la barra.
+
+    Returns:
+        list: Meses 'AAAA-MM' en orden cronológico.
+    """
+    return cargar_indice_clientes(fder).filter(
+        (pl.col('cliente_norm') == cliente.strip().upper()) & (pl.col('barra_norm') == barra.strip().upper())
+    )['mes'].unique().sort().to_list()
@@ -0,0 +1,309 @@
+from pathlib import Path
+import argparse
+import csv
+import time
+import zipfile
+
+import polars as pl
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+from catalogo_barras import actualizar_indice_meses
+from cubo_cmg import invalidar_meses
+from dataset_cmg import compactar_meses
+from indice_clientes import actualizar_indice_clientes
+from rollups_cmg import actualizar_rollups
+from manifiesto import cargar_manifiesto, fuente_vigente, hash_archivo, marca_agua, registrar_archivo, registrar_fuente
+
+# Tamaño de cada bloque leído del CSV: acota la memoria usada sin importar el tamaño del mes
+TAMANO_BLOQUE = 16 * 1024 * 1024
+
+# Nombres de columna aceptados en los CSV del Coordinador (en minúsculas) -> columna final
+COLUMNAS_CMG = {
+    'fecha': 'fecha',
+    'hora': 'hora',
+    'barra': 'Barra',
+    'barra_mnemotecnico': 'Barra',
+    'nombre_barra': 'Barra',
+    'cmg': 'CMg [USD/MWh]',
+    'cmg [usd/mwh]': 'CMg [USD/MWh]',
+    'cmg_usd_mwh': 'CMg [USD/MWh]',
+    'costo_en_dolares': 'CMg [USD/MWh]',
+    'usd': 'USD',
+    'dolar': 'USD',
+    'tipo_cambio': 'USD',
+}
+
+COLUMNAS_IVT = {
+    'fecha': 'fecha',
+    'hora': 'hora',
+    'nombre_barra': 'nombre_barra',
+    'barra': 'nombre_barra',
+    'propietario': 'propietario',
+    'tipo_medida': 'Tipo_Medida',
+    'clave': 'clave',
+    'cliente': 'Cliente',
+    'consumo': 'Consumo [kWh]',
+    'consumo [kwh]': 'Consumo [kWh]',
+    'consumo_kwh': 'Consumo [kWh]',
+    'medida_kwh': 'Consumo [kWh]',
+}
+
+ESQUEMA_CMG = {
+    'Fecha': pl.Datetime('ns'),
+    'Barra': pl.String,
+    'CMg [USD/MWh]': pl.Float64,
+    'USD': pl.Float64,
+}
+
+ESQUEMA_IVT = {
+    'Fecha': pl.Datetime('ns'),
+    'nombre_barra': pl.String,
+    'propietario': pl.String,
+    'Tipo_Medida': pl.String,
+    'clave': pl.String,
+    'Cliente': pl.String,
+    'Consumo [kWh]': pl.Float64,
+}
+
+
+def nombre_mensual(tipo: str, mes: str):
+    """
+    Nombre del archivo mensual de All_Data para un mes 'AAAA-MM'.
+
+    Args:
+        tipo (str): 'cmg' o 'ivt'.
+        mes (str): Mes en formato 'AAAA-MM'.
+
+    Returns:
+        str: CMg_YY_MM_def.parquet o IVT_YY_MM.parquet
+    """
+    year, month = mes.split('-')
+    if tipo == 'cmg':
+        return f"CMg_{year[-2:]}_{month}_def.parquet"
+    return f"IVT_{year[-2:]}_{month}.parquet"
+
+
+def _detectar_delimitador(muestra: bytes, encoding: str):
+    """Detecta el separador del CSV a partir de sus primeros bytes."""
+    try:
+        return csv.Sniffer().sniff(muestra.decode(encoding, errors='ignore'), delimiters=',;\t|').delimiter
+    except csv.Error:
+        return ','
+
+
+def _normalizar_lote(df: pl.DataFrame, columnas: dict, esquema: dict):
+    """
+    Lleva un lote leído del CSV al esquema de All_Data.
+
+    Renombra las columnas según sus alias, arma Fecha a partir de fecha + hora (hora 1
+    a 24, la hora 24 es las 00:00 del día siguiente), convierte números con coma
+    decimal y agrega la columna 'mes' a la que pertenece cada fila.
+    """
+    df = df.rename({c: columnas[c.strip().lower()] for c in df.columns if c.strip().lower() in columnas})
+
+    fecha = pl.col('fecha').cast(pl.String).str.to_datetime(strict=False)
+    if 'hora' in df.columns:
+        hora = pl.col('hora').cast(pl.String).str.extract(r'(\d+)').cast(pl.Int64)
+        df = df.with_columns(
+            (fecha + pl.duration(hours=hora)).alias('Fecha'),
+            fecha.dt.strftime('%Y-%m').alias('mes'),
+        )
+    else:
+        df = df.with_columns(fecha.alias('Fecha'), fecha.dt.strftime('%Y-%m').alias('mes'))
+
+    convertidas = []
+    for nombre, tipo in esquema.items():
+        if nombre == 'Fecha':
+            continue
+        if nombre not in df.columns:
+            convertidas.append(pl.lit(None, dtype=tipo).alias(nombre))
+        elif tipo == pl.Float64 and df.schema[nombre] == pl.String:
+            # Coma decimal (1.234,56) o punto decimal (1234.56)
+            texto = pl.col(nombre).str.strip_chars()
+            convertidas.append(
+                pl.when(texto.str.contains(','))
+                .then(texto.str.replace_all(r'\.', '').str.replace(',', '.'))
+                .otherwise(texto)
+                .cast(pl.Float64, strict=False)
+                .alias(nombre)
+            )
+        else:
+            convertidas.append(pl.col(nombre).cast(tipo, strict=False))
+
+    return df.with_columns(convertidas).select(
+        pl.col('Fecha').cast(pl.Datetime('ns')), *[c for c in esquema if c != 'Fecha'], 'mes'
+    ).filter(pl.col('Fecha').is_not_null())
+
+
+def _columnas_csv(muestra: bytes, encoding: str, delimitador: str):
+    """Nombres de columna de la primera línea del CSV."""
+    primera = muestra.decode(encoding, errors='ignore').splitlines()[:1]
+    return next(csv.reader(primera, delimiter=delimitador), [])
+
+
+def _miembros_csv(zf: zipfile.ZipFile):
+    """Recorre los CSV de un zip, incluidos los que vienen dentro de zips anidados."""
+    for info in zf.infolist():
+        nombre = info.filename.lower()
+        if nombre.endswith('.zip'):
+            with zf.open(info) as anidado, zipfile.ZipFile(anidado) as zf_anidado:
+                yield from _miembros_csv(zf_anidado)
+        elif nombre.endswith(('.csv', '.tsv', '.txt')):
+            yield zf, info
+        elif not info.is_dir():
+            print(f"Miembro omitido (formato no soportado): {info.filename}")
+
+
+def ingerir_zip(zip_path, fder: Path, tipo: str, encoding: str = 'latin1', tamano_bloque: int = TAMANO_BLOQUE, url=None,
+                incremental: bool = False):
+    """
+    Convierte un zip descargado del Coordinador en archivos parquet mensuales de All_Data.
+
+    Los CSV del zip se leen como flujos, en bloques de tamaño acotado, sin extraerlos a
+    disco ni cargar un mes completo en memoria. Cada bloque se normaliza y se agrega al
+    parquet del mes al que pertenece; los archivos se reemplazan al terminar.
+
+    El manifiesto evita trabajo repetido: un zip ya ingerido con el mismo hash se omite,
+    y un mes cuyo contenido no cambió conserva su archivo (y con ello índices y cachés).
+    En modo incremental, además, se descartan las filas de los meses hasta la marca de
+    agua del manifiesto (el último mes ya registrado), sin escribirlos ni compararlos.
+
+    Args:
+        zip_path (Path | file-like): Zip de CMg (Antecedentes_CMG_Real_def_*.zip) o de IVT (*_BD01-2.zip).
+        fder (Path): Carpeta All_Data de destino.
+        tipo (str): 'cmg' o 'ivt'.
+        encoding (str): Codificación de los CSV.
+        tamano_bloque (int): Bytes por bloque de lectura.
+        url (str | None): URL de descarga, para el manifiesto.
+        incremental (bool): Ingiere solo los meses posteriores a la marca de agua.
+
+    Returns:
+        dict: {mes 'AAAA-MM': (Path, filas)} de los archivos nuevos o modificados.
+    """
+    if tipo == 'cmg':
+        columnas, esquema = COLUMNAS_CMG, ESQUEMA_CMG
+    elif tipo == 'ivt':
+        columnas, esquema = COLUMNAS_IVT, ESQUEMA_IVT
+    else:
+        raise ValueError("El tipo de archivo debe ser 'cmg' o 'ivt'.")
+
+    start_time = time.time()
+    fder.mkdir(parents=True, exist_ok=True)
+
+    nombre_zip = getattr(zip_path, 'name', str(zip_path))
+    if isinstance(zip_path, Path) and fuente_vigente(fder, zip_path):
+        print(f'{nombre_zip} ya fue ingerido y no ha cambiado; se omite.')
+        return {}
+    marca = marca_agua(fder, 'CMg_' if tipo == 'cmg' else 'IVT_') if incremental else None
+    if marca is not None:
+        print(f'Ingesta incremental: se omiten los meses hasta {marca}.')
+    esquema_arrow = pl.DataFrame(schema=esquema).to_arrow().schema
+    escritores = {}
+
+    try:
+        with zipfile.ZipFile(zip_path) as zf:
+            for zf_miembro, info in _miembros_csv(zf):
+                with zf_miembro.open(info) as flujo:
+                    muestra = flujo.read(64 * 1024)
+                delimitador = _detectar_delimitador(muestra, encoding)
+                # Todas las columnas como texto: pyarrow deduce los tipos solo del primer
+                # bloque, y una columna entera al inicio puede traer '50,5' más adelante.
+                # Los números se convierten después, en _normalizar_lote.
+                texto = {columna: pa.string() for columna in _columnas_csv(muestra, encoding, delimitador)}
+                with zf_miembro.open(info) as flujo:
+                    lector = pv.open_csv(
+                        flujo,
+                        read_options=pv.ReadOptions(block_size=tamano_bloque, encoding=encoding),
+                        parse_options=pv.ParseOptions(delimiter=delimitador),
+                        convert_options=pv.ConvertOptions(column_types=texto, strings_can_be_null=True),
+                    )
+                    print(f'Ingiriendo {info.filename}...')
+                    for lote in lector:
+                        df = _normalizar_lote(pl.from_arrow(pa.Table.from_batches([lote])), columnas, esquema)
+                        if marca is not None:
+                            df = df.filter(pl.col('mes') > marca)
+                        for (mes,), parte in df.partition_by('mes', as_dict=True, include_key=False).items():
+                            if mes not in escritores:
+                                temporal = fder / (nombre_mensual(tipo, mes) + '.tmp')
+                                escritores[mes] = [pq.ParquetWriter(temporal, esquema_arrow, compression='zstd'), temporal, 0]
+                            escritores[mes][0].write_table(parte.to_arrow().cast(esquema_arrow))
+                            escritores[mes][2] += parte.height
+    except Exception:
+        for escritor, temporal, _ in escritores.values():
+            escritor.close()
+            temporal.unlink(missing_ok=True)
+        raise
+
+    escritos = {}
+    registrados = cargar_manifiesto(fder)['archivos']
+    for mes, (escritor, temporal, filas) in sorted(escritores.items()):
+        escritor.close()
+        destino = fder / nombre_mensual(tipo, mes)
+
+        # Conservar el archivo actual si el mes no cambió
+        registro = registrados.get(destino.name)
+        if destino.exists() and registro and registro['sha256'] == hash_archivo(temporal):
+            temporal.unlink()
+            print(f'{destino.name}: sin cambios.')
+            continue
+
+        temporal.replace(destino)
+        registrar_archivo(fder, destino, origen=url or nombre_zip)
+        escritos[mes] = (destino, filas)
+        print(f'{destino.name}: {filas} filas.')
+
+    if isinstance(zip_path, Path):
+        registrar_fuente(fder, zip_path, escritores.keys(), url=url)
+    _actualizar_indices(fder, tipo, [(mes, ruta) for mes, (ruta, _) in escritos.items()])
+    print(f'Ingesta de {nombre_zip} completada en {time.time() - start_time:.2f} segundos.')
+    return escritos
+
+
+def _actualizar_indices(fder: Path, tipo: str, archivos):
+    """
+    Incorpora los meses recién escritos a los índices de barras o de clientes y a los resúmenes de CMg.
+
+    Los meses de CMg también se vuelven a compactar en el dataset particionado (si se usa)
+    y se quitan del cubo, para que ninguna ruta rápida siga entregando el contenido anterior.
+    """
+    if tipo == 'cmg':
+        compactar_meses(fder, archivos)
+        invalidar_meses(fder, [mes for mes, _ in archivos])
+        actualizar_indice_meses(fder, archivos)
+        actualizar_rollups(fder, archivos)
+    else:
+        actualizar_indice_clientes(fder, archivos)
+
+
+def tipo_zip(nombre: str):
+    """
+    Deduce el tipo de datos de un zip del Coordinador por su nombre.
+
+    Returns:
+        str | None: 'cmg', 'ivt' o None si el nombre no es reconocido.
+    """
+    if 'CMG_Real' in nombre:
+        return 'cmg'
+    if 'Bases-de-Datos' in nombre:
+        return 'ivt'
+    return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convierte zips del Coordinador en parquet mensuales de All_Data.')
+    parser.add_argument('zips', type=Path, nargs='+', help='Zips descargados por DescargarBD.')
+    parser.add_argument('--ruta', type=Path, default=Path(__file__).parent,
+                        help='Carpeta base de datos (All_Data se busca en su carpeta padre).')
+    parser.add_argument('--encoding', default='latin1')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Omite los meses hasta el último ya registrado en el manifiesto.')
+    args = parser.parse_args()
+
+    for zip_path in args.zips:
+        tipo = tipo_zip(zip_path.name)
+        if tipo is None:
+            print(f'No se reconoce el tipo de {zip_path.name}; se omite.')
+            continue
+        ingerir_zip(zip_path, args.ruta.parent / 'All_Data', tipo, encoding=args.encoding, incremental=args.incremental)
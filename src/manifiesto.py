@@ -0,0 +1,207 @@
+from pathlib import Path
+from datetime import datetime
+import argparse
+import hashlib
+import json
+
+import polars as pl
+
+# Versión del esquema de los parquet mensuales que escribe la ingesta
+VERSION_ESQUEMA = 1
+
+# Caché en memoria del manifiesto: {ruta: ((mtime, tamaño), dict)}
+_manifiestos = {}
+
+
+def ruta_manifiesto(fder: Path):
+    """
+    Ruta del manifiesto de All_Data.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+
+    Returns:
+        Path: All_Data/manifiesto.json
+    """
+    return fder / 'manifiesto.json'
+
+
+def cargar_manifiesto(fder: Path):
+    """
+    Carga el manifiesto de All_Data.
+
+    Tiene dos secciones: 'archivos' (un registro por parquet mensual con su hash, origen,
+    filas, rango de Fecha, versión de esquema y si es definitivo) y 'fuentes' (un registro
+    por zip ingerido con su hash y los meses que generó).
+
+    Args:
+        fder (Path): Carpeta All_Data.
+
+    Returns:
+        dict: Manifiesto (vacío si aún no existe).
+    """
+    ruta = ruta_manifiesto(fder)
+    if not ruta.exists():
+        return {'archivos': {}, 'fuentes': {}}
+
+    stat = ruta.stat()
+    firma = (stat.st_mtime_ns, stat.st_size)
+    cache = _manifiestos.get(ruta)
+    if cache is None or cache[0] != firma:
+        cache = (firma, json.loads(ruta.read_text()))
+        _manifiestos[ruta] = cache
+    return cache[1]
+
+
+def guardar_manifiesto(fder: Path, manifiesto: dict):
+    """Escribe el manifiesto de forma atómica."""
+    ruta = ruta_manifiesto(fder)
+    temporal = ruta.with_suffix('.tmp')
+    temporal.write_text(json.dumps(manifiesto, indent=2, ensure_ascii=False))
+    temporal.replace(ruta)
+
+
+def hash_archivo(ruta: Path):
+    """SHA-256 del contenido de un archivo, leído por bloques."""
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def describir_parquet(ruta: Path, origen=None):
+    """
+    Registro de manifiesto de un parquet mensual.
+
+    Args:
+        ruta (Path): Archivo CMg_YY_MM_def.parquet o IVT_YY_MM.parquet.
+        origen (str | None): Zip o URL de donde proviene.
+
+    Returns:
+        dict: Hash, origen, filas, Fecha mínima y máxima, versión de esquema, etc.
+    """
+    resumen = pl.scan_parquet(ruta).select(
+        pl.len().alias('filas'),
+        pl.col('Fecha').min().alias('fecha_min'),
+        pl.col('Fecha').max().alias('fecha_max'),
+    ).collect().row(0, named=True)
+    stat = ruta.stat()
+    return {
+        'sha256': hash_archivo(ruta),
+        'origen': origen,
+        'filas': resumen['filas'],
+        'fecha_min': str(resumen['fecha_min']),
+        'fecha_max': str(resumen['fecha_max']),
+        'version_esquema': VERSION_ESQUEMA,
+        'definitivo': ruta.name.startswith('IVT_') or '_def' in ruta.name,
+        'mtime_ns': stat.st_mtime_ns,
+        'tamano': stat.st_size,
+        'construido': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def firma_archivo(fder: Path, ruta: Path):
+    """
+    Firma de contenido de un archivo de datos, usada como clave por índices y cachés.
+
+    Si el archivo está registrado en el manifiesto y no cambió desde entonces (mismo
+    mtime y tamaño) se usa su hash, de modo que reescribir un mes con el mismo contenido
+    no invalida nada. Si no, se usa mtime y tamaño.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        ruta (Path): Archivo a firmar.
+
+    Returns:
+        str: Firma del archivo.
+    """
+    stat = ruta.stat()
+    try:
+        registro = cargar_manifiesto(fder)['archivos'].get(str(ruta.relative_to(fder)))
+    except ValueError:
+        registro = None
+    if registro and registro['mtime_ns'] == stat.st_mtime_ns and registro['tamano'] == stat.st_size:
+        return registro['sha256']
+    return f'{stat.st_mtime_ns}-{stat.st_size}'
+
+
+def fuente_vigente(fder: Path, zip_path: Path):
+    """
+    Indica si un zip ya fue ingerido con el mismo contenido.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        zip_path (Path): Zip descargado.
+
+    Returns:
+        bool: True si el manifiesto registra el zip con el mismo hash.
+    """
+    fuente = cargar_manifiesto(fder)['fuentes'].get(zip_path.name)
+    return fuente is not None and fuente['sha256'] == hash_archivo(zip_path)
+
+
+def registrar_fuente(fder: Path, zip_path: Path, meses, url=None):
+    """Registra en el manifiesto un zip ingerido y los meses que generó."""
+    manifiesto = cargar_manifiesto(fder)
+    manifiesto['fuentes'][zip_path.name] = {
+        'sha256': hash_archivo(zip_path),
+        'url': url,
+        'meses': sorted(meses),
+        'ingerido': datetime.now().isoformat(timespec='seconds'),
+    }
+    guardar_manifiesto(fder, manifiesto)
+
+
+def registrar_archivo(fder: Path, ruta: Path, origen=None):
+    """Registra o actualiza en el manifiesto un parquet mensual."""
+    manifiesto = cargar_manifiesto(fder)
+    manifiesto['archivos'][str(ruta.relative_to(fder))] = describir_parquet(ruta, origen)
+    guardar_manifiesto(fder, manifiesto)
+
+
+def marca_agua(fder: Path, prefijo: str):
+    """
+    Último mes registrado en el manifiesto para un tipo de archivo.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        prefijo (str): 'CMg_' o 'IVT_'.
+
+    Returns:
+        str | None: Mes 'AAAA-MM' más reciente, o None si no hay registros.
+    """
+    meses = [f"20{nombre.split('_')[1]}-{nombre.split('_')[2][:2]}"
+             for nombre in cargar_manifiesto(fder)['archivos'] if nombre.startswith(prefijo)]
+    return max(meses) if meses else None
+
+
+def registrar_existentes(fder: Path):
+    """
+    Registra en el manifiesto los parquet mensuales de All_Data que no están o cambiaron.
+
+    Returns:
+        list: Nombres de los archivos registrados.
+    """
+    manifiesto = cargar_manifiesto(fder)
+    registrados = []
+    for ruta in sorted([*fder.glob('CMg_*_*_def.parquet'), *fder.glob('IVT_*_*.parquet')]):
+        registro = manifiesto['archivos'].get(ruta.name)
+        stat = ruta.stat()
+        if registro and registro['mtime_ns'] == stat.st_mtime_ns and registro['tamano'] == stat.st_size:
+            continue
+        manifiesto['archivos'][ruta.name] = describir_parquet(ruta, registro['origen'] if registro else None)
+        registrados.append(ruta.name)
+    if registrados:
+        guardar_manifiesto(fder, manifiesto)
+    return registrados
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Registra en el manifiesto los parquet mensuales de All_Data.')
+    parser.add_argument('--ruta', type=Path, default=Path(__file__).parent,
+                        help='Carpeta base de datos (All_Data se busca en su carpeta padre).')
+    args = parser.parse_args()
+
+    registrados = registrar_existentes(args.ruta.parent / 'All_Data')
+    print(f'{len(registrados)} archivos registrados en el manifiesto.')
@@ -0,0 +1,126 @@
+from pathlib import Path
+import re
+import threading
+import time
+
+from bbdd_cmg import archivos_rango, lector_mes_cmg, lector_mes_ivt
+from cache_resultados import cache_meses, cache_resultados, normalizar_terminos
+from carga_paralela import cargar_meses
+from cubo_cmg import abrir_cubo
+from progreso import OperacionCancelada, Seguimiento, TokenCancelacion
+
+# Bytes máximos que una precarga agrega a la caché de meses
+PRESUPUESTO_BYTES = 128 * 1024 * 1024
+
+_MES = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+
+
+class Precargador:
+    """
+    Precarga en segundo plano los meses que leerá la próxima extracción.
+
+    Con el rango de fechas y la barra (y el cliente) elegidos en la interfaz ya se sabe
+    qué archivos CMg_YY_MM_def.parquet e IVT_YY_MM.parquet leerá el siguiente botón. Se
+    leen y filtran en un solo hilo hacia la caché de meses, con los mismos lectores que
+    get_cmg_barra y get_ivt_cliente, para que la extracción los encuentre listos.
+
+    Cada solicitud con datos distintos cancela la anterior entre meses. Una precarga se
+    detiene al alcanzar su presupuesto de memoria, que nunca supera la mitad de la caché
+    de meses para no desalojar lo que otras consultas dejaron en ella.
+    """
+
+    def __init__(self, presupuesto_bytes: int = PRESUPUESTO_BYTES):
+        self.presupuesto_bytes = presupuesto_bytes
+        self._lock = threading.Lock()
+        self._clave = None
+        self._token = None
+
+    def solicitar(self, folder: Path, date_i: str, date_f: str, barra: str, cliente: str = None):
+        """
+        Inicia la precarga de un rango, barra y cliente, cancelando la que esté en curso.
+
+        Las entradas incompletas o inválidas (fechas que no son 'AAAA-MM', barra vacía)
+        solo cancelan la precarga en curso.
+
+        Args:
+            folder (Path): Ruta a la carpeta base de datos.
+            date_i (str): Fecha inicial 'AAAA-MM'.
+            date_f (str): Fecha final 'AAAA-MM'.
+            barra (str): Barra seleccionada.
+            cliente (str | None): Cliente seleccionado (precarga también su IVT).
+
+        Returns:
+            bool: True si se inició una precarga nueva.
+        """
+        date_i, date_f = (date_i or '').strip(), (date_f or '').strip()
+        barra, cliente = (barra or '').strip(), (cliente or '').strip()
+        if not (barra and _MES.match(date_i) and _MES.match(date_f) and date_i <= date_f):
+            self.cancelar()
+            return False
+
+        clave = (str(folder), date_i, date_f, barra, cliente)
+        with self._lock:
+            if clave == self._clave:
+                return False
+            if self._token is not None:
+                self._token.cancelar()
+            self._clave = clave
+            self._token = token = TokenCancelacion()
+
+        threading.Thread(target=self._precargar, args=(Path(folder), date_i, date_f, barra, cliente, token),
+                         name='precarga', daemon=True).start()
+        return True
+
+    def cancelar(self):
+        """Cancela la precarga en curso (se detiene al terminar el mes que está leyendo)."""
+        with self._lock:
+            if self._token is not None:
+                self._token.cancelar()
+            self._clave = None
+            self._token = None
+
+    def _trabajos(self, folder: Path, fder: Path, date_i: str, date_f: str, barra: str, cliente: str):
+        """Meses a precargar: (etapa, archivos, lector), omitiendo lo que la extracción no leerá por mes."""
+        cache = cache_resultados(fder)
+        trabajos = []
+
+        if cliente:
+            archivos = archivos_rango(folder, 'ivt', date_i, date_f)
+            clave = cache.clave(fder, 'ivt', [normalizar_terminos(cliente), barra.upper()], date_i, date_f, archivos)
+            if archivos and not cache.contiene(clave):
+                trabajos.append(('ivt', archivos, lambda: lector_mes_ivt(fder, cliente, barra)))
+
+        # Con el resultado completo en la caché en disco o el cubo vigente, el CMg no se lee por mes
+        archivos = archivos_rango(folder, 'cmg', date_i, date_f)
+        clave = cache.clave(fder, 'cmg', normalizar_terminos(barra), date_i, date_f, archivos)
+        cubo = abrir_cubo(fder)
+        if archivos and not cache.contiene(clave) and not (cubo is not None and cubo.vigente(archivos)):
+            trabajos.append(('cmg', archivos, lambda: lector_mes_cmg(fder, barra)))
+
+        return trabajos
+
+    def _precargar(self, folder: Path, date_i: str, date_f: str, barra: str, cliente: str, token: TokenCancelacion):
+        start_time = time.time()
+        fder = folder.parent / 'All_Data'
+        presupuesto = min(self.presupuesto_bytes, cache_meses().max_bytes // 2)
+        usados = 0
+        meses = 0
+        try:
+            for etapa, archivos, lector in self._trabajos(folder, fder, date_i, date_f, barra, cliente):
+                token.verificar()
+                seguimiento = Seguimiento(f'precarga_{etapa}', archivos, cancelacion=token)
+                for _, _, data in cargar_meses(archivos, lector(), max_hilos=1, seguimiento=seguimiento):
+                    usados += data.estimated_size()
+                    meses += 1
+                    if usados >= presupuesto:
+                        print(f'Precarga detenida al alcanzar su presupuesto ({usados / 1e6:.1f} MB, {meses} meses).')
+                        return
+        except OperacionCancelada:
+            return
+        except Exception as e:
+            print(f'Error en la precarga de {barra}: {e}')
+            return
+
+        if meses:
+            print(f'Precarga de {barra} {date_i} a {date_f}: {meses} meses ({usados / 1e6:.1f} MB) '
+                  f'en {time.time() - start_time:.2f} segundos.')
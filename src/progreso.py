@@ -0,0 +1,137 @@
+from pathlib import Path
+import threading
+import time
+
+
+class OperacionCancelada(Exception):
+    """La operación se detuvo porque se activó su token de cancelación."""
+
+
+class TokenCancelacion:
+    """
+    Token compartido entre quien inicia una operación larga y la operación misma.
+
+    Quien inicia la operación llama cancelar() (desde cualquier hilo); la operación
+    llama verificar() entre meses y lotes, y se detiene con OperacionCancelada.
+    """
+
+    def __init__(self):
+        self._evento = threading.Event()
+
+    def cancelar(self):
+        self._evento.set()
+
+    @property
+    def cancelado(self):
+        return self._evento.is_set()
+
+    def verificar(self):
+        if self._evento.is_set():
+            raise OperacionCancelada('Operación cancelada.')
+
+
+class Avance:
+    """
+    Estado de una etapa de extracción, entregado al callback de progreso tras cada mes.
+
+    Attributes:
+        etapa (str): Qué se está leyendo ('cmg', 'ivt', 'indice_clientes', ...).
+        mes (str | None): Último mes leído 'AAAA-MM' (None al terminar la etapa).
+        meses_listos (int): Meses leídos (o ya disponibles en caché) de la etapa.
+        meses_total (int): Meses de la etapa.
+        filas (int): Filas extraídas hasta ahora.
+        bytes_leidos (int): Tamaño en disco de los archivos leídos de disco (los meses
+            servidos desde la caché de meses no cuentan).
+        segundos (float): Tiempo transcurrido desde el inicio de la etapa.
+    """
+
+    def __init__(self, etapa, mes, meses_listos, meses_total, filas, bytes_leidos, segundos):
+        self.etapa = etapa
+        self.mes = mes
+        self.meses_listos = meses_listos
+        self.meses_total = meses_total
+        self.filas = filas
+        self.bytes_leidos = bytes_leidos
+        self.segundos = segundos
+
+    @property
+    def fraccion(self):
+        return self.meses_listos / self.meses_total if self.meses_total else 1.0
+
+    @property
+    def eta(self):
+        """Segundos estimados para terminar la etapa, según el ritmo de los meses ya leídos."""
+        if not self.meses_listos:
+            return None
+        return self.segundos / self.meses_listos * (self.meses_total - self.meses_listos)
+
+    def __str__(self):
+        texto = (f'{self.etapa}: {self.meses_listos}/{self.meses_total} meses, {self.filas:,} filas, '
+                 f'{self.bytes_leidos / 1e6:.1f} MB')
+        if self.eta:
+            texto += f', faltan ~{self.eta:.0f} s'
+        return texto
+
+
+def tamano_en_disco(ruta: Path):
+    """Bytes de un archivo mensual o de una partición (carpeta con archivos parquet)."""
+    ruta = Path(ruta)
+    if ruta.is_dir():
+        return sum(archivo.stat().st_size for archivo in ruta.glob('*.parquet'))
+    return ruta.stat().st_size if ruta.exists() else 0
+
+
+class Seguimiento:
+    """
+    Lleva los contadores de una etapa e informa el avance y la cancelación.
+
+    Se pasa a cargar_meses / concatenar_meses, que llaman verificar() antes de enviar y
+    de entregar cada mes, y mes() al tener cada mes listo.
+
+    Args:
+        etapa (str): Nombre de la etapa.
+        archivos (list): Tuplas (fecha, Path) de la etapa.
+        progreso (Callable | None): Función que recibe un Avance tras cada mes.
+        cancelacion (TokenCancelacion | None): Token para detener la etapa.
+    """
+
+    def __init__(self, etapa: str, archivos, progreso=None, cancelacion=None):
+        self.etapa = etapa
+        self.meses_total = len(archivos)
+        self.progreso = progreso
+        self.cancelacion = cancelacion
+        self.meses_listos = 0
+        self.filas = 0
+        self.bytes_leidos = 0
+        self.en_cache = set()
+        self.inicio = time.time()
+
+    def verificar(self):
+        if self.cancelacion is not None:
+            self.cancelacion.verificar()
+
+    def desde_cache(self, ruta: Path):
+        """Marca un mes como servido desde la caché de meses (se llama desde el hilo lector)."""
+        self.en_cache.add(ruta)
+
+    def mes(self, fecha: str, ruta: Path, data):
+        self.meses_listos += 1
+        self.filas += data.height
+        if ruta not in self.en_cache:
+            self.bytes_leidos += tamano_en_disco(ruta)
+        self._informar(fecha)
+
+    def terminar(self, filas: int = None):
+        """Marca la etapa como completa (e.g., si se resolvió desde una caché sin leer meses)."""
+        if self.meses_listos == self.meses_total:
+            return  # El último mes ya se informó
+        self.meses_listos = self.meses_total
+        if filas is not None:
+            self.filas = filas
+        self._informar(None)
+
+    def _informar(self, fecha):
+        if self.progreso is not None:
+            self.progreso(Avance(self.etapa, fecha, self.meses_listos, self.meses_total,
+                                 self.filas, self.bytes_leidos, time.time() - self.inicio))
+
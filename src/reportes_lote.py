@@ -0,0 +1,191 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import argparse
+import csv
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+
+import polars as pl
+
+from alineacion import alinear_consumo_cmg
+from bbdd_cmg import archivos_rango, get_cmg_barras
+from carga_paralela import concatenar_meses
+from exportar_excel import escribir_excel
+
+
+def _nombre_archivo(texto: str):
+    """Texto apto para nombre de archivo (sin separadores de ruta ni caracteres reservados)."""
+    return re.sub(r'[\\/:*?"<>|]+', '_', texto).strip()
+
+
+def leer_trabajos(ruta: Path):
+    """
+    Lee la lista de reportes desde un CSV con columnas cliente, barra, desde y hasta.
+
+    Args:
+        ruta (Path): Archivo CSV (separado por comas o punto y coma).
+
+    Returns:
+        list: Diccionarios {'cliente', 'barra', 'desde', 'hasta'}.
+    """
+    with open(ruta, newline='', encoding='utf-8-sig') as f:
+        dialecto = csv.Sniffer().sniff(f.read(4096), delimiters=',;')
+        f.seek(0)
+        return [{k.strip().lower(): v.strip() for k, v in fila.items()} for fila in csv.DictReader(f, dialect=dialecto)]
+
+
+def _leer_rango(folder: Path, trabajos, desde: str, hasta: str):
+    """
+    Lee una sola vez el IVT y el CMg que necesitan todos los reportes de un mismo rango.
+
+    Returns:
+        tuple: (consumo de todos los clientes y barras del rango, CMg de todas sus barras).
+    """
+    clientes = '|'.join(re.escape(t['cliente'].upper()) for t in trabajos)
+    barras = '|'.join(re.escape(t['barra'].upper()) for t in trabajos)
+
+    def leer_ivt(fecha, ruta):
+        return pl.scan_parquet(ruta).filter(
+            pl.col('Cliente').str.to_uppercase().str.contains(clientes) &
+            pl.col('nombre_barra').str.to_uppercase().str.contains(barras)
+        ).collect()
+
+    consumo = concatenar_meses(archivos_rango(folder, 'ivt', desde, hasta), leer_ivt)
+    if not consumo.is_empty():
+        consumo = consumo.rename({'nombre_barra': 'Barra'})
+    cmg = get_cmg_barras(folder, [t['barra'] for t in trabajos], desde, hasta)
+    return consumo, cmg
+
+
+def _datos_trabajo(trabajo: dict, consumo: pl.DataFrame, cmg: pl.DataFrame):
+    """Consumo del cliente en su barra y CMg de esa barra, tomados de los datos del rango."""
+    cliente, barra = trabajo['cliente'].upper(), trabajo['barra'].upper()
+    if not consumo.is_empty():
+        consumo = consumo.filter(
+            pl.col('Cliente').str.to_uppercase().str.contains(cliente, literal=True) &
+            pl.col('Barra').str.to_uppercase().str.contains(barra, literal=True)
+        )
+    if not cmg.is_empty():
+        cmg = cmg.filter(pl.col('Barra').str.to_uppercase().str.contains(barra, literal=True))
+    return consumo, cmg
+
+
+def _escribir_parquet(data: pl.DataFrame, ruta: Path):
+    """Escribe un parquet a través de un temporal único del proceso y lo reemplaza al terminar."""
+    with tempfile.NamedTemporaryFile(dir=ruta.parent, prefix=f'{ruta.stem}.', suffix='.tmp', delete=False) as f:
+        temporal = Path(f.name)
+    data.write_parquet(temporal)
+    temporal.replace(ruta)
+
+
+def generar_reporte(trabajo: dict, consumo: pl.DataFrame, cmg: pl.DataFrame, carpeta: Path):
+    """
+    Genera el Excel y el parquet de consumo y costos marginales de un cliente.
+
+    Se ejecuta en un proceso del pool con los datos del cliente ya leídos: alinea
+    ambas series y escribe los archivos.
+
+    Args:
+        trabajo (dict): {'cliente', 'barra', 'desde', 'hasta'}.
+        consumo (pl.DataFrame): Consumo del cliente en su barra.
+        cmg (pl.DataFrame): CMg de la barra.
+        carpeta (Path): Carpeta CarpetaOut.
+
+    Returns:
+        dict: El trabajo con estado, filas, horas sin CMg, archivo, error y segundos.
+    """
+    start_time = time.time()
+    resultado = {**trabajo, 'estado': 'ok', 'filas': 0, 'horas_sin_cmg': 0, 'archivo': None, 'error': None}
+    try:
+        if consumo.is_empty():
+            resultado['estado'] = 'sin consumo'
+        elif cmg.is_empty():
+            resultado['estado'] = 'sin cmg'
+        else:
+            data, brechas = alinear_consumo_cmg(consumo, cmg)
+            # La barra forma parte del nombre: un cliente puede tener reportes de varias barras
+            nombre = _nombre_archivo(
+                f"Consumo_CMG_{trabajo['cliente']}_{trabajo['barra']}_{trabajo['desde']}_{trabajo['hasta']}"
+            )
+            excel_path = carpeta / 'Excel XLSX' / f'{nombre}.xlsx'
+            escribir_excel(data, excel_path, hoja='Consumo y Costos Marginales')
+            _escribir_parquet(data, carpeta / 'Parquet' / f'{nombre}.parquet')
+
+            resultado['filas'] = data.height
+            resultado['horas_sin_cmg'] = brechas.filter(pl.col('tipo') == 'sin_cmg')['intervalos'].sum()
+            resultado['archivo'] = str(excel_path)
+    except Exception as e:
+        resultado['estado'] = 'error'
+        resultado['error'] = str(e)
+
+    resultado['segundos'] = round(time.time() - start_time, 3)
+    return resultado
+
+
+def generar_reportes(folder: Path, trabajos, max_procesos: int = None):
+    """
+    Genera los reportes de consumo y costos marginales de muchos clientes.
+
+    Los trabajos se agrupan por rango de fechas: el IVT y el CMg de cada rango se leen
+    una sola vez para todos sus clientes y barras, y los reportes de cada cliente se
+    generan en paralelo en un pool de procesos. Un reporte fallido no detiene el resto.
+
+    Args:
+        folder (Path): Ruta a la carpeta base de datos.
+        trabajos (list): Diccionarios {'cliente', 'barra', 'desde', 'hasta'}.
+        max_procesos (int): Procesos del pool (por defecto, uno por núcleo).
+
+    Returns:
+        pl.DataFrame: Resumen con una fila por trabajo (estado, filas, horas sin CMg,
+        archivo, error y segundos). También se guarda en CarpetaOut/Resumen_Lote.csv.
+    """
+    start_time = time.time()
+    carpeta = folder.parent / 'CarpetaOut'
+    (carpeta / 'Parquet').mkdir(parents=True, exist_ok=True)
+    (carpeta / 'Excel XLSX').mkdir(parents=True, exist_ok=True)
+
+    rangos = {}
+    for trabajo in trabajos:
+        rangos.setdefault((trabajo['desde'], trabajo['hasta']), []).append(trabajo)
+
+    resultados = []
+    # 'spawn': un fork después de que polars inició su pool de hilos puede bloquear los procesos hijos
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max_procesos or os.cpu_count(), mp_context=contexto) as pool:
+        for (desde, hasta), grupo in rangos.items():
+            lectura = time.time()
+            try:
+                consumo, cmg = _leer_rango(folder, grupo, desde, hasta)
+            except Exception as e:
+                resultados += [{**t, 'estado': 'error', 'error': f'Lectura del rango: {e}', 'segundos': 0.0} for t in grupo]
+                continue
+            print(f'Rango {desde} a {hasta}: {len(grupo)} reportes, datos leídos en {time.time() - lectura:.2f} segundos.')
+
+            # A cada proceso se envía solo el consumo y el CMg de su cliente
+            futuros = [pool.submit(generar_reporte, t, *_datos_trabajo(t, consumo, cmg), carpeta) for t in grupo]
+            for futuro in as_completed(futuros):
+                resultado = futuro.result()
+                resultados.append(resultado)
+                print(f"{resultado['cliente']}: {resultado['estado']} ({resultado['segundos']:.2f} s)")
+
+    resumen = pl.DataFrame(resultados, infer_schema_length=None).sort(['desde', 'cliente'])
+    resumen.write_csv(carpeta / 'Resumen_Lote.csv')
+
+    fallidos = resumen.filter(pl.col('estado') != 'ok').height
+    print(f'{resumen.height} reportes en {time.time() - start_time:.2f} segundos ({fallidos} sin generar). '
+          f"Resumen en {carpeta / 'Resumen_Lote.csv'}.")
+    return resumen
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Genera reportes de consumo y costos marginales para una lista de clientes.')
+    parser.add_argument('trabajos', type=Path, help='CSV con columnas cliente, barra, desde y hasta (AAAA-MM).')
+    parser.add_argument('--ruta', type=Path, default=Path(__file__).parent,
+                        help='Carpeta base de datos (All_Data y CarpetaOut se buscan en su carpeta padre).')
+    parser.add_argument('--procesos', type=int, default=None, help='Procesos en paralelo (por defecto, uno por núcleo).')
+    args = parser.parse_args()
+
+    generar_reportes(args.ruta, leer_trabajos(args.trabajos), args.procesos)
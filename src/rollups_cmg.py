@@ -0,0 +1,216 @@
+from pathlib import Path
+import argparse
+import time
+
+import polars as pl
+
+from carga_paralela import cargar_meses
+from catalogo_barras import cargar_catalogo, patron_terminos
+from dataset_cmg import fechas_fin_hora
+from manifiesto import firma_archivo
+
+# Tablas de resumen y la columna por la que agrupan, además de Barra y mes
+ROLLUPS = {
+    'diario': 'dia',
+    'mensual': None,
+    'perfil_horario': 'hora',
+}
+
+# Versión del cálculo de los resúmenes: los meses resumidos con otra versión se recalculan
+# (2: Fecha del CMg en la convención de fin de hora; 3: día y hora del inicio del intervalo)
+VERSION = 3
+
+# Frecuencia pedida -> (tabla que la responde, columna de agrupación del resultado)
+FRECUENCIAS = {
+    '1d': ('diario', 'dia'),
+    '1mo': ('mensual', 'mes'),
+    '1y': ('mensual', 'anio'),
+    'perfil': ('perfil_horario', 'hora'),
+}
+
+
+def carpeta_rollups(fder: Path):
+    """
+    Carpeta de las tablas de resumen de CMg.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+
+    Returns:
+        Path: All_Data/rollups
+    """
+    return fder / 'rollups'
+
+
+def ruta_rollup(fder: Path, tabla: str):
+    """Ruta de una tabla de resumen ('diario', 'mensual' o 'perfil_horario')."""
+    return carpeta_rollups(fder) / f'{tabla}.parquet'
+
+
+def cargar_rollup(fder: Path, tabla: str):
+    """
+    Carga una tabla de resumen.
+
+    Returns:
+        pl.DataFrame: Tabla (vacía si aún no existe).
+    """
+    ruta = ruta_rollup(fder, tabla)
+    if not ruta.exists():
+        return pl.DataFrame(schema={'mes': pl.String, 'firma': pl.String})
+    return pl.read_parquet(ruta)
+
+
+def _firma(fder: Path, ruta: Path):
+    """Firma con la que se registra un mes resumido: versión del cálculo y firma del archivo."""
+    return f'v{VERSION}-{firma_archivo(fder, ruta)}'
+
+
+def _leer_mes(fder: Path, ruta: Path):
+    """Mes de CMg con el nombre de la barra, sea un archivo particionado (barra_id) o legado."""
+    lf = fechas_fin_hora(pl.scan_parquet(ruta), ruta)
+    if 'barra_id' in lf.collect_schema().names():
+        lf = lf.join(cargar_catalogo(fder).lazy(), on='barra_id', how='left').drop('barra_id')
+    return lf
+
+
+def resumir_mes(lf: pl.LazyFrame):
+    """
+    Calcula las tablas de resumen de un mes en una pasada vectorizada.
+
+    Cada tabla guarda suma, cantidad de horas, mínimo y máximo de CMg (y la suma de USD),
+    de modo que los promedios sobre varios días o meses se pueden combinar exactamente.
+    Como la Fecha marca el fin de cada hora, el día y la hora de cada fila son los del
+    inicio de su intervalo: las 00:00 del día 1 del mes siguiente cuentan como la hora 23
+    del último día del mes, y la hora del perfil va de 0 a 23.
+
+    Args:
+        lf (pl.LazyFrame): Mes con columnas Fecha, Barra, CMg [USD/MWh] y USD.
+
+    Returns:
+        dict: {tabla: pl.DataFrame} para cada tabla de ROLLUPS.
+    """
+    cmg = pl.col('CMg [USD/MWh]')
+    metricas = [
+        cmg.sum().alias('suma'),
+        cmg.count().cast(pl.Int64).alias('n'),
+        cmg.min().alias('minimo'),
+        cmg.max().alias('maximo'),
+        pl.col('USD').sum().alias('suma_usd'),
+    ]
+    inicio = pl.col('Fecha').dt.offset_by('-1h')
+    base = lf.select(
+        'Barra',
+        inicio.dt.date().alias('dia'),
+        inicio.dt.hour().cast(pl.Int8).alias('hora'),
+        'CMg [USD/MWh]',
+        'USD',
+    )
+    resumenes = {}
+    for tabla, columna in ROLLUPS.items():
+        claves = ['Barra'] + ([columna] if columna else [])
+        resumenes[tabla] = base.group_by(claves).agg(metricas)
+    return dict(zip(resumenes, pl.collect_all(list(resumenes.values()))))
+
+
+def actualizar_rollups(fder: Path, archivos):
+    """
+    Actualiza las tablas de resumen con los meses nuevos o modificados.
+
+    Solo se leen los meses cuya firma no coincide con la registrada en la tabla mensual;
+    las filas de esos meses se reemplazan en todas las tablas y el resto se conserva.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        archivos (list): Tuplas (fecha 'AAAA-MM', Path) de los archivos CMg a considerar.
+
+    Returns:
+        list: Meses recalculados.
+    """
+    mensual = cargar_rollup(fder, 'mensual')
+    vigentes = dict(mensual.select('mes', 'firma').unique().iter_rows())
+
+    pendientes = [(fecha, ruta) for fecha, ruta in archivos if vigentes.get(fecha) != _firma(fder, ruta)]
+    if not pendientes:
+        return []
+
+    nuevos = {tabla: [] for tabla in ROLLUPS}
+    for fecha, ruta, resumenes in cargar_meses(pendientes, lambda fecha, ruta: resumir_mes(_leer_mes(fder, ruta))):
+        firma = _firma(fder, ruta)
+        for tabla, df in resumenes.items():
+            nuevos[tabla].append(df.with_columns(pl.lit(fecha).alias('mes'), pl.lit(firma).alias('firma')))
+
+    meses = [fecha for fecha, _ in pendientes]
+    carpeta_rollups(fder).mkdir(parents=True, exist_ok=True)
+    for tabla, columna in ROLLUPS.items():
+        actual = cargar_rollup(fder, tabla)
+        if not actual.is_empty():
+            actual = actual.filter(~pl.col('mes').is_in(meses))
+        orden = ['mes', 'Barra'] + ([columna] if columna else [])
+        df = pl.concat([actual, *nuevos[tabla]], how='diagonal_relaxed').sort(orden)
+
+        ruta = ruta_rollup(fder, tabla)
+        temporal = ruta.with_suffix('.tmp')
+        df.write_parquet(temporal, compression='zstd')
+        temporal.replace(ruta)
+
+    print(f'Resúmenes de CMg actualizados: {len(meses)} meses.')
+    return meses
+
+
+def resumen_cmg(fder: Path, barras, date_i: str, date_f: str, frecuencia: str = '1mo'):
+    """
+    Consulta CMg resumido usando la tabla de resumen más gruesa que responde la frecuencia.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        barras (str | None): Barras separadas por comas, o None para todas.
+        date_i (str): Fecha inicial 'AAAA-MM'.
+        date_f (str): Fecha final 'AAAA-MM'.
+        frecuencia (str): '1d' (diario), '1mo' (mensual), '1y' (anual) o 'perfil' (promedio
+            por hora del día sobre el rango, con la hora de inicio de 0 a 23).
+
+    Returns:
+        pl.DataFrame: Barra, la columna de la frecuencia (dia, mes, anio u hora), promedio,
+        mínimo, máximo, horas y USD promedio.
+    """
+    if frecuencia not in FRECUENCIAS:
+        raise ValueError(f"Frecuencia no soportada: {frecuencia}. Use una de {list(FRECUENCIAS)}.")
+    tabla, columna = FRECUENCIAS[frecuencia]
+
+    ruta = ruta_rollup(fder, tabla)
+    if not ruta.exists():
+        return pl.DataFrame()
+
+    lf = pl.scan_parquet(ruta).filter(pl.col('mes').is_between(pl.lit(date_i), pl.lit(date_f)))
+    if barras:
+        lf = lf.filter(pl.col('Barra').str.to_uppercase().str.contains(patron_terminos(barras)))
+    if columna == 'anio':
+        lf = lf.with_columns(pl.col('mes').str.slice(0, 4).alias('anio'))
+
+    # Combinar sumas y cantidades: un mes o un año reúne varias filas de la tabla
+    return lf.group_by(['Barra', columna]).agg(
+        (pl.col('suma').sum() / pl.col('n').sum()).alias('promedio'),
+        pl.col('minimo').min(),
+        pl.col('maximo').max(),
+        pl.col('n').sum().alias('horas'),
+        (pl.col('suma_usd').sum() / pl.col('n').sum()).alias('USD'),
+    ).sort(['Barra', columna]).collect()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Construye o actualiza las tablas de resumen de CMg de All_Data.')
+    parser.add_argument('--ruta', type=Path, default=Path(__file__).parent,
+                        help='Carpeta base de datos (All_Data se busca en su carpeta padre).')
+    args = parser.parse_args()
+
+    from bbdd_cmg import archivos_rango
+
+    fder = args.ruta.parent / 'All_Data'
+    meses = sorted(fder.glob('CMg_*_*_def.parquet'))
+    if not meses:
+        raise FileNotFoundError(f'No hay archivos CMg en {fder}')
+    primero, ultimo = meses[0].stem.split('_'), meses[-1].stem.split('_')
+
+    start_time = time.time()
+    actualizar_rollups(fder, archivos_rango(args.ruta, 'cmg', f'20{primero[1]}-{primero[2]}', f'20{ultimo[1]}-{ultimo[2]}'))
+    print(f'Completado en {time.time() - start_time:.2f} segundos.')
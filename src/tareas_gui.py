@@ -0,0 +1,193 @@
+from collections import deque
+import inspect
+import time
+
+from PyQt5 import QtCore, QtWidgets
+
+from progreso import TokenCancelacion
+
+
+class SenalesTarea(QtCore.QObject):
+    """Señales de una tarea (QRunnable no es QObject y no puede emitirlas por sí misma)."""
+    iniciada = QtCore.pyqtSignal()
+    mensaje = QtCore.pyqtSignal(str)
+    avance = QtCore.pyqtSignal(object)                # progreso.Avance
+    llamada = QtCore.pyqtSignal(object, str, object)  # widget, método, argumentos
+    finalizada = QtCore.pyqtSignal(str, float)        # estado final, segundos
+
+
+class ItemSeleccionado:
+    """Copia del item seleccionado de una lista, tomada en el hilo de la interfaz."""
+
+    def __init__(self, texto: str):
+        self._texto = texto
+
+    def text(self):
+        return self._texto
+
+
+class ProxyWidget:
+    """
+    Sustituto de un widget para las funciones que se ejecutan fuera del hilo de la interfaz.
+
+    La selección de una lista (currentItem) se copia al encolar la tarea; cualquier otro
+    método (clear, addItem, addItems, setText, ...) se envía por señal y se ejecuta en el
+    hilo de la interfaz. Si la tarea fue cancelada, las llamadas se descartan.
+    """
+
+    def __init__(self, widget, tarea):
+        self._widget = widget
+        self._tarea = tarea
+        item = widget.currentItem() if isinstance(widget, QtWidgets.QListWidget) else None
+        self._item = ItemSeleccionado(item.text()) if item else None
+
+    def currentItem(self):
+        return self._item
+
+    def __getattr__(self, metodo):
+        def llamar(*args):
+            if not self._tarea.cancelada:
+                self._tarea.senales.llamada.emit(self._widget, metodo, args)
+        return llamar
+
+
+class Tarea(QtCore.QRunnable):
+    """Operación de la interfaz ejecutada en el pool de hilos del GestorTareas."""
+
+    def __init__(self, nombre: str, funcion, destino, al_terminar=None):
+        super().__init__()
+        self.setAutoDelete(False)  # El gestor mantiene la referencia
+        self.nombre = nombre
+        self.funcion = funcion
+        self.kwargs = {}
+        self.destino = destino
+        self.al_terminar = al_terminar
+        self.estado = 'en cola'
+        self.avance = None
+        self.cancelacion = TokenCancelacion()
+        self.senales = SenalesTarea()
+
+    @property
+    def cancelada(self):
+        return self.cancelacion.cancelado
+
+    def escribir_mensaje(self, texto):
+        if not self.cancelada:
+            self.senales.mensaje.emit(texto)
+
+    def informar_progreso(self, avance):
+        if not self.cancelada:
+            self.senales.avance.emit(avance)
+
+    def run(self):
+        if self.cancelada:
+            self.senales.finalizada.emit('cancelada', 0.0)
+            return
+
+        self.senales.iniciada.emit()
+        start_time = time.time()
+        try:
+            self.funcion(**self.kwargs)
+            estado = 'cancelada' if self.cancelada else 'completada'
+        except Exception as e:
+            # OperacionCancelada (u otro error provocado por la cancelación) cuenta como cancelada
+            estado = 'cancelada' if self.cancelada else 'error'
+            self.escribir_mensaje(f"Error en {self.nombre}: {e}")
+        self.senales.finalizada.emit(estado, time.time() - start_time)
+
+
+class GestorTareas(QtCore.QObject):
+    """
+    Pool compartido de hilos para las operaciones de la interfaz.
+
+    Las tareas se encolan y se ejecutan de a max_hilos a la vez, sin bloquear la ventana.
+    Los widgets pasados como argumento se reemplazan por ProxyWidget, los mensajes de la
+    tarea se escriben en su barra de estado (destino) y al terminar se llama al_terminar
+    solo si la tarea se completó. Si la función acepta progreso y cancelacion, recibe el
+    callback de avance de la tarea y su token, con lo que cancelar la detiene entre meses.
+    """
+    cambio = QtCore.pyqtSignal()  # Se agregó, inició, terminó o canceló una tarea
+
+    def __init__(self, max_hilos: int = 2, parent=None):
+        super().__init__(parent)
+        self.pool = QtCore.QThreadPool(self)
+        self.pool.setMaxThreadCount(max_hilos)
+        self.tareas = []
+        # Las tareas terminadas se conservan un tiempo: su run() puede seguir retornando en el hilo
+        self.terminadas = deque(maxlen=50)
+
+    def enviar(self, nombre: str, funcion, destino, al_terminar=None, **kwargs):
+        """
+        Encola funcion(**kwargs, escribir_mensaje=...) en el pool.
+
+        Args:
+            nombre (str): Nombre de la tarea en la lista de tareas.
+            funcion (callable): Función de Metodos_Busqueda / Metodos_Extraccion.
+            destino (QTextEdit): Barra de estado donde se escriben los mensajes de la tarea.
+            al_terminar (callable | None): Se llama en el hilo de la interfaz si la tarea se completa.
+
+        Returns:
+            Tarea: La tarea encolada.
+        """
+        tarea = Tarea(nombre, funcion, destino, al_terminar)
+        tarea.kwargs = {k: ProxyWidget(v, tarea) if isinstance(v, QtWidgets.QWidget) else v for k, v in kwargs.items()}
+        tarea.kwargs['escribir_mensaje'] = tarea.escribir_mensaje
+        parametros = inspect.signature(funcion).parameters
+        if 'progreso' in parametros:
+            tarea.kwargs['progreso'] = tarea.informar_progreso
+        if 'cancelacion' in parametros:
+            tarea.kwargs['cancelacion'] = tarea.cancelacion
+
+        tarea.senales.mensaje.connect(destino.append)
+        tarea.senales.llamada.connect(self._ejecutar_llamada)
+        tarea.senales.iniciada.connect(lambda: self._iniciar(tarea))
+        tarea.senales.avance.connect(lambda avance: self._avanzar(tarea, avance))
+        tarea.senales.finalizada.connect(lambda estado, segundos: self._terminar(tarea, estado, segundos))
+
+        self.tareas.append(tarea)
+        self.pool.start(tarea)
+        destino.append(f"{nombre}: en cola.")
+        self.cambio.emit()
+        return tarea
+
+    def cancelar(self, tarea: Tarea):
+        """
+        Cancela una tarea: si no ha comenzado se quita de la cola; si está en ejecución se
+        activa su token (se detiene en el siguiente mes) y se descarta lo que alcance a producir.
+        """
+        if tarea not in self.tareas or tarea.cancelada:
+            return
+        tarea.cancelacion.cancelar()
+        if self.pool.tryTake(tarea):
+            self._terminar(tarea, 'cancelada', 0.0)
+        else:
+            tarea.estado = 'cancelando'
+            self.cambio.emit()
+
+    def cancelar_todas(self):
+        for tarea in list(self.tareas):
+            self.cancelar(tarea)
+
+    def _ejecutar_llamada(self, widget, metodo, args):
+        getattr(widget, metodo)(*args)
+
+    def _iniciar(self, tarea: Tarea):
+        if not tarea.cancelada:
+            tarea.estado = 'en ejecución'
+        self.cambio.emit()
+
+    def _avanzar(self, tarea: Tarea, avance):
+        if tarea in self.tareas and not tarea.cancelada:
+            tarea.avance = avance
+            self.cambio.emit()
+
+    def _terminar(self, tarea: Tarea, estado: str, segundos: float):
+        if tarea not in self.tareas:
+            return
+        self.tareas.remove(tarea)
+        self.terminadas.append(tarea)
+        tarea.estado = estado
+        tarea.destino.append(f"{tarea.nombre}: {estado} ({segundos:.2f} segundos).")
+        if estado == 'completada' and tarea.al_terminar:
+            tarea.al_terminar()
+        self.cambio.emit()
@@ -0,0 +1,112 @@
+from pathlib import Path
+import argparse
+import time
+
+import polars as pl
+
+from alineacion import remuestrear_cmg, remuestrear_consumo
+from bbdd_cmg import archivos_rango, consulta_mes_cmg
+from carga_paralela import concatenar_meses
+from catalogo_barras import cargar_catalogo, patron_terminos
+
+
+def valorizar_mes(fder: Path, ruta_ivt: Path, ruta_cmg: Path, clientes: str = None):
+    """
+    Valoriza el consumo de un mes de IVT al CMg horario de la barra de retiro de cada cliente.
+
+    Las barras del IVT y las del CMg se comparan en mayúsculas, tanto en el catálogo
+    (meses particionados) como en los archivos legados.
+
+    Args:
+        fder (Path): Carpeta All_Data.
+        ruta_ivt (Path): Archivo IVT_YY_MM.parquet del mes.
+        ruta_cmg (Path | None): Archivo de CMg del mismo mes (None si no existe).
+        clientes (str | None): Clientes a valorizar separados por comas, o None para todos.
+
+    Returns:
+        pl.DataFrame: Una fila por cliente y barra con kWh, kWh_sin_cmg y USD del mes.
+    """
+    lf = pl.scan_parquet(ruta_ivt)
+    if clientes:
+        lf = lf.filter(pl.col('Cliente').str.to_uppercase().str.contains(patron_terminos(clientes)))
+    consumo = remuestrear_consumo(
+        lf.select('Fecha', 'Cliente', pl.col('nombre_barra').alias('Barra'), 'Consumo [kWh]').collect()
+    )
+
+    # CMg solo de las barras donde retiran los clientes del mes
+    nombres = consumo['Barra'].drop_nulls().str.to_uppercase().unique().to_list()
+    if ruta_cmg is not None and nombres:
+        ids = dict(cargar_catalogo(fder).filter(pl.col('Barra').str.to_uppercase().is_in(nombres)).iter_rows())
+        exactas = f"^({patron_terminos(','.join(nombres))})$"
+        cmg = remuestrear_cmg(consulta_mes_cmg(ruta_cmg, ids, exactas).collect())
+    else:
+        cmg = pl.DataFrame(schema={'Fecha': pl.Datetime('ns'), 'Barra': pl.String, 'CMg [USD/MWh]': pl.Float64})
+
+    kwh = pl.col('Consumo [kWh]')
+    barra_norm = pl.col('Barra').str.to_uppercase().alias('barra_norm')
+    return (
+        consumo.with_columns(barra_norm)
+        .join(cmg.select('Fecha', barra_norm, 'CMg [USD/MWh]'), on=['barra_norm', 'Fecha'], how='left')
+        .group_by(['Cliente', 'Barra'])
+        .agg(
+            kwh.sum().alias('kWh'),
+            kwh.filter(pl.col('CMg [USD/MWh]').is_null()).sum().alias('kWh_sin_cmg'),
+            (kwh * pl.col('CMg [USD/MWh]') / 1000).sum().alias('USD'),
+        )
+    )
+
+
+def valorizar_cartera(folder: Path, date_i: str, date_f: str, clientes: str = None):
+    """
+    Valoriza el consumo de todos los clientes (o de los indicados) en todos los meses del rango.
+
+    Cada mes de IVT se une con el CMg horario del mismo mes por barra y hora, en
+    paralelo por mes, y se resume en una tabla de hechos compacta.
+
+    Args:
+        folder (Path): Ruta a la carpeta base de datos.
+        date_i (str): Fecha inicial 'AAAA-MM'.
+        date_f (str): Fecha final 'AAAA-MM'.
+        clientes (str | None): Clientes separados por comas, o None para toda la cartera.
+
+    Returns:
+        pl.DataFrame: Cliente, Barra, mes, kWh, kWh_sin_cmg, USD y precio_medio [USD/MWh]
+        (USD por MWh valorizado; nulo si ningún kWh del mes tiene CMg).
+    """
+    start_time = time.time()
+    fder = folder.parent / 'All_Data'
+
+    meses_cmg = dict(archivos_rango(folder, 'cmg', date_i, date_f))
+    data = concatenar_meses(
+        archivos_rango(folder, 'ivt', date_i, date_f),
+        lambda fecha, ruta: valorizar_mes(fder, ruta, meses_cmg.get(fecha), clientes).with_columns(pl.lit(fecha).alias('mes')),
+    )
+    if data.is_empty():
+        return data
+
+    valorizado = pl.col('kWh') - pl.col('kWh_sin_cmg')
+    data = data.select(
+        'Cliente', 'Barra', 'mes', 'kWh', 'kWh_sin_cmg', 'USD',
+        # Sin ninguna hora con CMg en el mes el precio queda nulo
+        pl.when(valorizado > 0).then(pl.col('USD') * 1000 / valorizado).alias('precio_medio [USD/MWh]'),
+    ).sort(['Cliente', 'Barra', 'mes'])
+
+    print(f'Valorización de {data["Cliente"].n_unique()} clientes completada en {time.time() - start_time:.2f} segundos.')
+    return data
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Valoriza el consumo de la cartera de clientes al CMg de su barra de retiro.')
+    parser.add_argument('desde', help="Mes inicial 'AAAA-MM'.")
+    parser.add_argument('hasta', help="Mes final 'AAAA-MM'.")
+    parser.add_argument('--clientes', default=None, help='Clientes separados por comas (por defecto, todos).')
+    parser.add_argument('--ruta', type=Path, default=Path(__file__).parent,
+                        help='Carpeta base de datos (All_Data se busca en su carpeta padre).')
+    parser.add_argument('--salida', type=Path, default=None,
+                        help='Archivo parquet de salida (por defecto, CarpetaOut/Parquet/Valorizacion.parquet).')
+    args = parser.parse_args()
+
+    salida = args.salida or args.ruta.parent / 'CarpetaOut' / 'Parquet' / 'Valorizacion.parquet'
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    valorizar_cartera(args.ruta, args.desde, args.hasta, args.clientes).write_parquet(salida)
+    print(f'Archivo guardado en {salida}.')
@@ -0,0 +1,121 @@
+from bisect import bisect_left
+from pathlib import Path
+import threading
+
+from bbdd_cmg import archivos_rango
+from busqueda_trigramas import normalizar
+from catalogo_barras import actualizar_indice_meses, cargar_catalogo, ruta_catalogo
+from indice_clientes import actualizar_indice_clientes, cargar_indice_clientes, ruta_indice_clientes
+
+# Caché de vocabularios cargados: {(tipo, carpeta): (firma del archivo de origen, Vocabulario)}
+_vocabularios = {}
+# Evita que dos campos de la interfaz construyan el mismo índice a la vez
+_lock = threading.Lock()
+
+
+class Vocabulario:
+    """
+    Lista compacta y ordenada de nombres (barras o clientes) para autocompletar.
+
+    Los nombres se guardan ordenados por su forma normalizada, de modo que las
+    coincidencias por prefijo se ubican con búsqueda binaria; las coincidencias por
+    subcadena recorren la lista en memoria. Ninguna consulta lee archivos.
+    """
+
+    def __init__(self, nombres):
+        pares = sorted({(normalizar(x), x) for x in nombres if x})
+        self.claves = [clave for clave, _ in pares]
+        self.nombres = [nombre for _, nombre in pares]
+
+    def __len__(self):
+        return len(self.nombres)
+
+    def completar(self, texto: str, k: int = 20):
+        """
+        Nombres que completan un texto parcial.
+
+        Args:
+            texto (str): Texto escrito hasta ahora (e.g., "la cal").
+            k (int): Cantidad máxima de resultados.
+
+        Returns:
+            list: Hasta k nombres, primero los que comienzan con el texto y luego los que lo contienen.
+        """
+        clave = normalizar(texto)
+        if not clave:
+            return []
+
+        resultados = []
+        i = bisect_left(self.claves, clave)
+        while i < len(self.claves) and self.claves[i].startswith(clave) and len(resultados) < k:
+            resultados.append(self.nombres[i])
+            i += 1
+
+        for nombre, normalizado in zip(self.nombres, self.claves):
+            if len(resultados) >= k:
+                break
+            if clave in normalizado and not normalizado.startswith(clave):
+                resultados.append(nombre)
+        return resultados
+
+
+def _todos_los_meses(folder: Path, tipo: str):
+    """Archivos (fecha, Path) de todos los meses disponibles en All_Data para 'cmg' o 'ivt'."""
+    fder = folder.parent / 'All_Data'
+    meses = sorted(fder.glob('CMg_*_*_def.parquet' if tipo == 'cmg' else 'IVT_*_*.parquet'))
+    if not meses:
+        return []
+    primero, ultimo = meses[0].stem.split('_'), meses[-1].stem.split('_')
+    return archivos_rango(folder, tipo, f'20{primero[1]}-{primero[2]}', f'20{ultimo[1]}-{ultimo[2]}')
+
+
+def _vocabulario(tipo: str, fder: Path, ruta: Path, nombres):
+    """Reutiliza el vocabulario mientras su archivo de origen no cambie."""
+    stat = ruta.stat() if ruta.exists() else None
+    firma = (stat.st_mtime_ns, stat.st_size) if stat else None
+    cache = _vocabularios.get((tipo, fder))
+    if cache is None or cache[0] != firma:
+        cache = (firma, Vocabulario(nombres()))
+        _vocabularios[(tipo, fder)] = cache
+    return cache[1]
+
+
+def vocabulario_barras(folder: Path):
+    """
+    Vocabulario de barras del catálogo (barras.parquet).
+
+    Si el catálogo aún no existe se construye una vez con el índice de barras por mes,
+    que lee solo la columna de barras de cada archivo CMg.
+
+    Args:
+        folder (Path): Ruta a la carpeta base de datos.
+
+    Returns:
+        Vocabulario: Nombres de barra.
+    """
+    fder = folder.parent / 'All_Data'
+    with _lock:
+        if not ruta_catalogo(fder).exists():
+            actualizar_indice_meses(fder, _todos_los_meses(folder, 'cmg'))
+        return _vocabulario('barras', fder, ruta_catalogo(fder), lambda: cargar_catalogo(fder)['Barra'].to_list())
+
+
+def vocabulario_clientes(folder: Path):
+    """
+    Vocabulario de clientes del índice de clientes (indice_clientes.parquet).
+
+    Si el índice aún no existe se construye una vez, leyendo solo las columnas Cliente y
+    nombre_barra de cada archivo IVT.
+
+    Args:
+        folder (Path): Ruta a la carpeta base de datos.
+
+    Returns:
+        Vocabulario: Nombres de cliente.
+    """
+    fder = folder.parent / 'All_Data'
+    with _lock:
+        if not ruta_indice_clientes(fder).exists():
+            actualizar_indice_clientes(fder, _todos_los_meses(folder, 'ivt'))
+        return _vocabulario('clientes', fder, ruta_indice_clientes(fder),
+                            lambda: cargar_indice_clientes(fder)['Cliente'].drop_nulls().unique().to_list())
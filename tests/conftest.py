@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+import sys
+
+import polars as pl
+import pytest
+
+# Los módulos de src se importan entre sí por nombre (e.g., from bbdd_cmg import ...)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+
+@pytest.fixture
+def folder(tmp_path):
+    """Carpeta base de datos de prueba: los módulos buscan All_Data en su carpeta padre."""
+    (tmp_path / 'src').mkdir()
+    (tmp_path / 'All_Data').mkdir()
+    return tmp_path / 'src'
+
+
+@pytest.fixture
+def fder(folder):
+    """Carpeta All_Data de prueba."""
+    return folder.parent / 'All_Data'
+
+
+def horas_mes(year: int, month: int, fin_hora: bool):
+    """Fechas horarias de un mes con etiqueta de inicio (00:00..23:00) o de fin (01:00..00:00) de hora."""
+    inicio = datetime(year, month, 1)
+    fin = datetime(year + month // 12, month % 12 + 1, 1)
+    n_horas = int((fin - inicio) / timedelta(hours=1))
+    desfase = 1 if fin_hora else 0
+    return [inicio + timedelta(hours=h + desfase) for h in range(n_horas)]
+
+
+def escribir_cmg(fder: Path, year: int, month: int, barras: dict, fin_hora: bool, repetidas=()):
+    """
+    Escribe un CMg_YY_MM_def.parquet legado.
+
+    Args:
+        barras (dict): {Barra: valor base}; el CMg de la hora h del mes es valor base + h.
+        fin_hora (bool): Convención de etiquetas del mes.
+        repetidas (Iterable[datetime]): Horas que aparecen dos veces (cambio de horario);
+            la repetición lleva CMg negativo para distinguirla.
+
+    Returns:
+        Path: Archivo escrito.
+    """
+    fechas = horas_mes(year, month, fin_hora)
+    filas = []
+    for barra, base in barras.items():
+        for h, fecha in enumerate(fechas):
+            filas.append((fecha, barra, float(base + h), 900.0 + h))
+            if fecha in repetidas:
+                filas.append((fecha, barra, -float(base + h), 900.0 + h))
+    df = pl.DataFrame(filas, schema={'Fecha': pl.Datetime('ns'), 'Barra': pl.String,
+                                     'CMg [USD/MWh]': pl.Float64, 'USD': pl.Float64}, orient='row')
+    ruta = fder / f'CMg_{str(year)[-2:]}_{month:02d}_def.parquet'
+    df.write_parquet(ruta)
+    return ruta
+
+
+def escribir_ivt(fder: Path, year: int, month: int, pares, consumo: float = 1.0):
+    """
+    Escribe un IVT_YY_MM.parquet con un registro de 15 minutos al inicio del mes por par.
+
+    Args:
+        pares (Iterable[tuple]): (Cliente, nombre_barra) presentes en el mes.
+
+    Returns:
+        Path: Archivo escrito.
+    """
+    pares = list(pares)
+    df = pl.DataFrame({
+        'Fecha': pl.Series([datetime(year, month, 1)] * len(pares), dtype=pl.Datetime('ns')),
+        'nombre_barra': [barra for _, barra in pares],
+        'propietario': 'PROPIETARIO',
+        'Tipo_Medida': 'R',
+        'clave': [f'{cliente}-{barra}' for cliente, barra in pares],
+        'Cliente': [cliente for cliente, _ in pares],
+        'Consumo [kWh]': consumo,
+    })
+    ruta = fder / f'IVT_{str(year)[-2:]}_{month:02d}.parquet'
+    df.write_parquet(ruta)
+    return ruta
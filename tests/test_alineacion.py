@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+import polars as pl
+import pytest
+
+from alineacion import alinear_consumo_cmg
+from bbdd_cmg import get_cmg_barra
+from conftest import escribir_cmg
+
+BARRA = 'LA_CALERA_____110'
+
+
+def consumo_cuartohorario(desde: datetime, hasta: datetime):
+    """Consumo de 1 kWh cada 15 minutos, con el registro etiquetado al inicio de su intervalo."""
+    fechas = []
+    fecha = desde
+    while fecha < hasta:
+        fechas.append(fecha)
+        fecha += timedelta(minutes=15)
+    return pl.DataFrame({
+        'Fecha': pl.Series(fechas, dtype=pl.Datetime('ns')),
+        'Cliente': 'CLIENTE',
+        'Barra': BARRA,
+        'Consumo [kWh]': 1.0,
+    })
+
+
+@pytest.mark.parametrize('year, fin_hora', [(2021, False), (2023, True)])
+def test_alinea_cada_hora_con_su_cmg_en_ambas_epocas(folder, fder, year, fin_hora):
+    escribir_cmg(fder, year, 3, {BARRA: 100}, fin_hora)
+    escribir_cmg(fder, year, 4, {BARRA: 5000}, fin_hora)
+    cmg = get_cmg_barra(folder, BARRA, f'{year}-03', f'{year}-04')
+
+    # Dos horas a cada lado del cambio de mes
+    consumo = consumo_cuartohorario(datetime(year, 3, 31, 22), datetime(year, 4, 1, 2))
+    alineado, brechas = alinear_consumo_cmg(consumo, cmg)
+
+    assert brechas.is_empty()
+    cmg_por_hora = dict(alineado.select('Fecha', 'CMg [USD/MWh]').iter_rows())
+    horas_marzo = 31 * 24
+    assert cmg_por_hora == {
+        datetime(year, 3, 31, 23): 100 + horas_marzo - 2,  # 22:00-23:00
+        datetime(year, 4, 1, 0): 100 + horas_marzo - 1,    # 23:00-24:00, última hora de marzo
+        datetime(year, 4, 1, 1): 5000,                     # 00:00-01:00, primera hora de abril
+        datetime(year, 4, 1, 2): 5001,
+    }
+    assert alineado['registros'].to_list() == [4, 4, 4, 4]
+
+
+def test_cambio_de_convencion_entre_2022_y_2023(folder, fder):
+    escribir_cmg(fder, 2022, 12, {BARRA: 100}, fin_hora=False)
+    escribir_cmg(fder, 2023, 1, {BARRA: 5000}, fin_hora=True)
+    cmg = get_cmg_barra(folder, BARRA, '2022-12', '2023-01')
+
+    # Una fila por hora, sin huecos ni horas repetidas en el cambio de año
+    assert cmg['Fecha'].is_unique().all()
+    assert cmg['Fecha'].diff().drop_nulls().unique().to_list() == [timedelta(hours=1)]
+
+    consumo = consumo_cuartohorario(datetime(2022, 12, 31, 23), datetime(2023, 1, 1, 1))
+    alineado, brechas = alinear_consumo_cmg(consumo, cmg)
+    assert brechas.is_empty()
+    assert alineado['CMg [USD/MWh]'].to_list() == [100 + 31 * 24 - 1, 5000]
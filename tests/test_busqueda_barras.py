@@ -0,0 +1,52 @@
+import pytest
+
+from bbdd_cmg import archivos_rango, busca_barra_cmg, get_cmg_barra
+from catalogo_barras import actualizar_indice_meses
+from catalogo_duckdb import buscar_barras_duckdb
+from dataset_cmg import compactar_dataset
+from conftest import escribir_cmg
+
+BARRAS = {'CHARRUA_______220': 100, 'LA_CALERA_____013': 300, 'LA_CALERA_____110': 500, 'POLPAICO______220': 700}
+
+
+@pytest.mark.parametrize('termino, esperadas', [
+    ('CALERA', ['LA_CALERA_____013', 'LA_CALERA_____110']),
+    ('calera_____110, polpaico', ['LA_CALERA_____110', 'POLPAICO______220']),
+    ('CALERA(', []),
+    ('CALERA|CHARRUA', []),
+    ('LA.CALERA', []),
+])
+def test_indice_y_duckdb_comparan_los_terminos_literalmente(folder, fder, termino, esperadas):
+    escribir_cmg(fder, 2023, 1, BARRAS, fin_hora=True)
+
+    # Sin índice de barras por mes se consulta DuckDB
+    assert busca_barra_cmg(folder, termino, '2023-01', '2023-01') == esperadas
+
+    actualizar_indice_meses(fder, archivos_rango(folder, 'cmg', '2023-01', '2023-01'))
+    assert busca_barra_cmg(folder, termino, '2023-01', '2023-01') == esperadas
+
+
+def test_duckdb_lee_solo_los_meses_del_rango(folder, fder):
+    escribir_cmg(fder, 2023, 1, BARRAS, fin_hora=True)
+    escribir_cmg(fder, 2023, 2, {'ZAPALLAR______110': 100}, fin_hora=True)
+    # Un archivo fuera del rango no se abre
+    (fder / 'CMg_23_03_def.parquet').write_bytes(b'no es parquet')
+
+    assert busca_barra_cmg(folder, 'ZAPALLAR', '2023-01', '2023-01') == []
+    assert busca_barra_cmg(folder, 'ZAPALLAR, POLPAICO', '2023-01', '2023-02') == ['POLPAICO______220', 'ZAPALLAR______110']
+
+
+def test_duckdb_con_meses_particionados(folder, fder):
+    escribir_cmg(fder, 2023, 1, BARRAS, fin_hora=True)
+    compactar_dataset(folder)
+    escribir_cmg(fder, 2023, 2, {'ZAPALLAR______110': 100}, fin_hora=True)
+
+    archivos = archivos_rango(folder, 'cmg', '2023-01', '2023-02')
+    assert [ruta.name for _, ruta in archivos] == ['CMg.parquet', 'CMg_23_02_def.parquet']
+    assert buscar_barras_duckdb(fder, 'CALERA_____110, ZAPALLAR', archivos) == ['LA_CALERA_____110', 'ZAPALLAR______110']
+
+
+def test_extraccion_con_caracteres_especiales(folder, fder):
+    escribir_cmg(fder, 2023, 1, BARRAS, fin_hora=True)
+    assert get_cmg_barra(folder, 'CALERA(', '2023-01', '2023-01').is_empty()
+    assert get_cmg_barra(folder, 'LA_CALERA_____013', '2023-01', '2023-01')['Barra'].unique().to_list() == ['LA_CALERA_____013']
@@ -0,0 +1,38 @@
+from busqueda_trigramas import IndiceTrigramas, normalizar, trigramas_barras
+from catalogo_barras import actualizar_catalogo
+
+BARRAS = ['CHARRUA_______220', 'LA_CALERA_____013', 'LA_CALERA_____110', 'POLPAICO______220', 'CALERA_NORTE__066']
+
+
+def test_normalizar():
+    assert normalizar('La_Calera_____110') == 'LA CALERA 110'
+    assert normalizar('  Enel-Generación. S.A. ') == 'ENEL GENERACIÓN S A'
+
+
+def test_subcadenas_primero_y_nombres_cortos_antes():
+    indice = IndiceTrigramas(BARRAS)
+    resultado = indice.buscar('calera')
+    # 'LA CALERA 013' es más corto que 'CALERA NORTE 066'
+    assert resultado[:3] == ['LA_CALERA_____013', 'LA_CALERA_____110', 'CALERA_NORTE__066']
+    assert indice.buscar('calera 110', k=1) == ['LA_CALERA_____110']
+
+
+def test_errores_de_tipeo_y_varios_terminos():
+    indice = IndiceTrigramas(BARRAS)
+    assert indice.buscar('POLPAIKO')[0] == 'POLPAICO______220'
+    assert indice.buscar('charua | polpaico', k=2) == ['POLPAICO______220', 'CHARRUA_______220']
+    assert indice.buscar('XYZ') == []
+
+
+def test_contiene_no_aproxima():
+    indice = IndiceTrigramas(BARRAS)
+    assert indice.contiene('CALERA, 220') == sorted(BARRAS)
+    assert indice.contiene('POLPAIKO') == []
+
+
+def test_indice_de_barras_se_reconstruye_al_cambiar_el_catalogo(fder):
+    actualizar_catalogo(fder, BARRAS[:2])
+    assert trigramas_barras(fder).contiene('POLPAICO') == []
+
+    actualizar_catalogo(fder, BARRAS)
+    assert trigramas_barras(fder).contiene('POLPAICO') == ['POLPAICO______220']
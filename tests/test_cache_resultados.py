@@ -0,0 +1,26 @@
+from bbdd_cmg import archivos_rango
+from cache_resultados import cache_resultados
+from dataset_cmg import compactar_dataset
+from conftest import escribir_cmg
+
+BARRAS = {'CHARRUA_______220': 100, 'LA_CALERA_____110': 500}
+
+
+def test_clave_usa_la_firma_del_legado(folder, fder):
+    escribir_cmg(fder, 2023, 1, BARRAS, fin_hora=True)
+    legado = archivos_rango(folder, 'cmg', '2023-01', '2023-01')
+    cache = cache_resultados(fder)
+
+    def clave(archivos):
+        return cache.clave(fder, 'cmg', ['CHARRUA'], '2023-01', '2023-01', archivos)
+
+    # Leer el mes del legado o de su partición es el mismo resultado
+    antes = clave(legado)
+    compactar_dataset(folder)
+    particion = archivos_rango(folder, 'cmg', '2023-01', '2023-01')
+    assert particion != legado
+    assert clave(particion) == antes
+
+    # Un _def regenerado invalida la entrada aunque la partición aún no se recompacte
+    escribir_cmg(fder, 2023, 1, {'CHARRUA_______220': 700}, fin_hora=True)
+    assert clave(particion) != antes
@@ -0,0 +1,51 @@
+from datetime import datetime
+
+from polars.testing import assert_frame_equal
+import pytest
+
+from bbdd_cmg import archivos_rango, extraer_cmg_archivos
+from cubo_cmg import abrir_cubo, construir_cubo
+from dataset_cmg import compactar_dataset
+from conftest import escribir_cmg
+
+BARRAS = {'CHARRUA_______220': 100, 'LA_CALERA_____013': 300, 'LA_CALERA_____110': 500}
+
+
+def preparar(fder):
+    # Un mes con etiquetas de inicio de hora y una hora repetida por el cambio de horario,
+    # otro con etiquetas de fin de hora
+    escribir_cmg(fder, 2019, 3, BARRAS, fin_hora=False)
+    escribir_cmg(fder, 2019, 4, BARRAS, fin_hora=False, repetidas=[datetime(2019, 4, 6, 23)])
+    escribir_cmg(fder, 2023, 1, BARRAS, fin_hora=True)
+
+
+@pytest.mark.parametrize('particionado', [False, True])
+@pytest.mark.parametrize('barra, date_i, date_f', [
+    ('CHARRUA', '2019-03', '2019-04'),
+    ('LA_CALERA', '2019-03', '2023-01'),
+    ('LA_CALERA_____110, CHARRUA', '2019-04', '2023-01'),
+])
+def test_cubo_entrega_las_mismas_filas_que_el_escaneo(folder, fder, particionado, barra, date_i, date_f):
+    preparar(fder)
+    if particionado:
+        compactar_dataset(folder)
+    archivos = archivos_rango(folder, 'cmg', date_i, date_f)
+
+    escaneo = extraer_cmg_archivos(fder, archivos, barra, date_i, date_f)
+    construir_cubo(folder)
+    assert abrir_cubo(fder).vigente(archivos)
+    cubo = extraer_cmg_archivos(fder, archivos, barra, date_i, date_f)
+
+    assert_frame_equal(cubo, escaneo)
+
+
+def test_hora_repetida_conserva_ambas_filas(folder, fder):
+    preparar(fder)
+    construir_cubo(folder)
+    archivos = archivos_rango(folder, 'cmg', '2019-04', '2019-04')
+    data = extraer_cmg_archivos(fder, archivos, 'CHARRUA', '2019-04', '2019-04')
+
+    # Abril de 2019 tiene 720 horas y una de ellas aparece dos veces
+    assert data.height == 721
+    repetida = data.filter(data['Fecha'] == datetime(2019, 4, 7, 0))  # 23:00-24:00 en fin de hora
+    assert repetida['CMg [USD/MWh]'].to_list() == [100 + 143, -(100 + 143)]
@@ -0,0 +1,52 @@
+from polars.testing import assert_frame_equal
+
+import bbdd_cmg
+from bbdd_cmg import archivos_rango, extraer_cmg_archivos, get_cmg_barra
+from cubo_cmg import construir_cubo
+from dataset_cmg import compactar_dataset, ruta_particion
+from conftest import escribir_cmg
+
+BARRAS = {'CHARRUA_______220': 100, 'LA_CALERA_____110': 500}
+
+
+def test_legado_reescrito_despues_de_compactar(folder, fder):
+    escribir_cmg(fder, 2023, 1, BARRAS, fin_hora=True)
+    escribir_cmg(fder, 2023, 2, BARRAS, fin_hora=True)
+    compactar_dataset(folder)
+    construir_cubo(folder)
+    antes = get_cmg_barra(folder, 'CHARRUA', '2023-01', '2023-02')
+    assert antes['CMg [USD/MWh]'][0] == 100
+
+    # Un _def descargado de nuevo reemplaza el legado: el mes se lee de él y no de la
+    # partición, el cubo ni las cachés
+    escribir_cmg(fder, 2023, 1, {'CHARRUA_______220': 700, 'LA_CALERA_____110': 500}, fin_hora=True)
+    assert [ruta.name for _, ruta in archivos_rango(folder, 'cmg', '2023-01', '2023-02')] == [
+        'CMg_23_01_def.parquet', 'CMg.parquet']
+    despues = get_cmg_barra(folder, 'CHARRUA', '2023-01', '2023-02')
+    assert despues['CMg [USD/MWh]'][0] == 700
+    assert despues.height == antes.height
+
+    # Al volver a compactar solo se reescribe el mes cambiado
+    assert compactar_dataset(folder) == [ruta_particion(fder, '2023', '01')]
+    assert [ruta.name for _, ruta in archivos_rango(folder, 'cmg', '2023-01', '2023-02')] == ['CMg.parquet'] * 2
+    assert get_cmg_barra(folder, 'CHARRUA', '2023-01', '2023-02')['CMg [USD/MWh]'][0] == 700
+
+
+def test_meses_particionados_en_un_solo_escaneo(folder, fder, monkeypatch):
+    for month in (1, 2, 3):
+        escribir_cmg(fder, 2023, month, BARRAS, fin_hora=True)
+    legado = extraer_cmg_archivos(fder, archivos_rango(folder, 'cmg', '2023-01', '2023-03'), 'CHARRUA', '2023-01', '2023-03')
+    compactar_dataset(folder)
+    # Un mes que aún no está compactado se sigue leyendo desde su archivo legado
+    marzo = escribir_cmg(fder, 2023, 3, BARRAS, fin_hora=True)
+
+    leidos_por_mes = []
+    consulta_mes_cmg = bbdd_cmg.consulta_mes_cmg
+    monkeypatch.setattr(bbdd_cmg, 'consulta_mes_cmg',
+                        lambda ruta, ids, barras: leidos_por_mes.append(ruta) or consulta_mes_cmg(ruta, ids, barras))
+    archivos = archivos_rango(folder, 'cmg', '2023-01', '2023-03')
+    particionado = extraer_cmg_archivos(fder, archivos, 'CHARRUA', '2023-01', '2023-03')
+
+    assert [ruta.name for _, ruta in archivos] == ['CMg.parquet', 'CMg.parquet', marzo.name]
+    assert leidos_por_mes == [marzo]
+    assert_frame_equal(particionado, legado)
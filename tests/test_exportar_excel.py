@@ -0,0 +1,74 @@
+from datetime import date, datetime
+
+from openpyxl import load_workbook
+import polars as pl
+import pytest
+
+import exportar_excel
+from exportar_excel import escribir_excel
+
+
+def datos():
+    return pl.DataFrame({
+        'Fecha': [datetime(2023, 1, 1, 1), datetime(2023, 1, 1, 2), datetime(2023, 1, 1, 3)],
+        'Dia': [date(2023, 1, 1)] * 3,
+        'Barra': ['LA_CALERA_____110', 'A & B <C>', None],
+        'CMg [USD/MWh]': [125.29, float('nan'), None],
+        'Horas': [1, 2, 3],
+        'Definitivo': [True, False, True],
+    })
+
+
+def test_valores_y_formatos_nativos(tmp_path):
+    ruta = tmp_path / 'salida.xlsx'
+    assert escribir_excel(datos(), ruta, tamano_bloque=2) == 1
+
+    libro = load_workbook(ruta)
+    hoja = libro['Datos']
+    filas = list(hoja.iter_rows(values_only=True))
+    assert filas[0] == ('Fecha', 'Dia', 'Barra', 'CMg [USD/MWh]', 'Horas', 'Definitivo')
+    assert filas[1] == (datetime(2023, 1, 1, 1), datetime(2023, 1, 1), 'LA_CALERA_____110', 125.29, 1, True)
+    # NaN y nulos quedan como celdas vacías; el texto se escapa
+    assert filas[2][2:4] == ('A & B <C>', None)
+    assert filas[3][2:4] == (None, None)
+
+    assert hoja['A2'].number_format == 'yyyy-mm-dd hh:mm'
+    assert hoja['B2'].number_format == 'yyyy-mm-dd'
+    assert hoja.freeze_panes == 'A2'
+    assert hoja.tables['Tabla1'].ref == 'A1:F4'
+
+
+def test_datos_que_superan_una_hoja_continuan_en_otra(tmp_path):
+    ruta = tmp_path / 'salida.xlsx'
+    data = pl.DataFrame({'n': list(range(5))})
+    assert escribir_excel(data, ruta, hoja='CMg', max_filas=3) == 3
+
+    libro = load_workbook(ruta)
+    assert libro.sheetnames == ['CMg', 'CMg (2)', 'CMg (3)']
+    valores = [fila[0] for nombre in libro.sheetnames for fila in libro[nombre].iter_rows(min_row=2, values_only=True)]
+    assert valores == [0, 1, 2, 3, 4]
+
+
+def test_sin_filas(tmp_path):
+    ruta = tmp_path / 'salida.xlsx'
+    assert escribir_excel(datos().clear(), ruta) == 1
+    assert list(load_workbook(ruta)['Datos'].iter_rows(values_only=True)) == [tuple(datos().columns)]
+
+
+def test_fechas_con_zona_horaria_en_hora_local(tmp_path):
+    ruta = tmp_path / 'salida.xlsx'
+    data = datos().select(pl.col('Fecha').dt.replace_time_zone('America/Santiago'), 'Barra')
+    escribir_excel(data, ruta)
+
+    filas = list(load_workbook(ruta)['Datos'].iter_rows(values_only=True))
+    assert [fila[0] for fila in filas[1:]] == datos()['Fecha'].to_list()
+
+
+def test_error_no_deja_temporales(tmp_path, monkeypatch):
+    def falla(*args):
+        raise ValueError('error al escribir la hoja')
+
+    monkeypatch.setattr(exportar_excel, '_escribir_hoja', falla)
+    with pytest.raises(ValueError):
+        escribir_excel(datos(), tmp_path / 'salida.xlsx')
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,56 @@
+from bbdd_cmg import archivos_rango, busca_cliente_bdd
+from indice_clientes import actualizar_indice_clientes, cargar_indice_clientes, clientes_por_barra, meses_cliente_barra
+from conftest import escribir_ivt
+
+
+def preparar(fder):
+    escribir_ivt(fder, 2023, 1, [('CODELCO', 'LA_CALERA_____110'), ('Enel Generacion ', 'CHARRUA_______220')])
+    escribir_ivt(fder, 2023, 2, [('CODELCO', 'LA_CALERA_____110'), ('CODELCO', 'CHARRUA_______220')])
+
+
+def test_busqueda_de_clientes_en_el_rango(folder, fder):
+    preparar(fder)
+
+    assert busca_cliente_bdd(folder, 'codelco', '2023-01', '2023-01') == [
+        {'Cliente': 'CODELCO', 'Barra': 'LA_CALERA_____110'},
+    ]
+    assert busca_cliente_bdd(folder, 'CODELCO, ENEL', '2023-01', '2023-02') == [
+        {'Cliente': 'CODELCO', 'Barra': 'CHARRUA_______220'},
+        {'Cliente': 'CODELCO', 'Barra': 'LA_CALERA_____110'},
+        {'Cliente': 'Enel Generacion ', 'Barra': 'CHARRUA_______220'},
+    ]
+    # Los términos se comparan literalmente
+    assert busca_cliente_bdd(folder, 'CODELCO(', '2023-01', '2023-02') == []
+
+
+def test_terminos_vacios_no_coinciden_con_todo(folder, fder):
+    preparar(fder)
+
+    codelco = busca_cliente_bdd(folder, 'CODELCO', '2023-01', '2023-02')
+    assert busca_cliente_bdd(folder, 'CODELCO,', '2023-01', '2023-02') == codelco
+    assert busca_cliente_bdd(folder, 'CODELCO,, ', '2023-01', '2023-02') == codelco
+
+
+def test_clientes_por_barra_y_meses(folder, fder):
+    preparar(fder)
+    actualizar_indice_clientes(fder, archivos_rango(folder, 'ivt', '2023-01', '2023-02'))
+
+    assert clientes_por_barra(fder, ' charrua_______220', '2023-01', '2023-02') == ['CODELCO', 'Enel Generacion ']
+    assert clientes_por_barra(fder, 'CHARRUA_______220', '2023-02', '2023-02') == ['CODELCO']
+    assert meses_cliente_barra(fder, 'codelco', 'LA_CALERA_____110') == ['2023-01', '2023-02']
+    assert meses_cliente_barra(fder, 'enel generacion', 'CHARRUA_______220') == ['2023-01']
+
+
+def test_actualizacion_solo_de_meses_nuevos_o_modificados(folder, fder):
+    preparar(fder)
+    archivos = archivos_rango(folder, 'ivt', '2023-01', '2023-02')
+    actualizar_indice_clientes(fder, archivos)
+    firmas = dict(cargar_indice_clientes(fder).select('mes', 'firma').unique().iter_rows())
+
+    escribir_ivt(fder, 2023, 2, [('ANGLO AMERICAN', 'CHARRUA_______220')])
+    indice = actualizar_indice_clientes(fder, archivos)
+
+    nuevas = dict(indice.select('mes', 'firma').unique().iter_rows())
+    assert nuevas['2023-01'] == firmas['2023-01']
+    assert nuevas['2023-02'] != firmas['2023-02']
+    assert clientes_por_barra(fder, 'CHARRUA_______220', '2023-02', '2023-02') == ['ANGLO AMERICAN']
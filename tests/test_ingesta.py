@@ -0,0 +1,81 @@
+from datetime import datetime
+from pathlib import Path
+import shutil
+
+import polars as pl
+import pytest
+
+from bbdd_cmg import archivos_rango, get_cmg_barra
+from cubo_cmg import abrir_cubo, construir_cubo
+from dataset_cmg import compactar_dataset
+from ingesta import ESQUEMA_CMG, ingerir_zip
+from manifiesto import cargar_manifiesto, marca_agua, registrar_existentes
+from conftest import escribir_cmg
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'Antecedentes_CMG_Real_def_prueba.zip'
+
+
+@pytest.fixture
+def zip_cmg(tmp_path):
+    destino = tmp_path / FIXTURE.name
+    shutil.copy(FIXTURE, destino)
+    return destino
+
+
+def test_ingesta_normal(zip_cmg, fder):
+    # Bloques de 1 KB: el primero solo trae CMg enteros y los siguientes, con coma decimal
+    escritos = ingerir_zip(zip_cmg, fder, 'cmg', tamano_bloque=1024)
+
+    assert sorted(escritos) == ['2023-01', '2023-02']
+    assert {mes: filas for mes, (_, filas) in escritos.items()} == {'2023-01': 96, '2023-02': 6}
+
+    enero = pl.read_parquet(fder / 'CMg_23_01_def.parquet')
+    assert enero.schema == pl.Schema(ESQUEMA_CMG)
+    assert enero['Fecha'].min() == datetime(2023, 1, 30, 1)
+    # La hora 24 del último día es las 00:00 del mes siguiente y queda en el archivo del mes
+    ultima = enero.filter((pl.col('Fecha') == datetime(2023, 2, 1)) & (pl.col('Barra') == 'LA_CALERA_____110'))
+    assert ultima.select('CMg [USD/MWh]', 'USD').row(0) == (74.5, 820.25)
+    assert enero.filter(pl.col('Fecha').dt.day() == 30)['CMg [USD/MWh]'].min() == 41.0
+
+    manifiesto = cargar_manifiesto(fder)
+    assert manifiesto['fuentes'][zip_cmg.name]['meses'] == ['2023-01', '2023-02']
+    assert manifiesto['archivos']['CMg_23_02_def.parquet']['filas'] == 6
+
+
+def test_reingesta_omite_zip_sin_cambios(zip_cmg, fder):
+    ingerir_zip(zip_cmg, fder, 'cmg', tamano_bloque=1024)
+    mtimes = {ruta.name: ruta.stat().st_mtime_ns for ruta in fder.glob('CMg_*.parquet')}
+
+    assert ingerir_zip(zip_cmg, fder, 'cmg', tamano_bloque=1024) == {}
+    assert {ruta.name: ruta.stat().st_mtime_ns for ruta in fder.glob('CMg_*.parquet')} == mtimes
+
+
+def test_ingesta_actualiza_particiones_y_cubo(zip_cmg, folder, fder):
+    # Enero de 2023 ya estaba compactado y en el cubo con otros valores
+    escribir_cmg(fder, 2022, 12, {'LA_CALERA_____110': 10.0}, fin_hora=True)
+    escribir_cmg(fder, 2023, 1, {'LA_CALERA_____110': 10.0}, fin_hora=True)
+    compactar_dataset(folder)
+    construir_cubo(folder)
+
+    ingerir_zip(zip_cmg, fder, 'cmg', tamano_bloque=1024)
+
+    archivos = archivos_rango(folder, 'cmg', '2022-12', '2023-02')
+    assert [ruta.name for _, ruta in archivos] == ['CMg.parquet'] * 3
+    cubo = abrir_cubo(fder)
+    assert cubo.vigente(archivos[:1]) and not cubo.vigente(archivos[1:2])
+
+    data = get_cmg_barra(folder, 'LA_CALERA_____110', '2023-01', '2023-02')
+    ultima = data.filter(pl.col('Fecha') == datetime(2023, 2, 1))
+    assert ultima.select('CMg [USD/MWh]', 'USD').row(0) == (74.5, 820.25)
+
+
+def test_ingesta_incremental_omite_meses_hasta_la_marca_de_agua(zip_cmg, fder):
+    escribir_cmg(fder, 2023, 1, {'LA_CALERA_____110': 10.0}, fin_hora=True)
+    registrar_existentes(fder)
+    enero = pl.read_parquet(fder / 'CMg_23_01_def.parquet')
+
+    escritos = ingerir_zip(zip_cmg, fder, 'cmg', tamano_bloque=1024, incremental=True)
+
+    assert sorted(escritos) == ['2023-02']
+    assert pl.read_parquet(fder / 'CMg_23_01_def.parquet').equals(enero)
+    assert marca_agua(fder, 'CMg_') == '2023-02'
@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from conftest import escribir_cmg, escribir_ivt
+from manifiesto import (cargar_manifiesto, firma_archivo, fuente_vigente, hash_archivo, marca_agua,
+                        registrar_existentes, registrar_fuente)
+
+
+@pytest.fixture
+def meses(fder):
+    escribir_cmg(fder, 2022, 11, {'A': 10.0}, fin_hora=False)
+    escribir_cmg(fder, 2023, 1, {'A': 10.0}, fin_hora=True)
+    escribir_ivt(fder, 2022, 12, [('CLIENTE', 'A')])
+    return fder
+
+
+def test_registrar_existentes(meses):
+    assert registrar_existentes(meses) == ['CMg_22_11_def.parquet', 'CMg_23_01_def.parquet', 'IVT_22_12.parquet']
+    # Sin cambios en disco no se vuelve a registrar nada
+    assert registrar_existentes(meses) == []
+
+    registro = cargar_manifiesto(meses)['archivos']['CMg_23_01_def.parquet']
+    assert registro['filas'] == 31 * 24
+    assert registro['definitivo']
+    assert registro['sha256'] == hash_archivo(meses / 'CMg_23_01_def.parquet')
+
+
+def test_registrar_existentes_detecta_cambios(meses):
+    registrar_existentes(meses)
+    escribir_cmg(meses, 2023, 1, {'A': 10.0, 'B': 20.0}, fin_hora=True)
+
+    assert registrar_existentes(meses) == ['CMg_23_01_def.parquet']
+    assert cargar_manifiesto(meses)['archivos']['CMg_23_01_def.parquet']['filas'] == 2 * 31 * 24
+
+
+def test_marca_agua(meses):
+    assert marca_agua(meses, 'CMg_') is None
+    registrar_existentes(meses)
+    assert marca_agua(meses, 'CMg_') == '2023-01'
+    assert marca_agua(meses, 'IVT_') == '2022-12'
+
+
+def test_firma_archivo(meses):
+    ruta = meses / 'CMg_23_01_def.parquet'
+    stat = ruta.stat()
+    assert firma_archivo(meses, ruta) == f'{stat.st_mtime_ns}-{stat.st_size}'
+
+    # Registrado y sin cambios: la firma es el hash, y no depende del mtime
+    registrar_existentes(meses)
+    assert firma_archivo(meses, ruta) == hash_archivo(ruta)
+
+    # Modificado después de registrarlo: vuelve a mtime y tamaño
+    os.utime(ruta, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert firma_archivo(meses, ruta) == f'{stat.st_mtime_ns + 10**9}-{stat.st_size}'
+
+
+def test_fuente_vigente(fder, tmp_path):
+    zip_path = tmp_path / 'Antecedentes_CMG_Real_def_230201.zip'
+    zip_path.write_bytes(b'contenido')
+    assert not fuente_vigente(fder, zip_path)
+
+    registrar_fuente(fder, zip_path, ['2023-01'])
+    assert fuente_vigente(fder, zip_path)
+    assert cargar_manifiesto(fder)['fuentes'][zip_path.name]['meses'] == ['2023-01']
+
+    zip_path.write_bytes(b'contenido nuevo')
+    assert not fuente_vigente(fder, zip_path)
@@ -0,0 +1,19 @@
+from bbdd_cmg import archivos_rango, extraer_cmg_archivos
+from progreso import Seguimiento, tamano_en_disco
+from conftest import escribir_cmg
+
+
+def test_meses_de_la_cache_no_cuentan_como_leidos(folder, fder):
+    rutas = [escribir_cmg(fder, 2023, mes, {'LA_CALERA_____110': 100}, fin_hora=True) for mes in (1, 2, 3)]
+
+    avances = []
+    archivos = archivos_rango(folder, 'cmg', '2023-01', '2023-02')
+    extraer_cmg_archivos(fder, archivos, 'CALERA', '2023-01', '2023-02', Seguimiento('cmg', archivos, avances.append))
+    assert avances[-1].bytes_leidos == sum(tamano_en_disco(r) for r in rutas[:2])
+
+    # Al ampliar el rango solo marzo se lee de disco
+    avances = []
+    archivos = archivos_rango(folder, 'cmg', '2023-01', '2023-03')
+    extraer_cmg_archivos(fder, archivos, 'CALERA', '2023-01', '2023-03', Seguimiento('cmg', archivos, avances.append))
+    assert [a.meses_listos for a in avances] == [1, 2, 3]
+    assert avances[-1].bytes_leidos == tamano_en_disco(rutas[2])
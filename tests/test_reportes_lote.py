@@ -0,0 +1,29 @@
+from datetime import datetime
+
+import polars as pl
+
+from reportes_lote import generar_reporte
+
+
+def test_reportes_de_un_cliente_en_dos_barras_no_se_pisan(tmp_path):
+    (tmp_path / 'Excel XLSX').mkdir()
+    (tmp_path / 'Parquet').mkdir()
+
+    archivos = set()
+    for barra, valor in (('CHARRUA_______220', 40.0), ('LA_CALERA_____110', 50.0)):
+        consumo = pl.DataFrame({
+            'Fecha': [datetime(2023, 1, 1, 0, 15 * i) for i in range(4)],
+            'Cliente': 'CLIENTE', 'Barra': barra, 'Consumo [kWh]': 1.0,
+        })
+        cmg = pl.DataFrame({'Fecha': [datetime(2023, 1, 1, 1)], 'Barra': barra, 'CMg [USD/MWh]': valor, 'USD': 850.0})
+        trabajo = {'cliente': 'CLIENTE', 'barra': barra, 'desde': '2023-01', 'hasta': '2023-01'}
+
+        resultado = generar_reporte(trabajo, consumo, cmg, tmp_path)
+        assert resultado['estado'] == 'ok'
+        archivos.add(resultado['archivo'])
+
+        parquet = pl.read_parquet(tmp_path / 'Parquet' / f"Consumo_CMG_CLIENTE_{barra}_2023-01_2023-01.parquet")
+        assert parquet['CMg [USD/MWh]'].to_list() == [valor]
+
+    assert len(archivos) == 2
+    assert not list(tmp_path.rglob('*.tmp'))
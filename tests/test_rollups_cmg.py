@@ -0,0 +1,65 @@
+from datetime import date
+
+import polars as pl
+import pytest
+
+from bbdd_cmg import archivos_rango, get_cmg_resumen
+from rollups_cmg import actualizar_rollups
+from conftest import escribir_cmg
+
+BARRAS = {'CHARRUA_______220': 100, 'LA_CALERA_____110': 500}
+
+
+@pytest.mark.parametrize('year, fin_hora', [(2021, False), (2024, True)])
+def test_resumen_diario_solo_tiene_dias_del_mes(folder, fder, year, fin_hora):
+    escribir_cmg(fder, year, 1, BARRAS, fin_hora)
+    diario = get_cmg_resumen(folder, 'CHARRUA', f'{year}-01', f'{year}-01', '1d')
+
+    assert diario['dia'].to_list() == [date(year, 1, d) for d in range(1, 32)]
+    assert diario['horas'].unique().to_list() == [24]
+    # El CMg de la hora h del mes es 100 + h: el día d promedia las horas 24(d-1) a 24d-1
+    assert diario['promedio'].to_list() == [100 + 24 * (d - 1) + 11.5 for d in range(1, 32)]
+    assert diario.row(30, named=True)['maximo'] == 100 + 31 * 24 - 1
+
+
+def test_perfil_mensual_y_anual(folder, fder):
+    escribir_cmg(fder, 2022, 12, BARRAS, fin_hora=False)
+    escribir_cmg(fder, 2023, 1, BARRAS, fin_hora=True)
+
+    perfil = get_cmg_resumen(folder, 'LA_CALERA', '2022-12', '2023-01', 'perfil')
+    assert perfil['hora'].to_list() == list(range(24))
+    assert perfil['horas'].unique().to_list() == [62]
+    # Hora 0 del día d de cada mes: 500 + 24(d-1); promedio sobre 31 días de cada mes
+    assert perfil.row(0, named=True)['promedio'] == 500 + 24 * 15
+
+    mensual = get_cmg_resumen(folder, 'LA_CALERA', '2022-12', '2023-01', '1mo')
+    assert mensual.select('mes', 'horas', 'minimo', 'maximo').rows() == [
+        ('2022-12', 744, 500.0, 500.0 + 743), ('2023-01', 744, 500.0, 500.0 + 743),
+    ]
+    anual = get_cmg_resumen(folder, None, '2022-12', '2023-01', '1y')
+    assert anual.select('Barra', 'anio', 'horas').rows() == [
+        ('CHARRUA_______220', '2022', 744), ('CHARRUA_______220', '2023', 744),
+        ('LA_CALERA_____110', '2022', 744), ('LA_CALERA_____110', '2023', 744),
+    ]
+
+
+def test_actualizacion_incremental(folder, fder):
+    escribir_cmg(fder, 2023, 1, BARRAS, fin_hora=True)
+    escribir_cmg(fder, 2023, 2, BARRAS, fin_hora=True)
+    archivos = archivos_rango(folder, 'cmg', '2023-01', '2023-02')
+
+    assert actualizar_rollups(fder, archivos) == ['2023-01', '2023-02']
+    assert actualizar_rollups(fder, archivos) == []
+
+    escribir_cmg(fder, 2023, 2, {'CHARRUA_______220': 0}, fin_hora=True)
+    assert actualizar_rollups(fder, archivos) == ['2023-02']
+    mensual = get_cmg_resumen(folder, None, '2023-01', '2023-02', '1mo')
+    assert mensual.filter(pl.col('mes') == '2023-02')['Barra'].to_list() == ['CHARRUA_______220']
+    assert mensual.filter(pl.col('mes') == '2023-01').height == 2
+
+
+def test_resumen_horario_sin_barra_entrega_todas(folder, fder):
+    escribir_cmg(fder, 2023, 1, BARRAS, fin_hora=True)
+    horario = get_cmg_resumen(folder, None, '2023-01', '2023-01', '1h')
+    assert sorted(horario['Barra'].unique().to_list()) == sorted(BARRAS)
+    assert horario.height == 2 * 31 * 24
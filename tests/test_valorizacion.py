@@ -0,0 +1,32 @@
+import polars as pl
+import pytest
+
+from dataset_cmg import compactar_dataset
+from valorizacion import valorizar_cartera
+from conftest import escribir_cmg, escribir_ivt
+
+
+@pytest.mark.parametrize('particionado', [False, True])
+def test_barras_del_ivt_sin_distinguir_mayusculas(folder, fder, particionado):
+    escribir_cmg(fder, 2023, 1, {'LA_CALERA_____110': 500}, fin_hora=True)
+    escribir_ivt(fder, 2023, 1, [('CODELCO', 'La_Calera_____110')], consumo=2.0)
+    if particionado:
+        compactar_dataset(folder)
+
+    data = valorizar_cartera(folder, '2023-01', '2023-01')
+
+    # El registro de las 00:00 del día 1 cae en la hora 00:00-01:00, la primera del mes
+    assert data.select('Barra', 'kWh', 'kWh_sin_cmg', 'USD', 'precio_medio [USD/MWh]').row(0) == (
+        'La_Calera_____110', 2.0, 0.0, 1.0, 500.0)
+
+
+def test_mes_sin_cmg_deja_precio_nulo(folder, fder):
+    escribir_cmg(fder, 2023, 1, {'LA_CALERA_____110': 500}, fin_hora=True)
+    escribir_ivt(fder, 2023, 1, [('CODELCO', 'LA_CALERA_____110')])
+    escribir_ivt(fder, 2023, 2, [('CODELCO', 'LA_CALERA_____110')])
+
+    data = valorizar_cartera(folder, '2023-01', '2023-02')
+
+    assert data['mes'].to_list() == ['2023-01', '2023-02']
+    assert data['precio_medio [USD/MWh]'].to_list() == [500.0, None]
+    assert data.filter(pl.col('mes') == '2023-02')['kWh_sin_cmg'].to_list() == [1.0]